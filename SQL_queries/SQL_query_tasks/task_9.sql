@@ -2,8 +2,8 @@
 WITH sales_date AS (
     SELECT 
         year,
-        TO_TIMESTAMP(CONCAT(year, '-', month, '-', day, ' ', timestamp), 'YYYY-MM-DD HH24:MI:SS') AS sales_date_column,
-        LEAD(TO_TIMESTAMP(CONCAT(year, '-', month, '-', day, ' ', timestamp), 'YYYY-MM-DD HH24:MI:SS')) OVER (PARTITION BY year ORDER BY TO_TIMESTAMP(CONCAT(year, '-', month, '-', day, ' ', timestamp), 'YYYY-MM-DD HH24:MI:SS')) AS next_sale_date
+        sale_ts AS sales_date_column,
+        LEAD(sale_ts) OVER (PARTITION BY year ORDER BY sale_ts) AS next_sale_date
     FROM 
         dim_date_times
 )
@@ -0,0 +1,66 @@
+"""
+Checks DataCleaning._card_number_rejections against a per-row Python reference (provider length
+and Luhn checksum) and times it on a large number of card numbers.
+
+Usage:
+    python benchmarks/bench_card_validation.py --rows 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import CARD_NUMBER_LENGTHS, DataCleaning
+from synthetic_data import make_card_details
+
+
+def reference_reason(card_number, card_provider):
+    if card_number is None or card_number is pd.NA:
+        return 'missing'
+    if not (card_number.isascii() and card_number.isdigit()):
+        return 'not_numeric'
+    if card_provider not in CARD_NUMBER_LENGTHS:
+        return 'unknown_provider'
+    if len(card_number) != CARD_NUMBER_LENGTHS[card_provider]:
+        return 'wrong_length'
+    checksum = 0
+    for position, digit in enumerate(reversed(card_number)):
+        digit = int(digit)
+        if position % 2 == 1:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        checksum += digit
+    return None if checksum % 10 == 0 else 'failed_luhn'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--check-rows', type=int, default=200000, help='Rows compared with the Python reference.')
+    args = parser.parse_args()
+
+    cleaner = DataCleaning()
+    cards = make_card_details(args.check_rows)
+    card_numbers = cards['card_number'].str.replace('?', '', regex=False)
+    reasons = cleaner._card_number_rejections(card_numbers, cards['card_provider'])
+    expected = [reference_reason(number, provider) for number, provider in zip(card_numbers, cards['card_provider'])]
+    mismatches = int((reasons.fillna('valid').to_numpy() != pd.Series(expected, dtype=object).fillna('valid').to_numpy()).sum())
+    print(f"reference check: rows={len(cards)} mismatches={mismatches} reasons={reasons.value_counts().to_dict()}")
+
+    repeats = -(-args.rows // len(cards))
+    card_numbers = pd.Series(np.tile(card_numbers.to_numpy(dtype=object), repeats)[:args.rows]).astype('string')
+    card_providers = pd.Series(np.tile(cards['card_provider'].to_numpy(dtype=object), repeats)[:args.rows])
+    start = time.perf_counter()
+    cleaner._card_number_rejections(card_numbers, card_providers)
+    elapsed = time.perf_counter() - start
+    print(f"vectorized: rows={args.rows} wall={elapsed:.2f}s throughput={args.rows / elapsed:,.0f} rows/sec")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark suite for the cleaning pipeline. For every source in synthetic_data.SOURCES and every
+row count it records the wall time, CPU time and peak traced memory of the DataCleaning.clean_*
+method and, when --creds is given, of DatabaseConnector.upload_to_db into that database
+(e.g. a local PostgreSQL stand-in for the RDS target).
+
+Results are written as JSON. With --baseline, every measurement is compared against the matching
+one of an earlier results file and the script exits with status 1 if any is slower or uses more
+memory than the baseline by more than --threshold.
+
+Usage:
+    python benchmarks/bench_cleaning.py --rows 100000 1000000 10000000 --output results.json
+    python benchmarks/bench_cleaning.py --rows 100000 --baseline results.json --threshold 0.2
+    python benchmarks/bench_cleaning.py --rows 1000000 --creds local_db_creds.yaml --use-copy
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from database_utils import DatabaseConnector
+from synthetic_data import SOURCES
+
+# Measurements faster than this are too noisy to flag as time regressions.
+MIN_COMPARED_SECONDS = 0.05
+
+
+def measure(func, *args, track_memory=True):
+    """
+    Returns (result, wall seconds, CPU seconds, peak traced memory in bytes).
+    The call is timed without tracing and then repeated under tracemalloc for the memory peak,
+    since tracing slows allocation-heavy code down.
+    """
+    gc.collect()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    result = func(*[arg.copy() if isinstance(arg, pd.DataFrame) else arg for arg in args])
+    wall_seconds = time.perf_counter() - start_wall
+    cpu_seconds = time.process_time() - start_cpu
+
+    peak_memory_bytes = None
+    if track_memory:
+        copies = [arg.copy() if isinstance(arg, pd.DataFrame) else arg for arg in args]
+        gc.collect()
+        tracemalloc.start()
+        func(*copies)
+        peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, wall_seconds, cpu_seconds, peak_memory_bytes
+
+
+def run_suite(rows_list, sources, seed=0, compact=False, connector=None, use_copy=False, track_memory=True):
+    """
+    Runs every (source, rows) benchmark and returns the list of result records.
+    """
+    cleaner = DataCleaning(compact=compact)
+    results = []
+    for rows in rows_list:
+        for source in sources:
+            generate, clean_method, table_name = SOURCES[source]
+            raw = generate(rows, seed=seed)
+            cleaned, wall_seconds, cpu_seconds, peak_memory_bytes = measure(
+                getattr(cleaner, clean_method), raw, track_memory=track_memory)
+            results.append({'source': source, 'stage': f'DataCleaning.{clean_method}', 'rows': rows,
+                            'rows_in': len(raw), 'rows_out': len(cleaned), 'wall_seconds': wall_seconds,
+                            'cpu_seconds': cpu_seconds, 'peak_memory_bytes': peak_memory_bytes})
+            print(_format_result(results[-1]))
+            del raw
+
+            if connector is not None:
+                upload = lambda df: connector.upload_to_db(df, f'bench_{table_name}', use_copy=use_copy)
+                _, wall_seconds, cpu_seconds, peak_memory_bytes = measure(upload, cleaned, track_memory=track_memory)
+                results.append({'source': source, 'stage': 'DatabaseConnector.upload_to_db', 'rows': rows,
+                                'rows_in': len(cleaned), 'rows_out': len(cleaned), 'wall_seconds': wall_seconds,
+                                'cpu_seconds': cpu_seconds, 'peak_memory_bytes': peak_memory_bytes})
+                print(_format_result(results[-1]))
+            del cleaned
+    return results
+
+
+def _format_result(result):
+    memory = (f"{result['peak_memory_bytes'] / 2 ** 20:,.0f} MiB" if result['peak_memory_bytes'] is not None
+              else '-')
+    return (f"{result['source']:<14}{result['stage']:<38}rows={result['rows']:<10}"
+            f"wall={result['wall_seconds']:.2f}s cpu={result['cpu_seconds']:.2f}s peak={memory}")
+
+
+def find_regressions(results, baseline_results, threshold):
+    """
+    Returns a message for every result that is slower, or has a larger memory peak,
+    than its baseline by more than threshold (a fraction, e.g. 0.2 for 20%).
+    """
+    baseline = {(result['source'], result['stage'], result['rows']): result for result in baseline_results}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['source'], result['stage'], result['rows']))
+        if previous is None:
+            continue
+        if (previous['wall_seconds'] >= MIN_COMPARED_SECONDS
+                and result['wall_seconds'] > previous['wall_seconds'] * (1 + threshold)):
+            regressions.append(f"{result['stage']} ({result['source']}, {result['rows']} rows): wall "
+                               f"{previous['wall_seconds']:.2f}s -> {result['wall_seconds']:.2f}s")
+        if (previous['peak_memory_bytes'] and result['peak_memory_bytes']
+                and result['peak_memory_bytes'] > previous['peak_memory_bytes'] * (1 + threshold)):
+            regressions.append(f"{result['stage']} ({result['source']}, {result['rows']} rows): peak memory "
+                               f"{previous['peak_memory_bytes'] / 2 ** 20:,.0f} MiB -> "
+                               f"{result['peak_memory_bytes'] / 2 ** 20:,.0f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact', action='store_true', help='Clean with DataCleaning compact dtypes.')
+    parser.add_argument('--creds', help='YAML file with the RDS_* credentials of a database to benchmark uploads into.')
+    parser.add_argument('--use-copy', action='store_true', help='Upload with COPY FROM STDIN.')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc peak memory runs.')
+    parser.add_argument('--output', default='bench_cleaning_results.json')
+    parser.add_argument('--baseline', help='Earlier results file to check for regressions against.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown / memory growth over the baseline, as a fraction.')
+    args = parser.parse_args()
+
+    connector = DatabaseConnector(args.creds) if args.creds else None
+    results = run_suite(args.rows, args.sources, seed=args.seed, compact=args.compact, connector=connector,
+                        use_copy=args.use_copy, track_memory=not args.no_memory)
+    with open(args.output, 'w') as file:
+        json.dump({'environment': {'python': platform.python_version(), 'pandas': pd.__version__,
+                                   'numpy': np.__version__, 'machine': platform.machine(),
+                                   'cpu_count': os.cpu_count(), 'compact': args.compact,
+                                   'use_copy': args.use_copy, 'seed': args.seed},
+                   'results': results}, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline_results = json.load(file)['results']
+        regressions = find_regressions(results, baseline_results, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
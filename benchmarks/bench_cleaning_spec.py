@@ -0,0 +1,69 @@
+"""
+Equivalence check and timing of the compiled cleaning specs (CleaningPlan) against the frozen per-table
+cleaners that preceded them (reference_cleaning.ReferenceCleaning), on the synthetic sources of synthetic_data.py.
+Each source gets duplicate rows that differ only in their kind of missing value (None, np.nan or pd.NA, see
+synthetic_data.add_mixed_null_duplicates), which both must drop alike.
+
+Every clean_* method is run on both, for every combination of the compact and native_dates options,
+and the outputs are compared with pandas.testing.assert_frame_equal, with its warnings about mismatched
+missing values counted as differences. The script exits with status 1 if any output differs.
+
+Usage:
+    python benchmarks/bench_cleaning_spec.py --rows 300000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from reference_cleaning import ReferenceCleaning
+from synthetic_data import SOURCES, add_mixed_null_duplicates
+
+OPTIONS = [{}, {'compact': True}, {'native_dates': True}, {'compact': True, 'native_dates': True}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=300000)
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    mismatches = 0
+    for option in OPTIONS:
+        for source in args.sources:
+            generate, clean_method, _ = SOURCES[source]
+            raw = add_mixed_null_duplicates(generate(args.rows, seed=args.seed), seed=args.seed)
+            outputs = {}
+            timings = {}
+            for name, cls in (('reference', ReferenceCleaning), ('spec', DataCleaning)):
+                cleaner = cls(**option)
+                start = time.perf_counter()
+                # The reference prints a line per weight it can't convert.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    outputs[name] = getattr(cleaner, clean_method)(raw.copy())
+                timings[name] = time.perf_counter() - start
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', FutureWarning)
+                    pd.testing.assert_frame_equal(outputs['spec'], outputs['reference'])
+                result = 'equal'
+            except (AssertionError, FutureWarning) as e:
+                mismatches += 1
+                result = f'DIFFERENT: {e}'
+            print(f"{source:<14}{str(option or ''):<40}rows={args.rows} reference={timings['reference']:.2f}s "
+                  f"spec={timings['spec']:.2f}s {result}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
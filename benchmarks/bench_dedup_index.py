@@ -0,0 +1,90 @@
+"""
+Memory and time of deduplication on row hashes (dedup_index) vs full-row DataFrame.duplicated, and of skipping
+rows loaded by an earlier run with a persisted RowHashIndex.
+
+For each source the script
+- compares duplicated_rows with DataFrame.duplicated on a raw frame (same result, time, peak traced memory),
+  with duplicate rows whose missing values mix None, np.nan and pd.NA appended;
+- records the cleaned rows of a first run in a RowHashIndex, then checks a second run that overlaps it by
+  --overlap skips exactly the overlapping rows, and prints the memory of the hash set against holding the
+  loaded rows for a full-row comparison.
+It exits with status 1 if a result differs.
+
+Usage:
+    python benchmarks/bench_dedup_index.py --rows 1000000 --bits 64
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from dedup_index import RowHashIndex, duplicated_rows
+from synthetic_data import SOURCES, add_mixed_null_duplicates
+
+
+def measure(func, *args):
+    """
+    Returns the result, wall time and peak traced memory in bytes of a call.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=['users', 'orders'])
+    parser.add_argument('--overlap', type=float, default=0.2, help='Fraction of the first run loaded again by the second.')
+    parser.add_argument('--bits', type=int, choices=[64, 128], default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cleaner = DataCleaning()
+    mismatches = 0
+    for source in args.sources:
+        generate, clean_method, table_name = SOURCES[source]
+        raw = add_mixed_null_duplicates(generate(args.rows, seed=args.seed), seed=args.seed)
+        expected, full_seconds, full_peak = measure(lambda df: df.duplicated().to_numpy(), raw)
+        result, hash_seconds, hash_peak = measure(duplicated_rows, raw)
+        same = np.array_equal(result, expected)
+        mismatches += not same
+        print(f"{source:<14}full rows {full_seconds:.2f}s {full_peak / 1024 ** 2:7.1f} MB   "
+              f"row hashes {hash_seconds:.2f}s {hash_peak / 1024 ** 2:7.1f} MB   "
+              f"saved {(full_peak - hash_peak) / 1024 ** 2:.1f} MB {'equal' if same else 'DIFFERENT'}")
+
+        clean = getattr(cleaner, clean_method)(raw).reset_index(drop=True)
+        split = int(len(clean) / (1 + args.overlap))
+        first_run, second_run = clean.iloc[:split], clean.iloc[int(split * (1 - args.overlap)):]
+        with tempfile.TemporaryDirectory() as index_dir:
+            RowHashIndex(index_dir, bits=args.bits).replace(table_name, first_run)
+            index = RowHashIndex(index_dir, bits=args.bits)
+            start = time.perf_counter()
+            unseen = index.unseen(table_name, second_run)
+            seconds = time.perf_counter() - start
+        # Full-row comparison; distinct raw rows can clean to equal rows, so this can exceed the overlap.
+        matched = second_run.merge(first_run.drop_duplicates(), how='left', indicator=True)['_merge']
+        expected_skipped = int((matched == 'both').sum())
+        skipped = int((~unseen).sum())
+        mismatches += skipped != expected_skipped
+        print(f"{'':<14}second run of {len(second_run)} rows: skipped {skipped} (expected {expected_skipped}) "
+              f"in {seconds:.2f}s")
+        index.print_memory_report()
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
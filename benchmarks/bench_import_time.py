@@ -0,0 +1,80 @@
+"""
+Import time of the project modules, measured with python -X importtime in fresh interpreters.
+
+For each module the best cumulative import time of --repeat runs is printed next to the import time of
+pandas, which every module needs and which is therefore the floor. The script exits with status 1 if
+importing a module pulls in one of the client libraries it should only import on use (boto3, tabula,
+requests, sqlalchemy, psycopg2), if DataCleaning() reads its credentials file when constructed, or if a
+module takes longer than --budget-ms.
+
+Usage:
+    python benchmarks/bench_import_time.py --repeat 5 --budget-ms 1000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Module -> top-level packages its import must not load.
+DEFERRED_IMPORTS = {
+    'data_cleaning': ['boto3', 'tabula', 'requests', 'sqlalchemy', 'psycopg2'],
+    'data_extraction': ['boto3', 'tabula', 'requests', 'sqlalchemy', 'psycopg2'],
+    'cleaning_spec': ['boto3', 'tabula', 'requests', 'sqlalchemy', 'psycopg2'],
+    'database_utils': ['boto3', 'tabula', 'requests'],
+    'pipeline': ['boto3', 'tabula', 'requests'],
+}
+
+
+def import_time(statement):
+    """
+    Runs a statement in a fresh interpreter with -X importtime and returns
+    (dict of module to cumulative import microseconds, stderr).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=REPO_DIR,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"'{statement}' failed:\n{result.stderr}")
+    times = {}
+    for match in re.finditer(r'^import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)$', result.stderr, re.MULTILINE):
+        times.setdefault(match.group(3), int(match.group(1)))
+    return times, result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', nargs='+', default=list(DEFERRED_IMPORTS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, help='Fail if a module takes longer than this to import.')
+    args = parser.parse_args()
+
+    failures = 0
+    pandas_ms = min(import_time('import pandas')[0]['pandas'] for _ in range(args.repeat)) / 1000
+    print(f"{'pandas':<18}{pandas_ms:8.1f} ms  (floor)")
+    for module in args.modules:
+        runs = [import_time(f'import {module}')[0] for _ in range(args.repeat)]
+        module_ms = min(times[module] for times in runs) / 1000
+        loaded = sorted(package for package in DEFERRED_IMPORTS.get(module, []) if package in runs[0])
+        over_budget = args.budget_ms is not None and module_ms > args.budget_ms
+        failures += bool(loaded) + over_budget
+        status = f"LOADS {', '.join(loaded)}" if loaded else 'ok'
+        print(f"{module:<18}{module_ms:8.1f} ms  {module_ms - pandas_ms:+7.1f} ms over pandas  "
+              f"{status}{'  OVER BUDGET' if over_budget else ''}")
+
+    # Constructing DataCleaning must not touch the credentials file or build engines.
+    try:
+        times, _ = import_time("from data_cleaning import DataCleaning; DataCleaning('does-not-exist.yaml')")
+        eager = sorted(package for package in ('sqlalchemy', 'psycopg2', 'yaml') if package in times)
+        print(f"DataCleaning()    {'imports ' + ', '.join(eager) if eager else 'lazy'}")
+    except RuntimeError:
+        eager = True
+        print("DataCleaning()    reads the credentials file")
+    failures += bool(eager)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Scaling of the partitioned DataCleaning mode (DataCleaning(workers=N)) over the single-process pandas backend.
+
+For each source and worker count the script cleans the same seeded synthetic frame, checks the result equals
+the single-process one (rows, order, index and dtypes) and prints the speedup and the parallel efficiency
+(speedup / workers). It exits with status 1 if any result differs.
+
+Usage:
+    python benchmarks/bench_partitioned_cleaning.py --rows 2000000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from synthetic_data import SOURCES
+
+
+def make_cleaner(workers):
+    return DataCleaning(workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=['users', 'orders'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    mismatches = 0
+    for source in args.sources:
+        generate, clean_method, _ = SOURCES[source]
+        raw = generate(args.rows, seed=args.seed)
+        start = time.perf_counter()
+        expected = getattr(make_cleaner(1), clean_method)(raw)
+        serial_seconds = time.perf_counter() - start
+        print(f"{source:<14}workers=1   {serial_seconds:7.2f}s")
+        for workers in [workers for workers in args.workers if workers > 1]:
+            start = time.perf_counter()
+            cleaned = getattr(make_cleaner(workers), clean_method)(raw)
+            seconds = time.perf_counter() - start
+            try:
+                pd.testing.assert_frame_equal(cleaned, expected)
+                result = 'equal'
+            except AssertionError:
+                result = 'DIFFERENT'
+                mismatches += 1
+            speedup = serial_seconds / seconds
+            print(f"{source:<14}workers={workers:<3} {seconds:7.2f}s speedup={speedup:.2f}x "
+                  f"efficiency={speedup / workers:.2f} {result}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares DataExtractor.retrieve_pdf_data reading the whole PDF in one tabula call with the
+parallel page-range mode, on a locally generated card details PDF. The parallel mode is run
+twice to show the gain from the warm worker JVMs.
+
+Requires reportlab (to generate the PDF), pypdf and jpype1 (in-process JVM for tabula).
+
+Usage:
+    python benchmarks/bench_pdf.py --pages 300 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_extraction import DataExtractor
+
+ROWS_PER_PAGE = 38
+
+
+def make_card_pdf(path, pages):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table
+
+    rows = [['card_number', 'expiry_date', 'card_provider', 'date_payment_confirmed']]
+    rows += [[str(4000000000000000 + i), '09/26', 'VISA 16 digit', '2015-11-25'] for i in range(pages * ROWS_PER_PAGE)]
+    SimpleDocTemplate(path, pagesize=A4).build([Table(rows, repeatRows=1)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--pages-per-task', type=int, default=10)
+    args = parser.parse_args()
+
+    extractor = DataExtractor()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'card_details.pdf')
+        make_card_pdf(pdf_path, args.pages)
+
+        start = time.perf_counter()
+        sequential = extractor.retrieve_pdf_data(pdf_path)
+        print(f'sequential            rows={len(sequential)} wall={time.perf_counter() - start:.2f}s')
+
+        for run in ('cold', 'warm'):
+            start = time.perf_counter()
+            parallel = extractor.retrieve_pdf_data(pdf_path, max_workers=args.workers,
+                                                   pages_per_task=args.pages_per_task)
+            print(f'parallel ({run}, {args.workers} workers) rows={len(parallel)} '
+                  f'wall={time.perf_counter() - start:.2f}s')
+        extractor.close_pdf_pool()
+
+    pd.testing.assert_frame_equal(parallel, sequential)
+    print('equivalent=True')
+
+
+if __name__ == '__main__':
+    main()
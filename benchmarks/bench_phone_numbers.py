@@ -0,0 +1,66 @@
+"""
+Compares DataCleaning._clean_phone_numbers (country-partitioned, one pass) with the previous
+implementation (one full-column astype(str) + regex match per country) on synthetic users
+spread across many countries, and checks both give the same result.
+
+Usage:
+    python benchmarks/bench_phone_numbers.py --rows 5000000 --countries 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import PHONE_NUMBER_RULES, DataCleaning
+
+PHONE_SAMPLES = ['+44(0)1134960435', '07700 900123', '(0161) 496 0674', '+49(0)047905948', '0306 125 4451',
+                 '+1-899-645-5312x', '(123)456-7890', '001-974-820-5690', 'abc', '12', '+49-4444-22333']
+
+
+def make_users(rows, countries, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = np.array(['GB', 'DE', 'US'] + [f'X{i}' for i in range(countries - 3)], dtype=object)
+    return pd.DataFrame({
+        'country_code': codes[rng.integers(0, len(codes), rows)],
+        'phone_number': np.array(PHONE_SAMPLES, dtype=object)[rng.integers(0, len(PHONE_SAMPLES), rows)],
+    })
+
+
+def clean_phone_numbers_per_country_mask(df):
+    for country_code, rule in PHONE_NUMBER_RULES.items():
+        df.loc[
+            (df["country_code"] == country_code) & (~df["phone_number"].astype(str).str.match(rule.pattern)),
+            "phone_number",
+        ] = np.nan
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--countries', type=int, default=40)
+    args = parser.parse_args()
+
+    cleaner = DataCleaning()
+    users = make_users(args.rows, args.countries)
+    expected = users.copy()
+
+    start = time.perf_counter()
+    clean_phone_numbers_per_country_mask(expected)
+    mask_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaner._clean_phone_numbers(users)
+    partitioned_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(users, expected)
+    print(f'rows={args.rows} countries={args.countries} equivalent=True')
+    print(f'per_country_mask={mask_time:.2f}s partitioned={partitioned_time:.2f}s '
+          f'speedup={mask_time / partitioned_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Cross-backend equivalence check and speedup benchmark of DataCleaning with backend='pandas'
+vs backend='polars' on the synthetic sources of synthetic_data.py.
+
+Every clean_* method is run on both backends, for each combination of the compact and native_dates
+options given, and the outputs are compared with pandas.testing.assert_frame_equal, with its warnings about
+mismatched missing values (None vs NaN) counted as differences. The sources of MIXED_COLUMNS are also run with
+part of a column turned into ints, as tabula and the store API return them. The script exits with status 1
+if any output differs.
+
+Usage:
+    python benchmarks/bench_polars_backend.py --rows 1000000
+    python benchmarks/bench_polars_backend.py --rows 100000 --all-options
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from synthetic_data import SOURCES
+
+# Source -> column of which every tenth all-digit value is made an int. product_name isn't read as text by any
+# operation, so the polars backend cleans products with a mixed product_name on pandas.
+MIXED_COLUMNS = {'card_details': 'card_number', 'store_details': 'staff_numbers', 'products': 'product_name'}
+
+
+def make_mixed(raw, column):
+    """
+    Returns a copy of a raw frame with every tenth all-digit value of a column, and ten other values, as ints.
+    """
+    raw = raw.copy()
+    values = raw[column].astype(object).to_numpy(copy=True)
+    digits = pd.Series(values).astype('string').str.fullmatch(r'\d{1,18}').fillna(False).to_numpy(dtype=bool)
+    for position in digits.nonzero()[0][::10]:
+        values[position] = int(values[position])
+    values[7::max(len(values) // 10, 1)] = 12
+    raw[column] = values
+    return raw
+
+
+def make_cleaner(backend, native_dates=False, compact=False):
+    return DataCleaning(native_dates=native_dates, compact=compact, backend=backend)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--all-options', action='store_true',
+                        help='Also compare with compact=True and native_dates=True.')
+    args = parser.parse_args()
+
+    options = [{}]
+    if args.all_options:
+        options += [{'compact': True}, {'native_dates': True}, {'compact': True, 'native_dates': True}]
+
+    cases = [(source, None) for source in args.sources]
+    cases += [(source, MIXED_COLUMNS[source]) for source in args.sources if source in MIXED_COLUMNS]
+    mismatches = 0
+    for option in options:
+        for source, mixed_column in cases:
+            generate, clean_method, _ = SOURCES[source]
+            raw = generate(args.rows, seed=args.seed)
+            if mixed_column:
+                raw = make_mixed(raw, mixed_column)
+            outputs = {}
+            timings = {}
+            for backend in ('pandas', 'polars'):
+                cleaner = make_cleaner(backend, **option)
+                start = time.perf_counter()
+                outputs[backend] = getattr(cleaner, clean_method)(raw.copy())
+                timings[backend] = time.perf_counter() - start
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', FutureWarning)
+                    pd.testing.assert_frame_equal(outputs['pandas'], outputs['polars'])
+                result = 'equal'
+            except (AssertionError, FutureWarning) as e:
+                mismatches += 1
+                result = f'DIFFERENT: {e}'
+            name = f'{source} ({mixed_column} mixed)' if mixed_column else source
+            print(f"{name:<36}{str(option or ''):<40}rows={args.rows} pandas={timings['pandas']:.2f}s "
+                  f"polars={timings['polars']:.2f}s speedup={timings['pandas'] / timings['polars']:.2f}x {result}")
+
+    print(f"CPU cores: {os.cpu_count()}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Timing and invalidation check of QueryResultCache on the original SQL_queries task queries.
+
+Synthetic star-schema tables are loaded into the database of --creds (its dim_* and orders_table tables are
+REPLACED, so point it at a scratch database). Every task runs cold, then again from the cache; then
+--reload is loaded again, which bumps its data version, and the tasks run a third time. Only the tasks
+reading the reloaded table may miss, and every cached result must equal the fresh one. The script exits
+with status 1 otherwise.
+
+Usage:
+    python benchmarks/bench_query_cache.py --creds local_db_creds.yaml --orders 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bench_rollups import PRIMARY_KEYS, as_strings, make_star_schema
+from database_utils import DatabaseConnector
+from query_cache import QueryResultCache, query_tables
+from rollups import QUERY_DIR, TASK_QUERIES
+
+
+def run_tasks(cache, connector, queries):
+    """
+    Runs every task query through the cache and returns the task names that missed, the results and the time.
+    """
+    misses, results = [], {}
+    start = time.perf_counter()
+    for task_name, query in queries.items():
+        before = cache.misses
+        results[task_name] = cache.run_query(connector, query)
+        if cache.misses > before:
+            misses.append(task_name)
+    return misses, results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--creds', required=True, help='YAML credentials of a scratch PostgreSQL database.')
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--reload', default='dim_store_details', help='Table reloaded between the cached runs.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    connector = DatabaseConnector(args.creds)
+    tables = make_star_schema(args.orders, seed=args.seed)
+    with connector.db_engine.begin() as conn:
+        for table_name in tables:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{table_name}" CASCADE')
+    for table_name, df in tables.items():
+        connector.upload_to_db(df, table_name, use_copy=True)
+    with connector.db_engine.begin() as conn:
+        for table_name, primary_key in PRIMARY_KEYS.items():
+            conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD PRIMARY KEY ({primary_key})')
+
+    queries = {}
+    for task_name in TASK_QUERIES:
+        with open(os.path.join(QUERY_DIR, 'SQL_query_tasks', f'{task_name}.sql'), 'r') as file:
+            queries[task_name] = file.read()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = QueryResultCache(cache_dir)
+        _, fresh, cold_seconds = run_tasks(cache, connector, queries)
+        warm_misses, cached, warm_seconds = run_tasks(cache, connector, queries)
+        print(f"cold {cold_seconds * 1000:.1f} ms, warm {warm_seconds * 1000:.1f} ms, warm misses {warm_misses}")
+        failures += bool(warm_misses)
+
+        connector.upload_to_db(tables[args.reload], args.reload, use_copy=True)
+        expected = [task_name for task_name, query in queries.items() if args.reload in query_tables(query)]
+        reload_misses, reloaded, reload_seconds = run_tasks(cache, connector, queries)
+        print(f"after reloading {args.reload}: {reload_seconds * 1000:.1f} ms, misses {reload_misses}, "
+              f"expected {expected}")
+        failures += reload_misses != expected
+
+    for task_name in queries:
+        for results in (cached, reloaded):
+            if results[task_name][0] != fresh[task_name][0] or \
+                    as_strings(results[task_name][1]) != as_strings(fresh[task_name][1]):
+                print(f"{task_name}: cached result DIFFERS from the fresh one")
+                failures += 1
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares peak memory of DataExtractor.read_rds_table and read_rds_table_chunks + clean_in_chunks
+on a synthetic orders table in a local SQLite stand-in for the RDS database.
+
+Each mode runs in its own subprocess so the reported peak RSS is not shared between them.
+
+Usage:
+    python benchmarks/bench_rds_chunks.py --rows 10000000 --chunksize 100000
+"""
+import argparse
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def build_orders_table(db_path, rows, batch=200000):
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE orders_table ("index" INTEGER, level_0 INTEGER, date_uuid TEXT, first_name TEXT, '
+                 'last_name TEXT, user_uuid TEXT, card_number TEXT, store_code TEXT, product_code TEXT, '
+                 '"1" REAL, product_quantity INTEGER)')
+    for start in range(0, rows, batch):
+        conn.executemany('INSERT INTO orders_table VALUES (?,?,?,?,?,?,?,?,?,?,?)', [
+            (i, i, str(uuid.UUID(int=i)), 'first', 'last', str(uuid.UUID(int=i * 7)), str(4000000000000000 + i),
+             f'ST-{i % 400:06d}', f'P{i % 1000:06d}', None, i % 10 + 1)
+            for i in range(start, min(start + batch, rows))])
+    conn.commit()
+    conn.close()
+
+
+def run_mode(db_path, mode, chunksize):
+    from sqlalchemy import create_engine
+    from data_cleaning import DataCleaning
+    from data_extraction import DataExtractor
+
+    extractor = DataExtractor()
+    # The SQLite engine stands in for the RDS connection.
+    extractor.db_engine = create_engine(f'sqlite:///{db_path}')
+    cleaner = DataCleaning()
+
+    start = time.perf_counter()
+    if mode == 'full':
+        rows = len(cleaner.clean_orders_data(extractor.read_rds_table('orders_table')))
+    else:
+        chunks = extractor.read_rds_table_chunks('orders_table', chunksize=chunksize)
+        rows = sum(len(chunk) for chunk in cleaner.clean_in_chunks(chunks, cleaner.clean_orders_data))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'mode={mode:<7} rows={rows} wall={elapsed:.1f}s peak_rss={peak_mb:.0f}MB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--mode', choices=['full', 'chunked'])
+    parser.add_argument('--db')
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.db, args.mode, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'rds.sqlite')
+        build_orders_table(db_path, args.rows)
+        for mode in ('full', 'chunked'):
+            subprocess.run([sys.executable, __file__, '--mode', mode, '--db', db_path,
+                            '--chunksize', str(args.chunksize)], check=True)
+
+
+if __name__ == '__main__':
+    main()
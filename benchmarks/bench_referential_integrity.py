@@ -0,0 +1,115 @@
+"""
+Orphan detection of the referential integrity check (referential_integrity.quarantine_orphans) on synthetic
+star-schema tables.
+
+The cleaned orders reference the cleaned dimensions, some UUIDs in upper case, and --orphan-fraction of the
+orders get a key missing from one dimension. The script times building the key indexes and the anti-join,
+and checks the quarantined rows are exactly the injected orphans. With --creds the five dimensions and the
+unchecked orders are loaded into that database (its dim_* and orders_table tables are REPLACED, so point it
+at a scratch database) and the foreign keys added, then the checked orders are loaded and the foreign keys
+added again: every one must be added. The script exits with status 1 if a check fails.
+
+Usage:
+    python benchmarks/bench_referential_integrity.py --orders 1000000 --creds local_db_creds.yaml
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from referential_integrity import build_key_indexes, find_orphans, foreign_keys, quarantine_orphans
+from synthetic_data import SOURCES, _uuids
+
+# Value given to each foreign key column of the orders injected as orphans.
+ORPHAN_VALUES = {'store_code': 'ST-MISSING', 'product_code': 'A8-MISSING', 'card_number': 1}
+
+
+def make_tables(orders, orphan_fraction, seed=0):
+    """
+    Returns the cleaned dimension tables, the cleaned orders referencing them and the mask of orphan orders.
+    """
+    cleaner = DataCleaning()
+    rng = np.random.default_rng(seed)
+    keys = foreign_keys('orders_table')
+    dimensions = {}
+    for generate, clean_method, table_name in SOURCES.values():
+        if table_name == 'orders_table':
+            continue
+        rows = orders // 10 if table_name != 'dim_date_times' else orders
+        key = next(key[3] for key in keys if key[2] == table_name)
+        df = getattr(cleaner, clean_method)(generate(rows, seed=seed))
+        dimensions[table_name] = df.dropna(subset=[key]).drop_duplicates(subset=[key]).reset_index(drop=True)
+
+    generate, clean_method, _ = SOURCES['orders']
+    orders_table = getattr(cleaner, clean_method)(generate(orders, seed=seed)).reset_index(drop=True)
+    orphans = np.zeros(len(orders_table), dtype=bool)
+    for _, column, referenced_table, referenced_column, uuid in keys:
+        candidates = dimensions[referenced_table][referenced_column]
+        if orders_table[column].dtype.kind == 'i':
+            # Card numbers of 19 digits or with a leading zero don't survive the int64 orders column.
+            candidates = candidates[(candidates.str.len() < 19) & ~candidates.str.startswith('0')]
+        values = rng.choice(candidates.to_numpy(), len(orders_table))
+        if uuid:
+            upper = rng.random(len(values)) < 0.01
+            values[upper] = np.char.upper(values[upper].astype(str))
+        values = pd.Series(values).astype(orders_table[column].dtype)
+        missing = rng.random(len(values)) < orphan_fraction
+        values[missing] = _uuids(rng, missing.sum()) if uuid else ORPHAN_VALUES[column]
+        orders_table[column] = values
+        orphans |= missing
+    return dimensions, orders_table, orphans
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--orphan-fraction', type=float, default=0.001, help='Fraction of orphans per foreign key.')
+    parser.add_argument('--creds', help='YAML credentials of a scratch PostgreSQL database.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dimensions, orders_table, expected = make_tables(args.orders, args.orphan_fraction, seed=args.seed)
+    keys = foreign_keys('orders_table')
+    start = time.perf_counter()
+    indexes = build_key_indexes(keys, dimensions)
+    index_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    orphans, _ = find_orphans(orders_table, keys, indexes)
+    join_seconds = time.perf_counter() - start
+    print(f"{len(orders_table)} orders, {len(keys)} foreign keys: key indexes {index_seconds * 1000:.1f} ms "
+          f"({sum(len(index) for index in indexes.values())} keys), anti-join {join_seconds * 1000:.1f} ms")
+    failures = 0
+    if not np.array_equal(orphans, expected):
+        print(f"found {orphans.sum()} orphans, expected {expected.sum()}: DIFFERENT")
+        failures += 1
+    else:
+        print(f"found the {expected.sum()} injected orphans")
+
+    with tempfile.TemporaryDirectory() as quarantine_dir:
+        checked = quarantine_orphans('orders_table', orders_table, dimensions, quarantine_dir)
+        quarantined = pd.read_csv(os.path.join(quarantine_dir, 'orders_table.csv'))
+        failures += len(quarantined) != expected.sum() or quarantined['reason'].isna().any()
+
+    if args.creds:
+        from database_utils import DatabaseConnector
+        connector = DatabaseConnector(args.creds)
+        for table_name, df in dimensions.items():
+            failures += not connector.upload_typed_table(df, table_name)
+        for orders, expect_all in ((orders_table, False), (checked, True)):
+            failures += not connector.upload_typed_table(orders, 'orders_table')
+            added = connector.add_foreign_keys(['orders_table'])
+            print(f"{'checked' if expect_all else 'unchecked'} orders: {len(added)} of {len(keys)} foreign keys added")
+            failures += expect_all and len(added) != len(keys)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
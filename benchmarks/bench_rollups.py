@@ -0,0 +1,115 @@
+"""
+Equivalence check and timing of the SQL_queries tasks answered from the rollup tables of rollups.py
+vs the original task queries over orders_table and the dimension tables.
+
+Synthetic, cleaned star-schema tables are loaded into the database of --creds (its dim_* and orders_table
+tables are REPLACED, so point it at a scratch database, e.g. a local PostgreSQL). The rollups are built
+from the first part of the orders, then the rest is appended with upsert_to_db and merged in with an
+incremental refresh. Every task is then run both ways and the sorted rows compared; the script exits
+with status 1 if any differ.
+
+Usage:
+    python benchmarks/bench_rollups.py --creds local_db_creds.yaml --orders 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from database_utils import DatabaseConnector
+from rollups import QUERY_DIR, TASK_QUERIES, RollupManager
+from synthetic_data import make_date_times, make_orders, make_products, make_store_details
+
+WEB_STORE_CODE = 'WEB-1388012W'
+PRIMARY_KEYS = {'dim_store_details': 'store_code', 'dim_products': 'product_code', 'dim_date_times': 'date_uuid'}
+
+
+def make_star_schema(orders, seed=0):
+    """
+    Returns cleaned store, product, date and order tables whose orders reference the dimension keys.
+    """
+    cleaner = DataCleaning()
+    stores = cleaner.clean_store_data(make_store_details(450, seed=seed)).reset_index(drop=True)
+    stores.loc[stores['store_type'] == 'Web Portal', 'store_code'] = WEB_STORE_CODE
+    products = cleaner.clean_products_data(make_products(1800, seed=seed)).reset_index(drop=True)
+    products['product_price'] = products['product_price'].str.replace('£', '', regex=False).astype(float)
+    date_times = cleaner.clean_date_times(make_date_times(int(orders * 1.1), seed=seed)).dropna().reset_index(drop=True)
+    orders_table = cleaner.clean_orders_data(make_orders(orders, seed=seed)).reset_index(drop=True)
+
+    rng = np.random.default_rng(seed)
+    orders_table = orders_table.iloc[:len(date_times)].copy()
+    orders_table['date_uuid'] = rng.permutation(date_times['date_uuid'].to_numpy())[:len(orders_table)]
+    orders_table['store_code'] = rng.choice(stores['store_code'].to_numpy(), len(orders_table))
+    # A few orders reference products missing from dim_products, which the inner joins of the tasks drop.
+    orders_table['product_code'] = rng.choice(np.append(products['product_code'].to_numpy(), 'A8-MISSING'),
+                                              len(orders_table))
+    return {'dim_store_details': stores, 'dim_products': products, 'dim_date_times': date_times,
+            'orders_table': orders_table}
+
+
+def as_strings(rows):
+    """
+    Returns the rows as sorted lists of strings, as they are written to the result CSV files.
+    """
+    return sorted([str(value) for value in row] for row in rows)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--creds', required=True, help='YAML credentials of a scratch PostgreSQL 15+ database.')
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--new-fraction', type=float, default=0.05,
+                        help='Fraction of the orders appended after the rollups are built.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    connector = DatabaseConnector(args.creds)
+    rollups = RollupManager(connector)
+    tables = make_star_schema(args.orders, seed=args.seed)
+    orders = tables.pop('orders_table')
+    split = int(len(orders) * (1 - args.new_fraction))
+    for table_name, df in tables.items():
+        connector.upload_to_db(df, table_name, use_copy=True)
+    connector.upload_to_db(orders.iloc[:split], 'orders_table', use_copy=True)
+    with connector.db_engine.begin() as conn:
+        # The primary keys schema/*.sql adds to the dimension tables.
+        for table_name, primary_key in PRIMARY_KEYS.items():
+            conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD PRIMARY KEY ({primary_key})')
+
+    _, rebuild_seconds = timed(rollups.rebuild)
+    connector.upsert_to_db(orders.iloc[split:], 'orders_table')
+    _, refresh_seconds = timed(rollups.refresh, 'orders_table', orders.iloc[split:])
+    print(f"rebuild on {split} orders: {rebuild_seconds:.2f}s, "
+          f"incremental refresh with {len(orders) - split} new orders: {refresh_seconds:.2f}s")
+
+    mismatches = 0
+    for task_name in TASK_QUERIES:
+        with open(os.path.join(QUERY_DIR, 'SQL_query_tasks', f'{task_name}.sql'), 'r') as file:
+            (_, expected), base_seconds = timed(connector.run_query, file.read())
+        (_, rows), rollup_seconds = timed(rollups.answer_task, task_name)
+        if as_strings(rows) == as_strings(expected):
+            result = 'equal'
+        elif as_strings(row[-1:] for row in rows) == as_strings(row[-1:] for row in expected):
+            # ORDER BY ... LIMIT may keep different rows among ties of the ordered measure.
+            result = 'equal up to ties'
+        else:
+            result = f'DIFFERENT\n    expected {as_strings(expected)}\n    got      {as_strings(rows)}'
+            mismatches += 1
+        print(f"{task_name}: base tables {base_seconds * 1000:8.1f} ms  rollups {rollup_seconds * 1000:6.1f} ms  {result}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmarks DataExtractor.retrieve_stores_data against a local stub HTTP server,
+comparing sequential and concurrent wall time.
+
+Usage:
+    python benchmarks/bench_stores_api.py --stores 3000 --workers 32 --latency 0.005
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_extraction import DataExtractor
+
+
+def make_handler(latency):
+    class StoreHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            store_number = int(self.path.rsplit('/', 1)[-1])
+            body = json.dumps({'index': store_number, 'store_code': f'ST-{store_number:06d}',
+                               'country_code': 'GB', 'staff_numbers': '12'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StoreHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stores', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.005, help='Simulated server latency in seconds.')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f'http://127.0.0.1:{server.server_port}/store_details/'
+
+    # The database connector is only created on first use, so no credentials are needed.
+    extractor = DataExtractor()
+    for workers in (1, args.workers):
+        start = time.perf_counter()
+        stores, failures = extractor.retrieve_stores_data(endpoint, args.stores, {}, max_workers=workers,
+                                                          return_failures=True)
+        elapsed = time.perf_counter() - start
+        print(f'workers={workers:<3} stores={len(stores)} failures={len(failures)} wall={elapsed:.2f}s')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
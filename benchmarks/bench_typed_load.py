@@ -0,0 +1,78 @@
+"""
+Load time of the star-schema tables with the old flow, upload_to_db followed by the schema/*.sql ALTER, UPDATE
+and DELETE statements, vs DatabaseConnector.upload_typed_table, which creates the tables with their final
+column types before the COPY.
+
+The tables of --creds named like the star schema are REPLACED, so point it at a scratch database. For each
+table the script checks that both flows end with the same column types and row count, and exits with status 1
+if any differ.
+
+Usage:
+    python benchmarks/bench_typed_load.py --creds local_db_creds.yaml --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+from database_utils import DatabaseConnector, plan_typed_load, read_schema_statements
+from synthetic_data import SOURCES
+
+
+def table_shape(connector, table_name):
+    """
+    Returns the (column, type) list and row count of a table.
+    """
+    columns = connector.run_query(f"SELECT column_name, data_type, character_maximum_length "
+                                   f"FROM information_schema.columns WHERE table_name = '{table_name}' "
+                                   f"ORDER BY column_name")[1]
+    return columns, connector.run_query(f'SELECT COUNT(*) FROM "{table_name}"')[1][0][0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--creds', required=True, help='YAML credentials of a scratch PostgreSQL database.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    connector = DatabaseConnector(args.creds)
+    cleaner = DataCleaning()
+    schema_statements = read_schema_statements()
+    with connector.db_engine.begin() as conn:
+        # Foreign keys from an earlier run would stop upload_to_db from dropping the referenced tables.
+        for table_name in schema_statements:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{table_name}" CASCADE')
+
+    mismatches = 0
+    for source in args.sources:
+        generate, clean_method, table_name = SOURCES[source]
+        clean = getattr(cleaner, clean_method)(generate(args.rows, seed=args.seed))
+        _, replayed, primary_keys, _ = plan_typed_load(schema_statements.get(table_name, []), [])
+
+        start = time.perf_counter()
+        connector.upload_to_db(clean, table_name, use_copy=True)
+        with connector.db_engine.begin() as conn:
+            # Without planning, every statement of the script runs on the loaded table, in order.
+            connector._execute_statements(conn, replayed + primary_keys)
+        alter_seconds = time.perf_counter() - start
+        altered = table_shape(connector, table_name)
+
+        start = time.perf_counter()
+        connector.upload_typed_table(clean, table_name)
+        typed_seconds = time.perf_counter() - start
+        typed = table_shape(connector, table_name)
+
+        mismatches += altered != typed
+        print(f"{table_name:<18}rows={len(clean):<9} load+alter={alter_seconds:.2f}s typed={typed_seconds:.2f}s "
+              f"speedup={alter_seconds / typed_seconds:.2f}x {'same schema' if altered == typed else 'DIFFERENT'}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares upload throughput (rows/sec) of DatabaseConnector.upload_to_db with the default
+to_sql INSERT path and the COPY FROM STDIN path against a local PostgreSQL database.
+
+Usage:
+    python benchmarks/bench_upload.py --creds db_creds.yaml --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from database_utils import DatabaseConnector
+
+
+def make_orders(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date_uuid': [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, rows)],
+        'user_uuid': [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, rows)],
+        'card_number': rng.integers(10**15, 10**16, rows).astype(str),
+        'store_code': [f'ST-{i:06d}' for i in rng.integers(0, 450, rows)],
+        'product_code': [f'P{i:06d}' for i in rng.integers(0, 1800, rows)],
+        'product_quantity': rng.integers(1, 15, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--creds', required=True, help='YAML file with the RDS_* credentials of the target database.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--table', default='bench_orders_table')
+    args = parser.parse_args()
+
+    connector = DatabaseConnector(args.creds)
+    orders = make_orders(args.rows)
+    for use_copy in (False, True):
+        start = time.perf_counter()
+        connector.upload_to_db(orders, args.table, use_copy=use_copy)
+        elapsed = time.perf_counter() - start
+        print(f"path={'copy' if use_copy else 'to_sql':<7} rows={args.rows} wall={elapsed:.2f}s "
+              f"throughput={args.rows / elapsed:,.0f} rows/sec")
+
+
+if __name__ == '__main__':
+    main()
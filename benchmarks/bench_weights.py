@@ -0,0 +1,54 @@
+"""
+Checks that the vectorized DataCleaning._convert_weights_to_kg matches the row-by-row
+_clean_and_convert_weight and compares their wall time on synthetic product weights.
+
+Usage:
+    python benchmarks/bench_weights.py --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+
+WEIGHT_SAMPLES = ['1.6kg', '590g', '12 x 100g', '3 x 2g', '77g .', '1,2kg', '16oz', '400ml', '0.5',
+                  '8 x 85g', 'x 5g', 'ax 5g', '9GO1', '1.2.3kg', '', 'kg', '100 G', '2 x 1,5 kg', '1e3 x 2g']
+
+
+def make_weights(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.array(WEIGHT_SAMPLES, dtype=object)[rng.integers(0, len(WEIGHT_SAMPLES), rows)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    cleaner = DataCleaning()
+    weights = make_weights(args.rows)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = weights.apply(cleaner._clean_and_convert_weight).astype(float)
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result, failed = cleaner._convert_weights_to_kg(weights)
+    vectorized_time = time.perf_counter() - start
+
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_exact=True)
+    assert failed.equals(expected.isna())
+    print(f'rows={args.rows} failures={int(failed.sum())} equivalent=True')
+    print(f'apply={apply_time:.2f}s vectorized={vectorized_time:.2f}s speedup={apply_time / vectorized_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Frozen copy of the per-table cleaners DataCleaning had before the declarative cleaning specs
+(cleaning_spec.py) and the vectorized helpers, used by bench_cleaning_spec.py as the reference output
+of every clean_* method.
+
+The clean_* methods and every helper they call are kept as they were in the baseline: dates are parsed with
+pd.to_datetime(format='mixed'), phone numbers are checked with one .loc mask per country and weights are
+converted row by row with Series.apply. Only the constructor and the helpers of the changes below are
+inherited from DataCleaning.
+
+The output changes made on purpose since are marked where they are applied:
+- card numbers failing the provider length or Luhn checks are dropped (DataCleaning._card_number_rejections);
+- dim_date_times gets the sale_ts column, computed here like the original SQL task with
+  TO_TIMESTAMP(CONCAT(year, '-', month, '-', day, ' ', timestamp));
+- the native_dates option keeps parsed dates as datetime64, and the compact option converts the cleaned frame
+  with DataCleaning._compact_dtypes.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_cleaning import DataCleaning
+
+
+class ReferenceCleaning(DataCleaning):
+    """
+    This class cleans the sources with the step-by-step cleaners that preceded the cleaning specs.
+    """
+
+    def _clean_country_code(self, df):
+        df.loc[df.country_code.str.len() > 2, 'country_code'] = np.nan
+        df.country_code = df.country_code.astype('string')
+
+    def _clean_dates(self, df, columns):
+        for column_name in columns:
+            df[column_name] = pd.to_datetime(df[column_name], format='mixed', errors='coerce')
+            if not self.native_dates:
+                df[column_name] = df[column_name].dt.strftime('%Y-%m-%d')
+
+    def _clean_phone_numbers(self, df):
+        uk_regex = r"^(?:(?:\+44\s?\(0\)\s?\d{2,4}|\(?\d{2,5}\)?)\s?\d{3,4}\s?\d{3,4}$|\d{10,11}|\+44\s?\d{2,5}\s?\d{3,4}\s?\d{3,4})$"
+        de_regex = r"(\(?([\d \-\)\–\+\/\(]+){6,}\)?([ .\-–\/]?)([\d]+))"
+        us_regex = r"\(?\d{3}\)?-? *\d{3}-? *-?\d{4}"
+
+        df.loc[(df["country_code"] == "GB") & (~df["phone_number"].astype(str).str.match(uk_regex)),
+               "phone_number"] = np.nan
+        df.loc[(df["country_code"] == "DE") & (~df["phone_number"].astype(str).str.match(de_regex)),
+               "phone_number"] = np.nan
+        df.loc[(df["country_code"] == "US") & (~df["phone_number"].astype(str).str.match(us_regex)),
+               "phone_number"] = np.nan
+
+    def _clean_uuids(self, df, columns):
+        for column_name in columns:
+            uuid_pattern = r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
+            df.loc[:, column_name] = df[column_name].astype('string')
+            df.loc[~df[column_name].str.match(uuid_pattern), column_name] = np.nan
+
+    def _clean_card_providers(self, df, column_name, categories):
+        df.loc[~df[column_name].isin(categories), column_name] = np.nan
+        if self.compact:
+            df[column_name] = df[column_name].astype(pd.CategoricalDtype(categories))
+        else:
+            df[column_name] = df[column_name].astype('string')
+
+    def _clean_card_numbers(self, df):
+        df['card_number'] = df['card_number'].astype('string')
+        df['card_number'] = df['card_number'].str.replace('?', '')
+        # Changed since the baseline: provider length and Luhn checks instead of the r'^\d+$' match.
+        rejected = self._card_number_rejections(df['card_number'], df['card_provider']).notna().to_numpy()
+        df['card_number'] = df['card_number'].where(~rejected, np.nan)
+
+    def _clean_lat_and_long(self, store_data, columns):
+        for column in columns:
+            store_data[column] = pd.to_numeric(store_data[column], errors='coerce')
+            if not self.compact:
+                store_data[column] = store_data[column].astype('string')
+
+    def _convert_product_weights(self, products_data):
+        products_data['weight'] = products_data['weight'].apply(self._clean_and_convert_weight)
+        return products_data
+
+    def _clean_and_convert_weight(self, weight):
+        try:
+            quantity, weight_str = self._extract_quantity_and_weight(weight)
+
+            cleaned_weight = ''.join(char for char in str(weight_str) if char.isdigit() or char in ['.', ','])
+
+            cleaned_weight = float(cleaned_weight.replace(',', '.'))
+
+            original_unit = str(weight_str).lower()
+            if 'kg' in original_unit:
+                cleaned_weight_kg = float(cleaned_weight)
+            elif 'g' in original_unit:
+                cleaned_weight_kg = float(cleaned_weight / 1000)
+            elif 'oz' in original_unit:
+                cleaned_weight_kg = float(cleaned_weight / 35.274)
+            elif 'ml' in original_unit:
+                cleaned_weight_kg = float(cleaned_weight / 1000)
+            else:
+                cleaned_weight_kg = float(cleaned_weight)
+
+            if quantity:
+                cleaned_weight_kg *= float(quantity)
+
+            return cleaned_weight_kg
+        except (ValueError, TypeError):
+            print('error with converting to kg')
+            return None
+
+    def _extract_quantity_and_weight(self, weight):
+        parts = weight.split('x', 1)
+        quantity = parts[0].strip() if len(parts) > 1 else None
+        weight_str = parts[-1].strip()
+        return quantity, weight_str
+
+    def _clean_date_numbers(self, sales_data, columns):
+        for column in columns:
+            sales_data[column] = pd.to_numeric(sales_data[column], errors='coerce', downcast='integer')
+            sales_data[column] = sales_data[column].astype('Int64')
+            if not self.compact:
+                sales_data[column] = sales_data[column].astype('string')
+
+    def clean_user_data(self, user_data):
+        user_data = user_data.dropna().drop_duplicates()
+
+        self._clean_country_code(user_data)
+        self._clean_dates(user_data, ['join_date', 'date_of_birth'])
+        self._clean_phone_numbers(user_data)
+        self._clean_uuids(user_data, ['user_uuid'])
+        if self.compact:
+            self._compact_dtypes(user_data, 'users')
+        return user_data
+
+    def clean_card_data(self, card_data):
+        self._clean_card_providers(card_data, 'card_provider',
+                                   categories=['Diners Club / Carte Blanche', 'American Express', 'JCB 16 digit',
+                                               'JCB 15 digit', 'Maestro', 'Mastercard', 'Discover',
+                                               'VISA 19 digit', 'VISA 16 digit', 'VISA 13 digit'])
+        self._clean_card_numbers(card_data)
+        card_data["date_payment_confirmed"] = pd.to_datetime(
+            card_data["date_payment_confirmed"], format="mixed", errors="coerce"
+        )
+        if not self.native_dates:
+            card_data["date_payment_confirmed"] = card_data["date_payment_confirmed"].dt.date
+        card_data["expiry_date"] = pd.to_datetime(
+            card_data["expiry_date"], format="%m/%y", errors='coerce'
+        )
+        card_data = card_data.dropna().drop_duplicates()
+
+        if self.compact:
+            self._compact_dtypes(card_data, 'card_details')
+        return card_data
+
+    def clean_store_data(self, store_data):
+        store_data = store_data.drop(columns=['index', 'lat'])
+        store_data = store_data.drop_duplicates()
+        store_data.iloc[0] = store_data.iloc[0].fillna("N/A")
+        store_data.loc[~store_data["country_code"].isin(["DE", "US", "GB"]), "country_code"] = np.nan
+
+        store_data.loc[store_data["continent"] == "eeEurope", "continent"] = "Europe"
+        store_data.loc[store_data["continent"] == "eeAmerica", "continent"] = "America"
+
+        store_data['staff_numbers'] = pd.to_numeric(store_data['staff_numbers'], errors='coerce').fillna(0).astype(int)
+        self._clean_dates(store_data, ['opening_date'])
+        self._clean_lat_and_long(store_data, ['longitude', 'latitude'])
+        self._clean_card_providers(store_data, 'store_type',
+                                   categories=['Web Portal', 'Local', 'Super Store', 'Mall Kiosk', 'Outlet'])
+
+        if self.compact:
+            self._compact_dtypes(store_data, 'store_details')
+        return store_data
+
+    def clean_products_data(self, products_data):
+        products_data = products_data.dropna().drop_duplicates()
+
+        self._clean_dates(products_data, ['date_added'])
+        self._convert_product_weights(products_data)
+        self._clean_uuids(products_data, ['uuid'])
+        self._clean_card_providers(products_data, 'category',
+                                   categories=['toys-and-games', 'sports-and-leisure', 'pets', 'homeware',
+                                               'health-and-beauty', 'food-and-drink', 'diy'])
+        products_data = products_data.rename(columns={'removed': 'availabilty'})
+        products_data.availabilty = products_data.availabilty.replace('Still_avaliable', 'Still_available')
+        self._clean_card_providers(products_data, 'availabilty', categories=['Still_available', 'Removed'])
+
+        if self.compact:
+            self._compact_dtypes(products_data, 'products')
+        return products_data
+
+    def clean_orders_data(self, orders_table):
+        orders_table = orders_table.drop(columns=['level_0', 'first_name', 'last_name', '1'])
+        orders_table = orders_table.drop_duplicates().dropna()
+
+        orders_table.product_quantity = pd.to_numeric(orders_table.product_quantity, errors='coerce',
+                                                      downcast='integer')
+        self._clean_uuids(orders_table, ['date_uuid', 'user_uuid'])
+
+        orders_table.dropna(inplace=True)
+        if self.compact:
+            self._compact_dtypes(orders_table, 'orders')
+        return orders_table
+
+    def clean_date_times(self, sales_data):
+        sales_data = sales_data.dropna().drop_duplicates()
+        sales_data.timestamp = pd.to_datetime(sales_data.timestamp, format='%H:%M:%S', errors='coerce').dt.time
+        self._clean_card_providers(sales_data, 'time_period', categories=['Evening', 'Morning', 'Midday', 'Late_Hours'])
+        self._clean_uuids(sales_data, ['date_uuid'])
+        self._clean_date_numbers(sales_data, ['month', 'year', 'day'])
+
+        # Added since the baseline: the sale_ts column of dim_date_times.
+        text = (sales_data['year'].astype('string') + '-' + sales_data['month'].astype('string') + '-' +
+                sales_data['day'].astype('string') + ' ' + sales_data['timestamp'].astype(str))
+        sales_data['sale_ts'] = pd.to_datetime(text, format='%Y-%m-%d %H:%M:%S', errors='coerce').astype('M8[ns]')
+
+        if self.compact:
+            self._compact_dtypes(sales_data, 'date_times')
+        return sales_data
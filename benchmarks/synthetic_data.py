@@ -0,0 +1,288 @@
+"""
+Seeded synthetic versions of the six raw sources, shaped like the frames DataExtractor returns
+and carrying the kinds of dirt DataCleaning handles: misspelled continents ('eeEurope'),
+'?' in card numbers, card numbers with a wrong length or Luhn check digit, mixed weight units
+and multipacks, bad UUIDs, NULL rows, random-string rows in every enumerated column,
+mixed date formats and duplicated rows.
+
+Every generator is vectorized, so 10M rows are generated in seconds, and returns the same
+frame for the same (rows, seed).
+"""
+import numpy as np
+import pandas as pd
+
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+DIRT_FRACTION = 0.02
+
+
+def _choice(rng, values, rows, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=rows, p=p)]
+
+
+def _uuids(rng, rows):
+    """
+    Returns random version 4 style UUID strings, built as one uint8 character matrix instead of a uuid per row.
+    """
+    nibbles = rng.integers(0, 16, size=(rows, 32), dtype=np.uint8)
+    characters = np.full((rows, 36), ord('-'), dtype=np.uint8)
+    positions = [i for i in range(36) if i not in (8, 13, 18, 23)]
+    characters[:, positions] = HEX_DIGITS[nibbles]
+    return characters.view('S36').ravel().astype(str).astype(object)
+
+
+def _codes(prefix, numbers, width):
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width)).astype(object)
+
+
+def _dates(rng, rows, start='1950-01-01', end='2023-01-01'):
+    """
+    Returns date strings in the formats seen in the sources, mostly ISO.
+    """
+    days = pd.to_datetime(start) + pd.to_timedelta(rng.integers(0, (pd.Timestamp(end) - pd.Timestamp(start)).days, rows),
+                                                   unit='D')
+    formats = rng.choice(4, size=rows, p=[0.9, 0.04, 0.03, 0.03])
+    dates = np.asarray(days.strftime('%Y-%m-%d'), dtype=object)
+    for code, date_format in ((1, '%Y/%m/%d'), (2, '%Y %B %d'), (3, '%B %Y %d')):
+        selected = formats == code
+        dates[selected] = np.asarray(days[selected].strftime(date_format), dtype=object)
+    return dates
+
+
+def _garbage(rng, rows, length=10):
+    """
+    Returns random upper-case strings like the ones the sources contain in place of whole rows.
+    """
+    characters = rng.choice(np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', dtype=np.uint8), size=(rows, length))
+    return characters.view(f'S{length}').ravel().astype(str).astype(object)
+
+
+def _dirty_rows(rng, df, columns, fraction=DIRT_FRACTION):
+    """
+    Overwrites a fraction of the rows with random strings (every column listed) and another fraction
+    with 'NULL', then appends duplicates of some rows.
+    """
+    rows = len(df)
+    garbage = np.flatnonzero(rng.random(rows) < fraction)
+    for column in columns:
+        df.iloc[garbage, df.columns.get_loc(column)] = _garbage(rng, len(garbage))
+    nulls = np.flatnonzero(rng.random(rows) < fraction / 2)
+    df.iloc[nulls, [df.columns.get_loc(column) for column in columns]] = 'NULL'
+    duplicates = rng.choice(rows, size=int(rows * fraction), replace=False) if rows else []
+    return pd.concat([df, df.iloc[duplicates]], ignore_index=True)
+
+
+def _bad_uuids(rng, uuids, fraction=DIRT_FRACTION):
+    uuids = uuids.copy()
+    bad = np.flatnonzero(rng.random(len(uuids)) < fraction)
+    uuids[bad] = np.char.add(uuids[bad].astype(str), 'x').astype(object)
+    return uuids
+
+
+def make_users(rows, seed=0):
+    """
+    Rows like the legacy_users RDS table.
+    """
+    rng = np.random.default_rng(seed)
+    countries = rng.choice(3, size=rows, p=[0.6, 0.25, 0.15])
+    country_codes = np.array(['GB', 'DE', 'US'], dtype=object)[countries]
+    country_codes[rng.random(rows) < DIRT_FRACTION / 2] = 'GGB'
+    numbers = rng.integers(10 ** 9, 10 ** 10, size=rows).astype(str).astype(object)
+    phone_numbers = np.where(countries == 0, np.char.add('0', numbers.astype(str)).astype(object),
+                             np.where(countries == 1, np.char.add('+49 ', numbers.astype(str)).astype(object),
+                                      np.char.add('(', numbers.astype(str)).astype(object)))
+    phone_numbers[rng.random(rows) < DIRT_FRACTION] = 'abc-phone'
+    df = pd.DataFrame({
+        'first_name': _choice(rng, ['Sigfried', 'Guy', 'Harry', 'Darren', 'Ann'], rows),
+        'last_name': _choice(rng, ['Noack', 'Allen', 'Lawrence', 'Hussain', 'Lee'], rows),
+        'date_of_birth': _dates(rng, rows, '1940-01-01', '2006-01-01'),
+        'company': _choice(rng, ['Heydrich Junitz KG', 'Fox Ltd', 'Johnson, Jones and Harris'], rows),
+        'email_address': _choice(rng, ['rudi79@winkler.de', 'danielharris@hotmail.com', 'tina@gmail.com'], rows),
+        'address': _choice(rng, ['Zimmerstr. 1/0\n59015 Gießen', 'Studio 22a\nLake Janet\nEH5 1PJ'], rows),
+        'country': np.array(['United Kingdom', 'Germany', 'United States'], dtype=object)[countries],
+        'country_code': country_codes,
+        'phone_number': phone_numbers,
+        'join_date': _dates(rng, rows, '1992-01-01', '2023-01-01'),
+        'user_uuid': _bad_uuids(rng, _uuids(rng, rows)),
+    })
+    return _dirty_rows(rng, df, ['first_name', 'country', 'country_code', 'company', 'join_date'])
+
+
+CARD_PROVIDER_LENGTHS = {'Diners Club / Carte Blanche': 14, 'American Express': 15, 'JCB 16 digit': 16,
+                         'JCB 15 digit': 15, 'Maestro': 12, 'Mastercard': 16, 'Discover': 16, 'VISA 19 digit': 19,
+                         'VISA 16 digit': 16, 'VISA 13 digit': 13}
+
+
+def make_card_details(rows, seed=0):
+    """
+    Rows like the tables read from the card details PDF, including the header rows repeated on every page.
+    """
+    rng = np.random.default_rng(seed)
+    providers = _choice(rng, list(CARD_PROVIDER_LENGTHS), rows)
+    lengths = pd.Series(providers).map(CARD_PROVIDER_LENGTHS).to_numpy(dtype=np.int64)
+    digits = rng.integers(0, 10, size=(rows, 19), dtype=np.uint8)
+    card_numbers = np.empty(rows, dtype=object)
+    for length in np.unique(lengths):
+        selected = np.flatnonzero(lengths == length)
+        number_digits = digits[selected, :length].copy()
+        # Luhn check digit: every second digit left of it is doubled (minus 9 above 9).
+        doubled = number_digits[:, length - 2::-2] * 2
+        checksum = number_digits[:, length - 3::-2].sum(axis=1) if length > 2 else 0
+        checksum = checksum + (doubled - 9 * (doubled > 9)).sum(axis=1)
+        number_digits[:, length - 1] = (10 - checksum % 10) % 10
+        card_numbers[selected] = (number_digits + ord('0')).view(f'S{length}').ravel().astype(str)
+    wrong_check_digit = np.flatnonzero(rng.random(rows) < DIRT_FRACTION)
+    card_numbers[wrong_check_digit] = [number[:-1] + str((int(number[-1]) + 1) % 10)
+                                       for number in card_numbers[wrong_check_digit]]
+    truncated = np.flatnonzero(rng.random(rows) < DIRT_FRACTION)
+    card_numbers[truncated] = [number[:-1] for number in card_numbers[truncated]]
+    question_marks = rng.random(rows) < DIRT_FRACTION
+    card_numbers[question_marks] = np.char.add('???', card_numbers[question_marks].astype(str)).astype(object)
+    expiry = np.char.add(np.char.add(np.char.zfill(rng.integers(1, 13, rows).astype(str), 2), '/'),
+                         rng.integers(22, 32, rows).astype(str)).astype(object)
+    df = pd.DataFrame({
+        'card_number': card_numbers,
+        'expiry_date': expiry,
+        'card_provider': providers,
+        'date_payment_confirmed': _dates(rng, rows, '1990-01-01', '2023-01-01'),
+    })
+    headers = np.flatnonzero(rng.random(rows) < 0.005)
+    df.iloc[headers] = ['card_number', 'expiry_date', 'card_provider', 'date_payment_confirmed']
+    return _dirty_rows(rng, df, ['card_number', 'expiry_date', 'card_provider', 'date_payment_confirmed'])
+
+
+def make_store_details(rows, seed=0):
+    """
+    Rows like the frame DataExtractor.retrieve_stores_data builds from the store API JSON.
+    The first row is the web portal, which has no address or coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    countries = rng.choice(3, size=rows, p=[0.6, 0.25, 0.15])
+    staff_numbers = rng.integers(1, 100, rows).astype(str).astype(object)
+    typos = np.flatnonzero(rng.random(rows) < DIRT_FRACTION)
+    staff_numbers[typos] = np.char.add(staff_numbers[typos].astype(str), 'e').astype(object)
+    continents = np.array(['Europe', 'Europe', 'America'], dtype=object)[countries]
+    misspelled = rng.random(rows) < DIRT_FRACTION
+    continents[misspelled] = np.char.add('ee', continents[misspelled].astype(str)).astype(object)
+    df = pd.DataFrame({
+        'index': np.arange(rows),
+        'address': _choice(rng, ['Flat 72W\nSally isle\nEast Deantown\nE7B 8EB', '04 Clark Street\nJohnsonville'], rows),
+        'longitude': np.round(rng.uniform(-180, 180, rows), 5).astype(str).astype(object),
+        'lat': None,
+        'locality': _choice(rng, ['High Wycombe', 'Aberdeen', 'Freiburg', 'Los Angeles'], rows),
+        'store_code': _codes('ST-', np.arange(rows), 8),
+        'staff_numbers': staff_numbers,
+        'opening_date': _dates(rng, rows, '1990-01-01', '2023-01-01'),
+        'store_type': _choice(rng, ['Local', 'Super Store', 'Mall Kiosk', 'Outlet'], rows),
+        'latitude': np.round(rng.uniform(-90, 90, rows), 5).astype(str).astype(object),
+        'country_code': np.array(['GB', 'DE', 'US'], dtype=object)[countries],
+        'continent': continents,
+    })
+    df.iloc[0, [df.columns.get_loc(column) for column in ('address', 'longitude', 'latitude', 'locality')]] = None
+    df.iloc[0, df.columns.get_loc('store_type')] = 'Web Portal'
+    return _dirty_rows(rng, df, ['address', 'locality', 'store_type', 'country_code', 'continent'])
+
+
+def make_products(rows, seed=0):
+    """
+    Rows like the products CSV on S3.
+    """
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.uniform(0.05, 20, rows), 2).astype(str).astype(object)
+    units = rng.choice(4, size=rows, p=[0.45, 0.35, 0.1, 0.1])
+    weights = np.char.add(amounts.astype(str), np.array(['kg', 'g', 'ml', 'oz'])[units]).astype(object)
+    multipacks = np.flatnonzero(rng.random(rows) < 0.03)
+    weights[multipacks] = np.char.add(np.char.add(rng.integers(2, 13, len(multipacks)).astype(str), ' x '),
+                                      rng.integers(10, 500, len(multipacks)).astype(str))
+    weights[multipacks] = np.char.add(weights[multipacks].astype(str), 'g').astype(object)
+    trailing = np.flatnonzero(rng.random(rows) < 0.005)
+    weights[trailing] = np.char.add(weights[trailing].astype(str), ' .').astype(object)
+    df = pd.DataFrame({
+        'product_name': _choice(rng, ['FurReal Dazzlin Dimples', 'Tiffany Lamp', 'Chicken Thighs'], rows),
+        'product_price': np.char.add('£', np.round(rng.uniform(0.5, 500, rows), 2).astype(str)).astype(object),
+        'weight': weights,
+        'category': _choice(rng, ['toys-and-games', 'sports-and-leisure', 'pets', 'homeware', 'health-and-beauty',
+                                  'food-and-drink', 'diy'], rows),
+        'EAN': rng.integers(10 ** 12, 10 ** 13, rows).astype(str).astype(object),
+        'date_added': _dates(rng, rows, '1995-01-01', '2023-01-01'),
+        'uuid': _bad_uuids(rng, _uuids(rng, rows)),
+        'removed': _choice(rng, ['Still_avaliable', 'Removed'], rows, p=[0.9, 0.1]),
+        'product_code': _codes('A8-', np.arange(rows), 8),
+    })
+    return _dirty_rows(rng, df, ['product_name', 'weight', 'category', 'removed'])
+
+
+def make_orders(rows, seed=0):
+    """
+    Rows like the orders_table RDS table, read with DataExtractor.read_rds_table.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'level_0': np.arange(rows),
+        'date_uuid': _bad_uuids(rng, _uuids(rng, rows)),
+        'first_name': None,
+        'last_name': None,
+        'user_uuid': _bad_uuids(rng, _uuids(rng, rows)),
+        'card_number': rng.integers(10 ** 11, 10 ** 16, rows),
+        'store_code': _codes('ST-', rng.integers(0, 450, rows), 8),
+        'product_code': _codes('A8-', rng.integers(0, 1800, rows), 8),
+        '1': np.nan,
+        'product_quantity': rng.integers(1, 15, rows),
+    })
+    df.index.name = 'index'
+    duplicates = rng.choice(rows, size=int(rows * DIRT_FRACTION), replace=False)
+    return pd.concat([df, df.iloc[duplicates]])
+
+
+def make_date_times(rows, seed=0):
+    """
+    Rows like the date details JSON.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 24 * 3600, rows)
+    timestamps = pd.to_datetime(seconds, unit='s').strftime('%H:%M:%S').to_numpy(dtype=object)
+    hours = seconds // 3600
+    time_periods = np.select([hours < 6, hours < 12, hours < 18], ['Late_Hours', 'Morning', 'Midday'],
+                             'Evening').astype(object)
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'month': rng.integers(1, 13, rows).astype(str).astype(object),
+        'year': rng.integers(1992, 2023, rows).astype(str).astype(object),
+        'day': rng.integers(1, 29, rows).astype(str).astype(object),
+        'time_period': time_periods,
+        'date_uuid': _bad_uuids(rng, _uuids(rng, rows)),
+    })
+    return _dirty_rows(rng, df, ['timestamp', 'month', 'year', 'day', 'time_period'])
+
+
+def add_mixed_null_duplicates(df, rows=100, seed=0):
+    """
+    Appends two duplicates of some rows, after setting a text column of each picked row to None and the same
+    column of its duplicates to np.nan and pd.NA, the missing values the sources mix. drop_duplicates treats
+    the three alike, so the duplicates must be dropped wherever the original rows are.
+    """
+    rng = np.random.default_rng(seed)
+    columns = [position for position, dtype in enumerate(df.dtypes) if dtype == object]
+    picked = rng.choice(len(df), size=min(rows, len(df)), replace=False)
+    df = df.copy()
+    originals = []
+    for row, column in zip(picked, rng.choice(columns, size=len(picked))):
+        df.iat[row, column] = None
+        originals.append((row, column))
+    copies = []
+    for missing in (np.nan, pd.NA):
+        duplicates = df.iloc[picked].copy()
+        for position, (_, column) in enumerate(originals):
+            duplicates.iat[position, column] = missing
+        copies.append(duplicates)
+    return pd.concat([df] + copies, ignore_index=isinstance(df.index, pd.RangeIndex))
+
+
+# Source name -> (generator, DataCleaning method, target table).
+SOURCES = {
+    'users': (make_users, 'clean_user_data', 'dim_users'),
+    'card_details': (make_card_details, 'clean_card_data', 'dim_card_details'),
+    'store_details': (make_store_details, 'clean_store_data', 'dim_store_details'),
+    'products': (make_products, 'clean_products_data', 'dim_products'),
+    'orders': (make_orders, 'clean_orders_data', 'orders_table'),
+    'date_times': (make_date_times, 'clean_date_times', 'dim_date_times'),
+}
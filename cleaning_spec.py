@@ -0,0 +1,380 @@
+import numpy as np
+import pandas as pd
+from dedup_index import duplicated_rows
+
+UUID_PATTERN = r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
+
+CARD_PROVIDERS = ['Diners Club / Carte Blanche', 'American Express', 'JCB 16 digit', 'JCB 15 digit', 'Maestro',
+                  'Mastercard', 'Discover', 'VISA 19 digit', 'VISA 16 digit', 'VISA 13 digit']
+STORE_TYPES = ['Web Portal', 'Local', 'Super Store', 'Mall Kiosk', 'Outlet']
+PRODUCT_CATEGORIES = ['toys-and-games', 'sports-and-leisure', 'pets', 'homeware', 'health-and-beauty',
+                      'food-and-drink', 'diy']
+AVAILABILITIES = ['Still_available', 'Removed']
+TIME_PERIODS = ['Evening', 'Morning', 'Midday', 'Late_Hours']
+
+# Enumerated columns stored as categorical dtype in compact mode.
+CATEGORY_COLUMNS = ['country_code', 'continent', 'store_type', 'category', 'card_provider', 'time_period', 'availabilty']
+
+# Declarative cleaning spec of each source table. Keys, in the order the compiled plan applies them:
+# - drop_columns / rename: column selection, done as one copy.
+# - row_filter: 'dropna' and/or 'drop_duplicates' before the column operations, fused into one row mask.
+# - fill_first_row: value for the missing fields of the first row (the web store).
+# - columns: column -> list of (operation, *arguments), see COLUMN_OPERATIONS.
+# - final_filter: like row_filter, after the column operations.
+# - derived_columns: new column -> (operation, *columns it is computed from), see DERIVED_OPERATIONS;
+#   added last, from the cleaned columns.
+CLEANING_SPECS = {
+    'users': {
+        'row_filter': ['dropna', 'drop_duplicates'],
+        'columns': {
+            'country_code': [('max_length', 2), ('dtype', 'string')],
+            'join_date': [('date',)],
+            'date_of_birth': [('date',)],
+            'phone_number': [('phone', 'country_code')],
+            'user_uuid': [('regex', UUID_PATTERN)],
+        },
+    },
+    'card_details': {
+        'columns': {
+            'card_provider': [('categories', CARD_PROVIDERS)],
+            'card_number': [('dtype', 'string'), ('remove', '?'), ('card_check', 'card_provider')],
+            'date_payment_confirmed': [('date', 'date_objects')],
+            'expiry_date': [('date_format', '%m/%y')],
+        },
+        'final_filter': ['dropna', 'drop_duplicates'],
+    },
+    'store_details': {
+        'drop_columns': ['index', 'lat'],
+        'row_filter': ['drop_duplicates'],
+        'fill_first_row': 'N/A',
+        'columns': {
+            'country_code': [('allowed', ['DE', 'US', 'GB'])],
+            'continent': [('replace', {'eeEurope': 'Europe', 'eeAmerica': 'America'})],
+            'staff_numbers': [('integer', 0)],
+            'opening_date': [('date',)],
+            'longitude': [('coordinate',)],
+            'latitude': [('coordinate',)],
+            'store_type': [('categories', STORE_TYPES)],
+        },
+    },
+    'products': {
+        'rename': {'removed': 'availabilty'},
+        'row_filter': ['dropna', 'drop_duplicates'],
+        'columns': {
+            'date_added': [('date',)],
+            'weight': [('weight',)],
+            'uuid': [('regex', UUID_PATTERN)],
+            'category': [('categories', PRODUCT_CATEGORIES)],
+            'availabilty': [('replace', {'Still_avaliable': 'Still_available'}), ('categories', AVAILABILITIES)],
+        },
+    },
+    'orders': {
+        'drop_columns': ['level_0', 'first_name', 'last_name', '1'],
+        'row_filter': ['drop_duplicates', 'dropna'],
+        'columns': {
+            'product_quantity': [('numeric_downcast',)],
+            'date_uuid': [('regex', UUID_PATTERN)],
+            'user_uuid': [('regex', UUID_PATTERN)],
+        },
+        'final_filter': ['dropna'],
+    },
+    'date_times': {
+        'row_filter': ['dropna', 'drop_duplicates'],
+        'columns': {
+            'timestamp': [('time_format', '%H:%M:%S')],
+            'time_period': [('categories', TIME_PERIODS)],
+            'date_uuid': [('regex', UUID_PATTERN)],
+            'month': [('date_number',)],
+            'year': [('date_number',)],
+            'day': [('date_number',)],
+        },
+        'derived_columns': {
+            'sale_ts': ('timestamp', 'year', 'month', 'day', 'timestamp'),
+        },
+    },
+}
+
+
+def _max_length(values, frame, cleaner, max_length):
+    return values.where(~(values.str.len() > max_length), np.nan)
+
+
+def _dtype(values, frame, cleaner, dtype):
+    return values.astype(dtype)
+
+
+def _remove(values, frame, cleaner, characters):
+    return values.str.replace(characters, '', regex=False)
+
+
+def _regex(values, frame, cleaner, pattern):
+    # Values that don't match become missing; the column keeps its dtype.
+    matches = values.astype('string').str.match(pattern).fillna(False).to_numpy(dtype=bool)
+    return values.where(matches, np.nan)
+
+
+def _allowed(values, frame, cleaner, allowed):
+    return values.where(values.isin(allowed), np.nan)
+
+
+def _categories(values, frame, cleaner, categories):
+    values = _allowed(values, frame, cleaner, categories)
+    return values.astype(pd.CategoricalDtype(categories) if cleaner.compact else 'string')
+
+
+def _replace(values, frame, cleaner, replacements):
+    return values.replace(replacements)
+
+
+def _date(values, frame, cleaner, output='strings'):
+    dates = cleaner._parse_dates(values)
+    if cleaner.native_dates:
+        return dates
+    return dates.dt.date if output == 'date_objects' else dates.dt.strftime('%Y-%m-%d')
+
+
+def _date_format(values, frame, cleaner, date_format):
+    return pd.to_datetime(values, format=date_format, errors='coerce')
+
+
+def _time_format(values, frame, cleaner, time_format):
+    return pd.to_datetime(values, format=time_format, errors='coerce').dt.time
+
+
+def _integer(values, frame, cleaner, fill_value):
+    return pd.to_numeric(values, errors='coerce').fillna(fill_value).astype(int)
+
+
+def _numeric_downcast(values, frame, cleaner):
+    return pd.to_numeric(values, errors='coerce', downcast='integer')
+
+
+def _coordinate(values, frame, cleaner):
+    values = pd.to_numeric(values, errors='coerce')
+    return values if cleaner.compact else values.astype('string')
+
+
+def _date_number(values, frame, cleaner):
+    values = pd.to_numeric(values, errors='coerce', downcast='integer').astype('Int64')
+    return values if cleaner.compact else values.astype('string')
+
+
+def _weight(values, frame, cleaner):
+    weights, cleaner.weight_conversion_failures = cleaner._convert_weights_to_kg(values)
+    failure_count = int(cleaner.weight_conversion_failures.sum())
+    if failure_count:
+        print(f'error with converting {failure_count} weights to kg')
+    return weights
+
+
+def _card_check(values, frame, cleaner, provider_column):
+    rejections = cleaner._card_number_rejections(values, frame[provider_column])
+    rejected = rejections.notna().to_numpy()
+    cleaner.card_number_rejections = rejections[rejected]
+    if rejected.any():
+        counts = ', '.join(f'{reason}={count}' for reason, count in cleaner.card_number_rejections.value_counts().items())
+        print(f'rejected {int(rejected.sum())} card numbers: {counts}')
+    return values.where(~rejected, np.nan)
+
+
+def _phone(values, frame, cleaner, country_code_column):
+    invalid = cleaner._invalid_phone_numbers(frame[country_code_column], values)
+    return values.where(~invalid, np.nan)
+
+
+def _timestamp(frame, cleaner, year_column, month_column, day_column, time_column):
+    # Vectorized TO_TIMESTAMP(CONCAT(year, '-', month, '-', day, ' ', timestamp)): the date parts are combined
+    # as datetime64 offsets, so impossible dates like 2020-02-31 become NaT instead of rolling over.
+    year, month, day = (frame[column].astype('float64').to_numpy()
+                        for column in (year_column, month_column, day_column))
+    valid = ~(np.isnan(year) | np.isnan(month) | np.isnan(day)) & (month >= 1) & (month <= 12) & (day >= 1)
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype('int64').astype('M8[M]')
+    dates = months.astype('M8[D]') + np.where(valid, day - 1, 0).astype('int64').astype('m8[D]')
+    valid &= dates.astype('M8[M]') == months
+    # The time of day column holds datetime.time objects, so only its distinct values (at most 86400)
+    # are parsed as offsets, instead of reading the fields of every row in Python.
+    codes, times = pd.factorize(frame[time_column])
+    offsets = pd.to_timedelta(pd.Index(times).astype(str), errors='coerce').to_numpy().astype('m8[s]')
+    seconds = offsets.take(codes) if len(offsets) else np.full(len(codes), np.timedelta64('NaT'), dtype='m8[s]')
+    seconds[codes < 0] = np.timedelta64('NaT')
+    timestamps = dates.astype('M8[s]') + seconds
+    return pd.Series(np.where(valid, timestamps, np.datetime64('NaT')).astype('M8[ns]'), index=frame.index)
+
+
+# Operation name -> function(values, frame, cleaner, *arguments).
+COLUMN_OPERATIONS = {
+    'max_length': _max_length,
+    'dtype': _dtype,
+    'remove': _remove,
+    'regex': _regex,
+    'allowed': _allowed,
+    'categories': _categories,
+    'replace': _replace,
+    'date': _date,
+    'date_format': _date_format,
+    'time_format': _time_format,
+    'integer': _integer,
+    'numeric_downcast': _numeric_downcast,
+    'coordinate': _coordinate,
+    'date_number': _date_number,
+    'weight': _weight,
+    'card_check': _card_check,
+    'phone': _phone,
+}
+
+# Operations whose first argument is another column they read, which must be cleaned first.
+COLUMN_READING_OPERATIONS = {'card_check', 'phone'}
+
+# Derived column operation name -> function(frame, cleaner, *columns) returning the new column.
+DERIVED_OPERATIONS = {
+    'timestamp': _timestamp,
+}
+
+
+class CleaningPlan():
+    """
+    This class is a cleaning spec compiled into the minimal sequence of frame and column operations.
+
+    - Dropped and renamed columns are selected with one copy.
+    - dropna and drop_duplicates are fused into one row mask and one take.
+    - Each column's operations run on the column Series and are assigned back once,
+      in an order where columns read by other operations (e.g. country_code for phone) are cleaned first.
+    - Derived columns are computed from the cleaned columns after the final filter.
+
+    Parameters:
+    - spec (dict): Cleaning spec, see CLEANING_SPECS.
+    """
+
+    def __init__(self, spec):
+        """
+        Compiles the spec, raising ValueError on unknown keys, filters or operations.
+
+        Parameters:
+        - spec (dict): Cleaning spec, see CLEANING_SPECS.
+        """
+        known_keys = {'drop_columns', 'rename', 'row_filter', 'fill_first_row', 'columns', 'final_filter',
+                      'derived_columns'}
+        unknown_keys = set(spec) - known_keys
+        if unknown_keys:
+            raise ValueError(f"Unknown cleaning spec keys: {sorted(unknown_keys)}")
+
+        self.drop_columns = list(spec.get('drop_columns', []))
+        self.rename = dict(spec.get('rename', {}))
+        self.row_filter = self._compile_filter(spec.get('row_filter', []))
+        self.fill_first_row = spec.get('fill_first_row')
+        self.final_filter = self._compile_filter(spec.get('final_filter', []))
+        self.column_steps = self._compile_columns(spec.get('columns', {}))
+        self.derived_columns = self._compile_derived(spec.get('derived_columns', {}))
+
+    def _compile_filter(self, row_filter):
+        """
+        Returns the set of row filters to fuse into one mask.
+        dropna and drop_duplicates commute (duplicates are identical, including their missing values).
+        """
+        unknown_filters = set(row_filter) - {'dropna', 'drop_duplicates'}
+        if unknown_filters:
+            raise ValueError(f"Unknown row filters: {sorted(unknown_filters)}")
+        return set(row_filter)
+
+    def _compile_columns(self, columns):
+        """
+        Returns a list of (column, [(function, arguments), ...]) ordered so that every column
+        is cleaned after the columns its operations read.
+        """
+        steps = {}
+        reads = {}
+        for column, operations in columns.items():
+            steps[column] = []
+            reads[column] = set()
+            for name, *arguments in operations:
+                if name not in COLUMN_OPERATIONS:
+                    raise ValueError(f"Unknown cleaning operation '{name}' for column '{column}'")
+                steps[column].append((COLUMN_OPERATIONS[name], arguments))
+                if name in COLUMN_READING_OPERATIONS and arguments[0] in columns:
+                    reads[column].add(arguments[0])
+
+        ordered = []
+        visiting = set()
+
+        def visit(column):
+            if column in ordered:
+                return
+            if column in visiting:
+                raise ValueError(f"Cyclic column dependency at '{column}'")
+            visiting.add(column)
+            for dependency in sorted(reads[column]):
+                visit(dependency)
+            visiting.discard(column)
+            ordered.append(column)
+
+        for column in columns:
+            visit(column)
+        return [(column, steps[column]) for column in ordered]
+
+    @staticmethod
+    def _compile_derived(derived_columns):
+        """
+        Returns a list of (column, function, source columns) for the derived columns.
+        """
+        derived = []
+        for column, (name, *arguments) in derived_columns.items():
+            if name not in DERIVED_OPERATIONS:
+                raise ValueError(f"Unknown derived column operation '{name}' for column '{column}'")
+            derived.append((column, DERIVED_OPERATIONS[name], arguments))
+        return derived
+
+    @staticmethod
+    def _filter_rows(df, row_filter):
+        """
+        Applies the fused dropna / drop_duplicates row mask with a single take.
+        Duplicates are found on row hashes, see dedup_index.duplicated_rows.
+        """
+        keep = np.ones(len(df), dtype=bool)
+        if 'dropna' in row_filter:
+            keep &= df.notna().all(axis=1).to_numpy()
+        if 'drop_duplicates' in row_filter:
+            keep &= ~duplicated_rows(df)
+        return df.take(np.flatnonzero(keep))
+
+    def run(self, cleaner, df):
+        """
+        Runs the plan on a DataFrame and returns the cleaned DataFrame.
+
+        Parameters:
+        - cleaner (DataCleaning): Provides the parsing helpers and the native_dates / compact options.
+        - df (pd.DataFrame): Raw DataFrame.
+        """
+        if self.drop_columns or self.rename:
+            df = df.drop(columns=self.drop_columns)
+            df.columns = [self.rename.get(column, column) for column in df.columns]
+        if self.row_filter:
+            df = self._filter_rows(df, self.row_filter)
+        if self.fill_first_row is not None:
+            df.iloc[0] = df.iloc[0].fillna(self.fill_first_row)
+
+        for column, operations in self.column_steps:
+            values = df[column]
+            for function, arguments in operations:
+                values = function(values, df, cleaner, *arguments)
+            df[column] = values
+
+        if self.final_filter:
+            df = self._filter_rows(df, self.final_filter)
+        for column, function, arguments in self.derived_columns:
+            df[column] = function(df, cleaner, *arguments)
+        return df
+
+
+COMPILED_PLANS = {}
+
+
+def get_cleaning_plan(table_name):
+    """
+    Returns the compiled CleaningPlan of a table in CLEANING_SPECS, compiling it on first use.
+
+    Parameters:
+    - table_name (str): Key of the table in CLEANING_SPECS.
+    """
+    if table_name not in COMPILED_PLANS:
+        COMPILED_PLANS[table_name] = CleaningPlan(CLEANING_SPECS[table_name])
+    return COMPILED_PLANS[table_name]
@@ -1,7 +1,62 @@
-from database_utils import DatabaseConnector
-from data_extraction import DataExtractor
+from cleaning_spec import CATEGORY_COLUMNS, get_cleaning_plan
+from dedup_index import row_hashes
+from functools import cached_property
+from instrumentation import instrument_stage
 import numpy as np
 import pandas as pd
+import re
+
+# Compiled phone number regex per country_code, used by DataCleaning._clean_phone_numbers.
+PHONE_NUMBER_RULES = {}
+
+
+def register_phone_rule(country_code, regex):
+    """
+    Registers (or replaces) the phone number regex of a country.
+
+    Parameters:
+    - country_code (str): Two-letter country code as found in the country_code column.
+    - regex (str): Pattern a valid phone number must match from its start.
+    """
+    PHONE_NUMBER_RULES[country_code] = re.compile(regex)
+
+
+register_phone_rule("GB", r"^(?:(?:\+44\s?\(0\)\s?\d{2,4}|\(?\d{2,5}\)?)\s?\d{3,4}\s?\d{3,4}$|\d{10,11}|\+44\s?\d{2,5}\s?\d{3,4}\s?\d{3,4})$")
+register_phone_rule("DE", r"(\(?([\d \-\)\–\+\/\(]+){6,}\)?([ .\-–\/]?)([\d]+))")
+register_phone_rule("US", r"\(?\d{3}\)?-? *\d{3}-? *-?\d{4}")
+
+# Number of digits of the card numbers of each provider.
+CARD_NUMBER_LENGTHS = {
+    'JCB 16 digit': 16,
+    'VISA 16 digit': 16,
+    'Mastercard': 16,
+    'Discover': 16,
+    'Diners Club / Carte Blanche': 14,
+    'American Express': 15,
+    'JCB 15 digit': 15,
+    'Maestro': 12,
+    'VISA 19 digit': 19,
+    'VISA 13 digit': 13
+}
+
+# Luhn checksum value of a doubled digit, indexed by the digit.
+LUHN_DOUBLED_DIGITS = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+
+# Engines the cleaning specs can run on, see DataCleaning._apply_cleaning_spec.
+CLEANING_BACKENDS = ('pandas', 'polars')
+
+# Key in cleaning_spec.CLEANING_SPECS of the spec each clean_* method applies.
+CLEAN_METHOD_SPECS = {
+    'clean_user_data': 'users',
+    'clean_card_data': 'card_details',
+    'clean_store_data': 'store_details',
+    'clean_products_data': 'products',
+    'clean_orders_data': 'orders',
+    'clean_date_times': 'date_times'
+}
+
+# Explicit date formats tried in order by DataCleaning._parse_dates before falling back to format='mixed'.
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%Y %B %d', '%B %Y %d', '%Y-%m-%d %H:%M:%S']
 
 
 class DataCleaning():
@@ -9,154 +64,246 @@ class DataCleaning():
     This class contains methods to clean data from various sources.
     """
 
-    def __init__(self):
+    def __init__(self, creds_file=".../db_creds.yaml", native_dates=False, compact=False, backend='pandas', workers=1):
         """
         Initializes the DataCleaning instance.
-        """
-        self.db_connector = DatabaseConnector(".../db_creds.yaml")
-        self.db_extractor = DataExtractor()
 
-    def _clean_country_code(self, df):
-            """
-            Cleans country_code column:
-            - Removes incorrect codes by setting len
-            - Sets to string type
+        Parameters:
+        - creds_file (str): Path to the YAML file containing the source database credentials.
+        - native_dates (bool): If True, cleaned date columns keep the datetime64 dtype instead of
+          being converted back to 'YYYY-MM-DD' strings.
+        - compact (bool): If True, cleaned frames use categorical, Arrow-backed string and downcast
+          numeric dtypes (requires pyarrow). The savings are kept in self.memory_report.
+        - backend (str): 'pandas', or 'polars' to run the clean_* methods on the multi-threaded polars engine
+          (requires polars and pyarrow). Both backends return the same DataFrames.
+        - workers (int): If above 1, large frames are cleaned by the pandas backend in this many worker processes,
+          see partitioned_cleaning.clean_partitioned. The result is the same as with one process.
+        """
+        if backend not in CLEANING_BACKENDS:
+            raise ValueError(f"Unknown cleaning backend '{backend}', expected one of {CLEANING_BACKENDS}")
+        if workers > 1 and backend != 'pandas':
+            raise ValueError("workers > 1 requires the pandas backend, the polars backend is already multi-threaded")
+        self.native_dates = native_dates
+        self.compact = compact
+        self.backend = backend
+        self.workers = workers
+        self.memory_report = {}
+        self.creds_file = creds_file
 
-            Parameters:
-            - df (pd.DataFrame): dataframe containing country_code column.
-            """
-            df.loc[df.country_code.str.len() > 2, 'country_code'] = np.nan
-            df.country_code = df.country_code.astype('string')
+    @cached_property
+    def db_extractor(self):
+        """
+        Extractor of the source database, created on first use, e.g. by load_rds_table_incrementally.
+        """
+        from data_extraction import DataExtractor
+        return DataExtractor(self.creds_file)
 
-    def _clean_dates(self, df, columns):
+    @cached_property
+    def db_connector(self):
         """
-        Cleans date data by  putting it in the Year-Month-Day format.
-        
-        Parameters:
-        - df (pd.DataFrame): dataframe containing columns.
-        - columns (arr): array of column names.
+        Connector of the source database, shared with db_extractor so the credentials are read once.
         """
-        for column_name in columns:
-            df[column_name] = pd.to_datetime(df[column_name], format='mixed', errors='coerce')
-            df[column_name] = df[column_name].dt.strftime('%Y-%m-%d')
+        return self.db_extractor.db_connector
 
-    def _clean_phone_numbers(self, df):
+    @instrument_stage
+    def _parse_dates(self, values, formats=DATE_FORMATS):
         """
-        Clean and validate phone numbers in a DataFrame based on country codes using regular expressions (regex).
+        Parses a Series of dates and returns it as datetime64, unparseable values become NaT.
+
+        Each format in formats is tried as one vectorized pass over the values still unparsed;
+        only the residual values are parsed with the slow per-element format='mixed' inference.
 
         Parameters:
-        - df (pandas DataFrame): The DataFrame containing 'country_code' and 'phone_number' columns.
+        - values (pd.Series): Series of date strings.
+        - formats (list): strptime formats to try in order.
         """
+        raw_values = values.to_numpy(dtype=object)
+        parsed = np.full(len(raw_values), np.datetime64('NaT'), dtype='datetime64[ns]')
+        remaining = pd.notna(raw_values)
 
-        uk_regex = r"^(?:(?:\+44\s?\(0\)\s?\d{2,4}|\(?\d{2,5}\)?)\s?\d{3,4}\s?\d{3,4}$|\d{10,11}|\+44\s?\d{2,5}\s?\d{3,4}\s?\d{3,4})$"
-        de_regex = r"(\(?([\d \-\)\–\+\/\(]+){6,}\)?([ .\-–\/]?)([\d]+))"
-        us_regex = r"\(?\d{3}\)?-? *\d{3}-? *-?\d{4}"
+        for date_format in [*formats, 'mixed']:
+            positions = np.flatnonzero(remaining)
+            if len(positions) == 0:
+                break
+            attempt = pd.to_datetime(raw_values[positions], format=date_format, errors='coerce')
+            matched = ~attempt.isna()
+            parsed[positions[matched]] = attempt[matched].to_numpy(dtype='datetime64[ns]')
+            remaining[positions[matched]] = False
 
-        df.loc[
-            (df["country_code"] == "GB")
-            & (~df["phone_number"].astype(str).str.match(uk_regex)),
-            "phone_number",
-        ] = np.nan
-        df.loc[
-            (df["country_code"] == "DE")
-            & (~df["phone_number"].astype(str).str.match(de_regex)),
-            "phone_number",
-        ] = np.nan
-        df.loc[
-            (df["country_code"] == "US")
-            & (~df["phone_number"].astype(str).str.match(us_regex)),
-            "phone_number",
-        ] = np.nan
+        return pd.Series(parsed, index=values.index, name=values.name)
 
-    def _clean_uuids(self, df, columns):
+    @instrument_stage
+    def _invalid_phone_numbers(self, country_codes, phone_numbers):
         """
-        Removes incorrect uuid entries.
+        Returns a boolean mask of the phone numbers that don't match the rule of their country.
+
+        Rows are grouped by country code once and each group is only matched against its own rule
+        from PHONE_NUMBER_RULES. Countries without a rule are never invalid.
 
         Parameters:
-        - df (pd.DataFrame): dataframe containing columns.
-        - columns (arr): array of columns containing uuids.
+        - country_codes (pd.Series): Country code of each row.
+        - phone_numbers (pd.Series): Phone number of each row.
         """
-        for column_name in columns:    
-            uuid_pattern = r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
-            df.loc[:,column_name] = df[column_name].astype('string')
-            df.loc[~df[column_name].str.match(uuid_pattern), column_name] = np.nan
+        phone_numbers = phone_numbers.astype(str)
+        invalid = np.zeros(len(phone_numbers), dtype=bool)
 
-    def _clean_card_providers(self, df, column_name, categories):
+        for country_code, positions in country_codes.groupby(country_codes.to_numpy(), sort=False).indices.items():
+            rule = PHONE_NUMBER_RULES.get(country_code)
+            if rule is not None:
+                invalid[positions] = ~phone_numbers.iloc[positions].str.match(rule).to_numpy(dtype=bool)
+        return invalid
+
+    @instrument_stage
+    def _clean_phone_numbers(self, df):
         """
-        Cleans column_name by filtering out values not in the provided categories.
-        
+        Clean and validate phone numbers in a DataFrame based on country codes using regular expressions (regex).
+
         Parameters:
-        - df (pd.DataFrame): dataframe containing column_name.
-        - column_name (str): column containing categories.
-        - categories (arr): categories that are valid in the column.
+        - df (pandas DataFrame): The DataFrame containing 'country_code' and 'phone_number' columns.
         """
-        df.loc[~df[column_name].isin(categories), column_name] = np.nan
-        df[column_name] = df[column_name].astype('string')
+        df.loc[self._invalid_phone_numbers(df["country_code"], df["phone_number"]), "phone_number"] = np.nan
 
-
-    def _clean_card_numbers(self, df):
+    @instrument_stage
+    def _card_number_rejections(self, card_numbers, card_providers):
         """
-        Clean card_number by setting to string, replacing '?', and removing strings containing letters.
+        Returns the reason each card number is rejected, or None for valid ones, as a Series aligned with card_numbers.
+
+        Reasons, in the order they are checked: 'missing', 'not_numeric', 'unknown_provider' (no length in
+        CARD_NUMBER_LENGTHS), 'wrong_length' (digits don't match the provider's length) and 'failed_luhn'.
+        The Luhn checksum runs on a uint8 digit matrix per card length, without a per-row Python loop.
 
         Parameters:
-        - df (pd.DataFrame): dataframe containing card_number column.
-        """
-        df['card_number']=df['card_number'].astype('string')
-        df['card_number'] = df['card_number'].str.replace('?', '')
-        df['card_number'] = df['card_number'].where(df['card_number'].str.contains(r'^\d+$'), np.nan)
-        
-        # Can't get this to work, return to it later
-        '''
-    def _ensure_correct_card_number_length(self, card_data):
-        card_provider_length_mapping = {
-            'JCB 16 digit': 16,
-            'VISA 16 digit': 16,
-            'Mastercard': 16,
-            'Discover': 16,
-            'Diners Club / Carte Blanche': 14,
-            'American Express': 15,
-            'JCB 15 digit': 15,
-            'Maestro': 12,
-            'VISA 19 digit': 19,
-            'VISA 13 digit': 13
-        }
+        - card_numbers (pd.Series): Card numbers with '?' already removed.
+        - card_providers (pd.Series): Card provider of each row.
+        """
+        numbers = card_numbers.astype('string')
+        lengths = numbers.str.len().fillna(-1).to_numpy(dtype=np.int64)
+        missing = lengths < 0
+        provider_codes, providers = pd.factorize(card_providers)
+        expected_lengths = np.append(providers.map(CARD_NUMBER_LENGTHS).to_numpy(dtype=float), np.nan)[provider_codes]
+
+        # Values are checked per length as a (rows, length) matrix of code points: digits, then the Luhn sum.
+        values = numbers.to_numpy(dtype=object, na_value='')
+        numeric = np.zeros(len(values), dtype=bool)
+        luhn_valid = np.zeros(len(values), dtype=bool)
+        max_length = max(CARD_NUMBER_LENGTHS.values())
+        for length in np.unique(lengths[(lengths > 0) & (lengths <= max_length)]):
+            positions = np.flatnonzero(lengths == length)
+            # Code points below '0' wrap around to large unsigned values.
+            digits = values[positions].astype(f'U{length}').view(np.uint32).reshape(-1, length) - ord('0')
+            is_numeric = (digits < 10).all(axis=1)
+            numeric[positions[is_numeric]] = True
+
+            checked = is_numeric & (expected_lengths[positions] == length)
+            digits = digits[checked].astype(np.uint8)
+            # Every second digit counted from the check digit (the last one) is doubled, minus 9 if above 9.
+            doubled = slice(length - 2, None, -2) if length > 1 else slice(0, 0)
+            digits[:, doubled] = LUHN_DOUBLED_DIGITS[digits[:, doubled]]
+            # At most 19 digits of at most 9, so the sum fits in uint8.
+            luhn_valid[positions[checked]] = digits.sum(axis=1, dtype=np.uint8) % 10 == 0
+        too_long = np.flatnonzero(lengths > max_length)
+        numeric[too_long] = numbers.iloc[too_long].str.fullmatch('[0-9]+').fillna(False).to_numpy(dtype=bool)
+
+        reasons = np.full(len(values), None, dtype=object)
+        reasons[~luhn_valid] = 'failed_luhn'
+        reasons[lengths != expected_lengths] = 'wrong_length'
+        reasons[np.isnan(expected_lengths)] = 'unknown_provider'
+        reasons[~numeric] = 'not_numeric'
+        reasons[missing] = 'missing'
+        return pd.Series(reasons, index=card_numbers.index, name=card_numbers.name)
+
+    # Divisors to kilograms, checked in this order against the lower-cased weight string.
+    weight_unit_divisors = {'kg': 1, 'g': 1000, 'oz': 35.274, 'ml': 1000}
+
+    @instrument_stage
+    def _convert_weights_to_kg(self, weights):
+        """
+        Vectorized conversion of weight strings to kilograms.
+
+        Gives the same values as applying _clean_and_convert_weight row by row: an optional quantity
+        before the first 'x' multiplies the weight, digits, '.' and ',' make up the value and the unit
+        is looked up in weight_unit_divisors (no unit means kilograms). Each distinct string is only
+        converted once, the results are mapped back with the factorized codes.
+        Returns a tuple of (weights in kg, mask of the weights that could not be converted).
 
-        # Map the correct length for each card provider
-        card_data['correct_length'] = card_data['card_provider'].map(card_provider_length_mapping)
+        Parameters:
+        - weights (pandas Series): Series of weight strings.
+        """
+        codes, uniques = pd.factorize(weights)
+        uniques = pd.Series(uniques, dtype=object)
 
-        # Filter rows where the card_number length matches the correct_length
-        card_data = card_data[card_data['card_number'].astype(str).apply(len) == card_data['correct_length']]
+        has_quantity = uniques.str.contains('x', regex=False).fillna(False).to_numpy(bool)
+        quantity = uniques.str.replace(r'x[\s\S]*', '', regex=True).str.strip()
+        weight_str = uniques.str.replace(r'^[^x]*x', '', regex=True).str.strip()
 
-        # Drop the temporary 'correct_length' column
-        card_data = card_data.drop(columns=['correct_length'])
-        '''
+        value = pd.to_numeric(
+            weight_str.str.replace(r'[^\d.,]', '', regex=True).str.replace(',', '.', regex=False), errors='coerce'
+        ).astype(float)
 
-    def _clean_lat_and_long(self, store_data, columns):
-        """
-        Cleans number data by removing letters and setting to string.
+        unit = weight_str.str.lower()
+        divisor = np.select(
+            [unit.str.contains(u, regex=False).fillna(False).to_numpy(bool) for u in self.weight_unit_divisors],
+            list(self.weight_unit_divisors.values()),
+            default=1,
+        )
+        unique_kg = value / divisor
 
-        Parameters:
-        - df (pd.DataFrame): dataframe containing required columns.
-        - columns (arr): array containing columns with number data from which letters will be removed.
-        """
-        for column in columns:
-            store_data[column] = pd.to_numeric(store_data[column], errors='coerce')
-            store_data[column] = store_data[column].astype('string')
+        has_quantity = has_quantity & (quantity.str.len() > 0).fillna(False).to_numpy(bool)
+        multiplier = pd.to_numeric(quantity.where(has_quantity), errors='coerce').astype(float)
+        unique_kg = unique_kg.where(~has_quantity, unique_kg * multiplier).to_numpy()
 
-    def _convert_product_weights(self, products_data):
+        weight_kg = pd.Series(np.where(codes >= 0, unique_kg[codes], np.nan), index=weights.index, name=weights.name)
+        failed = weight_kg.isna() & weights.notna()
+        return weight_kg, failed
+
+    @instrument_stage
+    def _compact_dtypes(self, df, table_name):
         """
-        Clean and convert the 'weight' column in the provided DataFrame to kilograms.
+        Converts a cleaned DataFrame to compact dtypes in place and records its memory before and after.
+
+        - Enumerated columns (CATEGORY_COLUMNS) become categorical.
+        - Other text columns become Arrow-backed strings.
+        - Integer columns are downcast to the smallest integer type holding their values.
 
         Parameters:
-        - products_data (pandas DataFrame): The DataFrame containing the 'weight' column to be cleaned and converted.
-        """
-        products_data['weight'] = products_data['weight'].apply(self._clean_and_convert_weight)
+        - df (pd.DataFrame): Cleaned DataFrame.
+        - table_name (str): Name used for the memory report.
+        """
+        before_bytes = int(df.memory_usage(deep=True).sum())
+        for column in df.columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            if column in CATEGORY_COLUMNS:
+                df[column] = values.astype('category')
+            elif pd.api.types.is_integer_dtype(values.dtype):
+                df[column] = pd.to_numeric(values, downcast='integer')
+            elif (pd.api.types.is_string_dtype(values.dtype)
+                  and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')):
+                df[column] = values.astype('string[pyarrow]')
+        after_bytes = int(df.memory_usage(deep=True).sum())
+
+        self.memory_report[table_name] = {
+            'rows': len(df),
+            'before_bytes': before_bytes,
+            'after_bytes': after_bytes,
+            'ratio': round(before_bytes / after_bytes, 2) if after_bytes else None,
+        }
+        return df
 
-        return products_data
+    def print_memory_report(self):
+        """
+        Prints the memory of each cleaned table before and after compact dtypes.
+        """
+        print(f"{'table':<16}{'rows':>12}{'before (MB)':>14}{'after (MB)':>14}{'ratio':>8}")
+        for table_name, report in self.memory_report.items():
+            print(f"{table_name:<16}{report['rows']:>12}{report['before_bytes'] / 1024 ** 2:>14.2f}"
+                  f"{report['after_bytes'] / 1024 ** 2:>14.2f}{report['ratio']!s:>8}")
 
     def _clean_and_convert_weight(self, weight):
         """
         Clean and convert a weight string to kilograms.
+        Row-by-row reference for the vectorized _convert_weights_to_kg.
 
         Parameters:
         - weight (str): The string representing the weight, possibly including a quantity.
@@ -202,54 +349,131 @@ class DataCleaning():
         weight_str = parts[-1].strip()
         return quantity, weight_str
     
-    def _clean_date_numbers(self, sales_data, columns):
+    @staticmethod
+    def _unseen_hashes(seen_hashes, hashes):
+        """
+        Returns a boolean mask of the hashes not in the sorted seen_hashes array,
+        and seen_hashes with them merged in, still sorted.
         """
-        Clean and convert columns containing date numbers in the provided DataFrame.
+        if len(seen_hashes):
+            positions = np.minimum(np.searchsorted(seen_hashes, hashes), len(seen_hashes) - 1)
+            is_new = seen_hashes[positions] != hashes
+        else:
+            is_new = np.ones(len(hashes), dtype=bool)
+        new_hashes = np.unique(hashes[is_new])
+        return is_new, np.insert(seen_hashes, np.searchsorted(seen_hashes, new_hashes), new_hashes)
 
-        Parameters:
-        - sales_data (pandas DataFrame): The DataFrame containing columns with date numbers to be cleaned.
-        - columns (list): List of column names to be processed.
+    def clean_in_chunks(self, chunks, clean_method):
         """
-        for column in columns:
-         sales_data[column] = pd.to_numeric(sales_data[column], errors='coerce', downcast='integer')
-         sales_data[column] = sales_data[column].astype('Int64').astype('string')
+        Applies a clean_* method to each DataFrame of a chunked source and yields the cleaned chunks.
+
+        Duplicates are also dropped across chunks, at the step where the table's cleaning spec drops them:
+        raw rows already seen in an earlier chunk are dropped before cleaning if the spec's row_filter
+        drops duplicates, and cleaned rows already seen are dropped if its final_filter does. Each keeps a
+        sorted array of 64-bit row hashes (8 bytes per row), so only one chunk is held in memory; rows are
+        compared on their hash alone across chunks. Every other step of the specs works row by row, so the
+        output matches cleaning the whole table at once, except fill_first_row, which would apply to the first
+        row of every chunk. Intended for the RDS tables (clean_user_data, clean_orders_data), e.g.:
+            cleaner.clean_in_chunks(extractor.read_rds_table_chunks('orders_table'), cleaner.clean_orders_data)
 
+        Parameters:
+        - chunks (iterable): Iterable of pandas DataFrames, e.g. from DataExtractor.read_rds_table_chunks.
+        - clean_method (callable): One of the clean_* methods of this class.
+        """
+        plan = get_cleaning_plan(CLEAN_METHOD_SPECS[clean_method.__name__])
+        seen_raw = np.empty(0, dtype=np.uint64)
+        seen_cleaned = np.empty(0, dtype=np.uint64)
+        for chunk in chunks:
+            if 'drop_duplicates' in plan.row_filter:
+                is_new, seen_raw = self._unseen_hashes(seen_raw, row_hashes(chunk.drop(columns=plan.drop_columns)))
+                chunk = chunk[is_new]
+            cleaned_chunk = clean_method(chunk)
+            if 'drop_duplicates' in plan.final_filter:
+                is_new, seen_cleaned = self._unseen_hashes(seen_cleaned, row_hashes(cleaned_chunk))
+                cleaned_chunk = cleaned_chunk[is_new]
+            yield cleaned_chunk
+
+    @instrument_stage
+    def load_rds_table_incrementally(self, source_table, clean_method, target_connector, target_table, rollups=None,
+                                     dedup_index=None):
+        """
+        Extracts only the rows of an RDS table added since the last load, cleans them and merges them into the target.
+
+        The high-water mark is the RDS 'index' column and is stored in the target's load_watermarks table.
+        If rollups is given, the rollup tables reading the target are refreshed with the merged rows.
+        If dedup_index is given, cleaned rows already loaded by an earlier run are skipped.
+        Returns the number of cleaned rows merged, 0 if the merge failed.
+
+        Parameters:
+        - source_table (str): Name of the RDS table, e.g. 'orders_table'.
+        - clean_method (callable): One of the clean_* methods of this class.
+        - target_connector (DatabaseConnector): Connector of the database to load into.
+        - target_table (str): Name of the target table, e.g. 'dim_users'.
+        - rollups (RollupManager, optional): Rollups of the target database to refresh after the merge.
+        - dedup_index (RowHashIndex, optional): Row hashes of the rows already loaded into the target tables.
+        """
+        high_water_mark = target_connector.get_high_water_mark(source_table)
+        new_rows = self.db_extractor.read_rds_table(source_table, since=high_water_mark)
+        if new_rows.empty:
+            print(f"No new rows in '{source_table}' since index {high_water_mark}")
+            return 0
+
+        clean_rows = clean_method(new_rows)
+        if dedup_index is not None:
+            unseen = dedup_index.unseen(target_table, clean_rows)
+            if not unseen.all():
+                print(f"Skipping {int((~unseen).sum())} rows already loaded into '{target_table}'")
+                clean_rows = clean_rows[unseen]
+        merged = target_connector.upsert_to_db(clean_rows, target_table, watermark=(source_table, new_rows.index.max()))
+        if not merged:
+            return 0
+        if dedup_index is not None:
+            dedup_index.add(target_table, clean_rows)
+        if rollups is not None:
+            rollups.refresh(target_table, clean_rows)
+        return len(clean_rows)
+
+    def _apply_cleaning_spec(self, table_name, df):
+        """
+        Cleans a DataFrame with the compiled plan of its spec in CLEANING_SPECS and returns it.
+        The plan is compiled for the backend selected in __init__, and run in worker processes if workers > 1.
 
+        Parameters:
+        - table_name (str): Key of the table in CLEANING_SPECS.
+        - df (pd.DataFrame): Raw DataFrame.
+        """
+        if self.backend == 'polars':
+            from polars_backend import get_polars_cleaning_plan
+            df = get_polars_cleaning_plan(table_name).run(self, df)
+        elif self.workers > 1:
+            from partitioned_cleaning import clean_partitioned
+            df = clean_partitioned(self, table_name, df, self.workers)
+        else:
+            df = get_cleaning_plan(table_name).run(self, df)
+        if self.compact:
+            self._compact_dtypes(df, table_name)
+        return df
+
+    @instrument_stage
     def clean_user_data(self, user_data):
         """
         Cleans the provided user_data DataFrame and returns the cleaned DataFrame.
         """
-        user_data = user_data.dropna().drop_duplicates()
-
-        self._clean_country_code(user_data)
-        self._clean_dates(user_data, ['join_date', 'date_of_birth']) 
-        self._clean_phone_numbers(user_data)
-        self._clean_uuids(user_data, ['user_uuid'])
-        return user_data
+        return self._apply_cleaning_spec('users', user_data)
 
+    @instrument_stage
     def clean_card_data(self, card_data):
         """
         Clean and process credit card data in the provided DataFrame.
+        Card numbers failing the provider length or Luhn checks are dropped; the reason each
+        rejected row was dropped is kept in self.card_number_rejections.
 
         Parameters:
         - card_data (pandas DataFrame): The DataFrame containing credit card data.
         """
-        self._clean_card_providers(card_data, 'card_provider', 
-                               categories = ['Diners Club / Carte Blanche', 'American Express', 'JCB 16 digit',
-        'JCB 15 digit', 'Maestro', 'Mastercard', 'Discover',
-       'VISA 19 digit', 'VISA 16 digit', 'VISA 13 digit'])
-        self._clean_card_numbers(card_data)
-        #self._ensure_correct_card_number_length(card_data)
-        card_data["date_payment_confirmed"] = pd.to_datetime(
-            card_data["date_payment_confirmed"], format="mixed", errors="coerce"
-        ).dt.date
-        card_data["expiry_date"] = pd.to_datetime(
-            card_data["expiry_date"], format="%m/%y", errors='coerce'
-        )
-        card_data = card_data.dropna().drop_duplicates()
-
-        return card_data
+        return self._apply_cleaning_spec('card_details', card_data)
     
+    @instrument_stage
     def clean_store_data(self, store_data):
         """
         Clean and process store data in the provided DataFrame.
@@ -257,57 +481,26 @@ class DataCleaning():
         Parameters:
         - store_data (pandas DataFrame): The DataFrame containing store-related data.
         """
-        store_data = store_data.drop(columns=['index','lat'])
-        store_data = store_data.drop_duplicates()
-        store_data.iloc[0] = store_data.iloc[0].fillna("N/A")
-        store_data.loc[~store_data["country_code"].isin(["DE", "US", "GB"]), "country_code"] = np.nan
-
-        store_data.loc[store_data["continent"] == "eeEurope", "continent"] = "Europe"
-        store_data.loc[store_data["continent"] == "eeAmerica", "continent"] = "America"
-
-        store_data['staff_numbers'] = pd.to_numeric(store_data['staff_numbers'], errors='coerce').fillna(0).astype(int)
-        self._clean_dates(store_data, ['opening_date'])
-        self._clean_lat_and_long(store_data, ['longitude', 'latitude'])
-        self._clean_card_providers(store_data, 'store_type', categories = ['Web Portal', 'Local', 'Super Store', 'Mall Kiosk', 'Outlet'])
-
-        return store_data
+        return self._apply_cleaning_spec('store_details', store_data)
     
+    @instrument_stage
     def clean_products_data(self, products_data):
-       """
-       Clean and process product data in the provided DataFrame.
+        """
+        Clean and process product data in the provided DataFrame.
 
         Parameters:
         - products_data (pandas DataFrame): The DataFrame containing product-related data.
-       """
-       products_data = products_data.dropna().drop_duplicates()
-
-       self._clean_dates(products_data, ['date_added'])
-       self._convert_product_weights(products_data)
-       self._clean_uuids(products_data, ['uuid'])
-       self._clean_card_providers(products_data, 'category', categories = ['toys-and-games', 'sports-and-leisure', 'pets', 'homeware', 'health-and-beauty',
-                            'food-and-drink', 'diy'])
-       products_data = products_data.rename(columns={'removed': 'availabilty'})
-       products_data.availabilty = products_data.availabilty.replace('Still_avaliable', 'Still_available')
-       self._clean_card_providers(products_data, 'availabilty', categories= ['Still_available', 'Removed'])
-
-       return products_data
+        """
+        return self._apply_cleaning_spec('products', products_data)
 
+    @instrument_stage
     def clean_orders_data(self, orders_table):
         """
         Cleans the provided orders_data DataFrame and returns the cleaned DataFrame.
         """
-        
-        orders_table = orders_table.drop(columns=['level_0', 'first_name', 'last_name', '1'])
-        orders_table = orders_table.drop_duplicates().dropna()
-
-        
-        
-        orders_table.product_quantity = pd.to_numeric(orders_table.product_quantity, errors='coerce', downcast='integer')
-        self._clean_uuids(orders_table, ['date_uuid', 'user_uuid'])
-
-        orders_table.dropna(inplace=True)
-        return orders_table
+        return self._apply_cleaning_spec('orders', orders_table)
     
+    @instrument_stage
     def clean_date_times(self, sales_data):
         """
          Clean and process date and time data in the provided DataFrame.
@@ -315,13 +508,7 @@ class DataCleaning():
         Parameters:
         - sales_data (pandas DataFrame): The DataFrame containing date and time-related data.
         """
-        sales_data = sales_data.dropna().drop_duplicates()
-        sales_data.timestamp = pd.to_datetime(sales_data.timestamp, format='%H:%M:%S', errors='coerce').dt.time
-        self._clean_card_providers(sales_data, 'time_period', categories=['Evening', 'Morning', 'Midday', 'Late_Hours'])
-        self._clean_uuids(sales_data, ['date_uuid'])
-        self._clean_date_numbers(sales_data, ['month', 'year', 'day'])
-
-        return sales_data
+        return self._apply_cleaning_spec('date_times', sales_data)
     
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -1,8 +1,59 @@
-from database_utils import DatabaseConnector
-import boto3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+from instrumentation import instrument_stage
+import gzip
+import hashlib
+import io
+import multiprocessing
+import os
 import pandas as pd
-import requests
-import tabula 
+import tempfile
+import threading
+import time
+
+# boto3, requests, sqlalchemy and tabula are imported by the methods using them, so a job extracting one
+# source only pays for the import of its own client library.
+
+S3_COMPRESSIONS = {'gz': 'gzip', 'gzip': 'gzip', 'zst': 'zstd', 'zstd': 'zstd'}
+S3_FILE_TYPES = {'csv': 'csv', 'json': 'json', 'jsonl': 'jsonl', 'ndjson': 'jsonl', 'parquet': 'parquet'}
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def _get_s3_client():
+    """
+    Returns the process-wide boto3 S3 client, creating it on first use.
+    boto3 reads AWS_ENDPOINT_URL, so a local S3 stand-in can be used without code changes.
+    """
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            import boto3
+            _s3_client = boto3.client("s3")
+        return _s3_client
+
+
+def _read_pdf_page_range(pdf_path, first_page, last_page):
+    """
+    Process pool task: reads pages first_page to last_page of a PDF with tabula and returns one DataFrame per page.
+
+    With jpype installed tabula runs the JVM inside the worker process, so it is only started by the
+    first task of each worker and reused by the following ones.
+
+    Parameters:
+    - pdf_path (str): Path to a local PDF file.
+    - first_page (int): First page to read (1-based).
+    - last_page (int): Last page to read (inclusive).
+    """
+    import tabula
+
+    page_frames = []
+    for page in range(first_page, last_page + 1):
+        tables = tabula.read_pdf(pdf_path, pages=page)
+        page_frames.append(pd.concat(tables, ignore_index=True) if tables else pd.DataFrame())
+    return page_frames
+
 
 
 class DataExtractor():
@@ -10,37 +61,222 @@ class DataExtractor():
     This class extracts data from different data sources.
     e.g. CSV fies, API, S3 bucket.
     """
-    def __init__(self):
+    def __init__(self, creds_file=".../db_creds.yaml", raw_cache=None, stores_cache_ttl=3600):
         """
         Initializes the DataExtractor instance.
+
+        Parameters:
+        - creds_file (str): Path to the YAML file containing the source database credentials.
+        - raw_cache (RawSourceCache, optional): Cache for the S3, PDF, JSON and store API extracts.
+        - stores_cache_ttl (int, optional): Seconds cached store API data is used for, None never caches it.
+        """
+        self.creds_file = creds_file
+        self.failed_stores = []
+        self.raw_cache = raw_cache
+        self.stores_cache_ttl = stores_cache_ttl
+        self.stores_api_version = None
+        self._pdf_pool = None
+        self._pdf_pool_workers = 0
+
+    @cached_property
+    def db_connector(self):
+        """
+        Connector of the source database, created on first use so extracts that don't read RDS tables
+        never read the credentials or import sqlalchemy.
+        """
+        from database_utils import DatabaseConnector
+        return DatabaseConnector(self.creds_file)
+
+    @cached_property
+    def db_engine(self):
+        return self.db_connector.db_engine
+
+    @cached_property
+    def db_creds(self):
+        return self.db_connector.db_creds
+
+    def _cached(self, identity, extract):
+        """
+        Returns extract() through the raw source cache if one is configured.
+
+        Parameters:
+        - identity (tuple): Source identity and version used as cache key.
+        - extract (callable): Function returning the freshly extracted DataFrame.
+        """
+        if self.raw_cache is None:
+            return extract()
+        return self.raw_cache.get_or_extract(identity, extract)
+
+    def _init_http_session(self, pool_size=10, retries=3, backoff_factor=0.5):
+        """
+        Creates a requests Session with a pooled keep-alive connection adapter and retry/backoff.
+
+        Parameters:
+        - pool_size (int): Maximum number of pooled connections per host.
+        - retries (int): Number of retries per request on connection errors and 429/5xx responses.
+        - backoff_factor (float): Backoff factor between retries (0.5 -> 0.5s, 1s, 2s, ...).
         """
-        self.db_connector = DatabaseConnector(".../db_creds.yaml")
-        self.db_engine = self.db_connector.db_engine
-        self.db_creds = self.db_connector.db_creds
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
 
-    def read_rds_table(self, table_name):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @instrument_stage
+    def read_rds_table(self, table_name, since=None):
         """
         Reads data from a specified table in an RDS database and returns it as a pandas DataFrame.
 
         Parameters:
         - table_name (str): Name of the table to read from.
+        - since (int, optional): High-water mark, only rows with a greater 'index' are read.
         """
-        table_data = pd.read_sql_table(table_name, self.db_engine).set_index('index')
+        import sqlalchemy
+
+        if since is None:
+            return pd.read_sql_table(table_name, self.db_engine).set_index('index')
+        query = sqlalchemy.text(f'SELECT * FROM "{table_name}" WHERE "index" > :since ORDER BY "index"')
+        table_data = pd.read_sql_query(query, self.db_engine, params={'since': int(since)}).set_index('index')
         return table_data
+
+    def read_rds_table_chunks(self, table_name, chunksize=100000):
+        """
+        Streams a table from the RDS database as pandas DataFrames of at most chunksize rows.
+
+        Rows are fetched through a server-side cursor, so only one chunk is held in memory at a time.
+
+        Parameters:
+        - table_name (str): Name of the table to read from.
+        - chunksize (int): Number of rows per DataFrame.
+        """
+        with self.db_engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql_table(table_name, conn, chunksize=chunksize):
+                yield chunk.set_index('index')
     
-    def retrieve_pdf_data(self, pdf_link):
+    def _get_pdf_pool(self, max_workers):
+        """
+        Returns the process pool used for PDF page ranges, creating it on first use.
+
+        The pool is kept between calls so its workers' JVMs stay warm; close it with close_pdf_pool().
+
+        Parameters:
+        - max_workers (int): Number of worker processes.
+        """
+        if self._pdf_pool is None or self._pdf_pool_workers != max_workers:
+            self.close_pdf_pool()
+            self._pdf_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            self._pdf_pool_workers = max_workers
+        return self._pdf_pool
+
+    def close_pdf_pool(self):
+        """
+        Shuts down the PDF worker processes and their JVMs.
+        """
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown()
+            self._pdf_pool = None
+
+    def iter_pdf_pages(self, pdf_source, max_workers=4, pages_per_task=10):
+        """
+        Extracts a PDF in page ranges on a process pool and yields one DataFrame per page, in page order.
+
+        Pages are yielded as soon as their range is done, so consumers can start before the whole PDF is parsed.
+        Requires pypdf to count the pages.
+
+        Parameters:
+        - pdf_source (str or bytes): Link or path to the PDF, or its content.
+        - max_workers (int): Number of worker processes.
+        - pages_per_task (int): Number of pages read by one task.
+        """
+        from pypdf import PdfReader
+
+        temp_path = None
+        if isinstance(pdf_source, bytes) or pdf_source.startswith(('http://', 'https://')):
+            if not isinstance(pdf_source, bytes):
+                import requests
+                response = requests.get(pdf_source)
+                response.raise_for_status()
+                pdf_source = response.content
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as file:
+                file.write(pdf_source)
+                temp_path = file.name
+        pdf_path = temp_path or pdf_source
+
+        try:
+            page_count = len(PdfReader(pdf_path).pages)
+            pool = self._get_pdf_pool(max_workers)
+            futures = [
+                pool.submit(_read_pdf_page_range, pdf_path, first_page, min(first_page + pages_per_task - 1, page_count))
+                for first_page in range(1, page_count + 1, pages_per_task)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+
+    @instrument_stage
+    def _read_pdf(self, pdf_source, max_workers=1, pages_per_task=10):
+        """
+        Reads every page of a PDF with tabula and returns them as one DataFrame.
+
+        Parameters:
+        - pdf_source (str or bytes): Link or path to the PDF, or its content.
+        - max_workers (int): Number of worker processes, 1 reads the whole PDF in this process.
+        - pages_per_task (int): Number of pages read by one task when max_workers > 1.
+        """
+        if max_workers > 1:
+            pdf_pages = list(self.iter_pdf_pages(pdf_source, max_workers=max_workers, pages_per_task=pages_per_task))
+        else:
+            import tabula
+            pdf_pages = tabula.read_pdf(io.BytesIO(pdf_source) if isinstance(pdf_source, bytes) else pdf_source,
+                                        pages='all')
+        pdf_data = pd.concat(pdf_pages, ignore_index=True)
+
+        if pdf_data.empty:
+            raise ValueError("No data found in the PDF.")
+        return pdf_data
+
+    @instrument_stage
+    def retrieve_pdf_data(self, pdf_link, max_workers=1, pages_per_task=10):
         """
         Retrieves pdf file from S3 Bucket and returns a pandas DataFrame.
 
+        With a raw cache configured the PDF is downloaded once and keyed by its SHA-256,
+        so an unchanged PDF is not parsed again. With max_workers > 1 page ranges are
+        extracted in parallel on a persistent process pool (see iter_pdf_pages).
+
         Parameters:
         - pdf_link (str): Link to PDF in S3 Bucket.
+        - max_workers (int): Number of worker processes, 1 reads the whole PDF in this process.
+        - pages_per_task (int): Number of pages read by one task when max_workers > 1.
         """
         try:
-            pdf_pages = tabula.read_pdf(pdf_link, pages='all')
-            pdf_data = pd.concat(pdf_pages, ignore_index=True)
-
-            if pdf_data.empty:
-                raise ValueError("No data found in the PDF.")
+            if self.raw_cache is None:
+                pdf_data = self._read_pdf(pdf_link, max_workers, pages_per_task)
+            else:
+                if pdf_link.startswith(('http://', 'https://')):
+                    import requests
+                    response = requests.get(pdf_link)
+                    response.raise_for_status()
+                    pdf_bytes = response.content
+                else:
+                    with open(pdf_link, 'rb') as file:
+                        pdf_bytes = file.read()
+                identity = ('pdf', pdf_link, hashlib.sha256(pdf_bytes).hexdigest())
+                pdf_data = self._cached(identity, lambda: self._read_pdf(pdf_bytes, max_workers, pages_per_task))
 
             print("PDF data retrieval successful.")
             return pdf_data
@@ -49,6 +285,7 @@ class DataExtractor():
             error_message = f"Error retrieving PDF data: {str(e)}"
             print(error_message)
 
+    @instrument_stage
     def list_number_of_stores(self, number_of_stores_endpoint, header):
         """
         Returns the number of stores in the data from the API endpoint.
@@ -57,8 +294,11 @@ class DataExtractor():
         - number_of_stores_endpoint (str): Endpoint URL for API.
         - header (dict): Credentials to connect to the API.
         """
+        import requests
+
         response = requests.get(number_of_stores_endpoint, headers=header)
         if response.status_code == 200:
+            self.stores_api_version = hashlib.sha256(response.content).hexdigest()
             data = response.json()
             df = pd.json_normalize(data) 
             number_of_stores = df.number_stores[0]
@@ -68,63 +308,247 @@ class DataExtractor():
             print(f'Request failed with status code: {response.status_code}')
             print(f'Response Text: { response.text}')
 
-    def retrieve_stores_data(self, store_endpoint, number_of_stores, header):
+    def _fetch_store(self, session, store_endpoint, store_number, header):
+        """
+        Fetches a single store from the API endpoint.
+
+        Returns a tuple of (store_data, failure) where exactly one of them is None. Requests that raise, return
+        another status than 200 or a body that is not JSON are failures.
+
+        Parameters:
+        - session (requests.Session): Session used to send the request.
+        - store_endpoint (str): Base endpoint URL for individual store data.
+        - store_number (int): Number of the store to fetch.
+        - header (dict): Credentials to connect to the API.
+        """
+        import requests
+
+        try:
+            response = session.get(f'{store_endpoint}{store_number}', headers=header)
+        except requests.RequestException as e:
+            return None, {'store_number': store_number, 'status_code': None, 'error': str(e)}
+        if response.status_code != 200:
+            return None, {'store_number': store_number, 'status_code': response.status_code, 'error': response.text}
+        try:
+            return response.json(), None
+        except ValueError as e:
+            # requests' JSONDecodeError subclasses ValueError, e.g. for a truncated or HTML body.
+            return None, {'store_number': store_number, 'status_code': response.status_code, 'error': str(e)}
+
+    @instrument_stage
+    def retrieve_stores_data(self, store_endpoint, number_of_stores, header, max_workers=1,
+                             retries=3, backoff_factor=0.5, return_failures=False):
         """
         Retrieves data for each store from the API endpoint and returns it as a pandas DataFrame.
 
+        Requests share one pooled keep-alive session and are retried with backoff. With max_workers > 1
+        the stores are fetched concurrently from a thread pool, rows keep the store number order.
+        Stores that still fail are kept in self.failed_stores as dicts of store_number, status_code and error.
+        With a raw cache configured, the result is cached for stores_cache_ttl seconds, keyed by the digest of the
+        last list_number_of_stores response and the current TTL period. The API has no version of the individual
+        stores, so changes to a store's data are picked up once the period ends, at most stores_cache_ttl seconds later.
+
         Parameters:
         - store_endpoint (str): Base endpoint URL for individual store data.
         - number_of_stores (int): Number of stores to retrieve data for.
         - header (dict): Credentials to connect to the API.
+        - max_workers (int): Number of concurrent requests, 1 fetches the stores sequentially.
+        - retries (int): Number of retries per store request.
+        - backoff_factor (float): Backoff factor between retries.
+        - return_failures (bool): If True, returns a tuple of (DataFrame, failed_stores).
         """
-        all_store_data = []
-        for store_number in range(number_of_stores):
-            response = requests.get(f'{store_endpoint}{store_number}', headers=header)
-            if response.status_code == 200:
-                store_data = response.json()
-                all_store_data.append(store_data)
+        use_cache = self.raw_cache is not None and self.stores_api_version is not None and self.stores_cache_ttl
+        if use_cache:
+            identity = ('stores_api', store_endpoint, number_of_stores, self.stores_api_version,
+                        int(time.time() // self.stores_cache_ttl))
+            cached_data = self.raw_cache.get(identity)
+            if cached_data is not None:
+                print("Store data loaded from cache.")
+                return (cached_data, []) if return_failures else cached_data
+
+        session = self._init_http_session(pool_size=max(max_workers, 1), retries=retries,
+                                          backoff_factor=backoff_factor)
+
+        def fetch(store_number):
+            return self._fetch_store(session, store_endpoint, store_number, header)
+
+        try:
+            if max_workers > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(fetch, range(number_of_stores)))
             else:
-                print(f"Failed to fetch data for store {store_number}. Status code: {response.status_code}")
+                results = [fetch(store_number) for store_number in range(number_of_stores)]
+        finally:
+            session.close()
+
+        all_store_data = [store for store, _ in results if store is not None]
+        self.failed_stores = [failure for _, failure in results if failure is not None]
+        for failure in self.failed_stores:
+            print(f"Failed to fetch data for store {failure['store_number']}. Status code: {failure['status_code']}")
+
         store_data = pd.DataFrame(all_store_data)
+        if use_cache and not self.failed_stores:
+            self.raw_cache.put(identity, store_data)
+        if return_failures:
+            return store_data, self.failed_stores
         return store_data
     
-    def extract_from_s3(self, s3_url):
+    def _parse_s3_url(self, s3_url):
         """
-        Extracts data from an AWS S3 bucket using the provided HTTP S3 URL. This method determines the file type
-        (either CSV or JSON) from the URL and reads the data into a DataFrame accordingly.
+        Returns the bucket name, key, file type and compression ('gzip', 'zstd' or None) of an S3 URL.
 
         Parameters:
-            s3_url (str): HTTP URL to the S3 file.
+            s3_url (str): HTTP or s3:// URL to the S3 file.
         """
         # Parse bucket name and file path from s3_url
         bucket_name = s3_url.split('/')[2].split('.')[0]
         file_path = '/'.join(s3_url.split('/')[3:])
 
-        # Determine file type from the URL
-        file_type = file_path.split('.')[-1]
+        # Determine compression and file type from the URL, e.g. orders.csv.gz
+        extensions = file_path.lower().split('.')[1:]
+        compression = S3_COMPRESSIONS.get(extensions[-1]) if extensions else None
+        if compression:
+            extensions = extensions[:-1]
+        file_type = S3_FILE_TYPES.get(extensions[-1]) if extensions else None
+        if file_type is None:
+            raise ValueError("Unsupported file type. Please provide a CSV, JSON, JSON Lines or Parquet file.")
+        return bucket_name, file_path, file_type, compression
 
-        # Initialise boto3 client
-        s3_client = boto3.client("s3")
+    @instrument_stage
+    def _download_s3_ranges(self, bucket_name, file_path, size, part_size, max_workers):
+        """
+        Downloads an S3 object with parallel ranged GET requests and returns its bytes.
+
+        Parameters:
+            bucket_name (str): Name of the bucket.
+            file_path (str): Key of the object.
+            size (int): Size of the object in bytes.
+            part_size (int): Size of each ranged request in bytes.
+            max_workers (int): Number of concurrent requests.
+        """
+        s3_client = _get_s3_client()
+
+        def download_part(start):
+            end = min(start + part_size, size) - 1
+            return s3_client.get_object(Bucket=bucket_name, Key=file_path, Range=f'bytes={start}-{end}')['Body'].read()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return b''.join(executor.map(download_part, range(0, size, part_size)))
+
+    def _open_s3_stream(self, bucket_name, file_path, compression, size=None, parallel_download=False,
+                        part_size=8 * 1024 ** 2, max_workers=8):
+        """
+        Returns a decompressed, file-like stream of an S3 object.
+
+        Objects larger than part_size are fetched with parallel ranged GETs if parallel_download is set,
+        otherwise the response body is streamed.
+
+        Parameters:
+            bucket_name (str): Name of the bucket.
+            file_path (str): Key of the object.
+            compression (str): 'gzip', 'zstd' or None.
+            size (int, optional): Size of the object in bytes, needed for parallel downloads.
+            parallel_download (bool): If True, large objects are fetched with parallel ranged GETs.
+            part_size (int): Size of each ranged request in bytes.
+            max_workers (int): Number of concurrent ranged requests.
+        """
+        if parallel_download and size is not None and size > part_size:
+            raw = io.BytesIO(self._download_s3_ranges(bucket_name, file_path, size, part_size, max_workers))
+        else:
+            raw = _get_s3_client().get_object(Bucket=bucket_name, Key=file_path)["Body"]
+
+        if compression == 'gzip':
+            return gzip.GzipFile(fileobj=raw)
+        if compression == 'zstd':
+            import zstandard
+            return zstandard.ZstdDecompressor().stream_reader(raw)
+        return raw
+
+    def iter_s3_chunks(self, s3_url, chunksize=100000, parallel_download=False):
+        """
+        Streams a CSV, JSON Lines or Parquet file from S3 and yields DataFrames of at most chunksize rows.
+
+        gzip (.gz) and zstd (.zst) files are decompressed on the fly. Plain JSON can't be split
+        and is yielded as one DataFrame; Parquet is downloaded before its row batches are read.
+
+        Parameters:
+            s3_url (str): HTTP or s3:// URL to the S3 file.
+            chunksize (int): Number of rows per DataFrame.
+            parallel_download (bool): If True, large objects are fetched with parallel ranged GETs.
+        """
+        bucket_name, file_path, file_type, compression = self._parse_s3_url(s3_url)
+        size = None
+        if parallel_download:
+            size = _get_s3_client().head_object(Bucket=bucket_name, Key=file_path)['ContentLength']
+        stream = self._open_s3_stream(bucket_name, file_path, compression, size, parallel_download)
 
-        # Download file and read into a DataFrame based on file type
-        obj = s3_client.get_object(Bucket=bucket_name, Key=file_path)
-        if file_type.lower() == 'json':
-            df = pd.read_json(obj["Body"])
-        elif file_type.lower() == 'csv':
-            df = pd.read_csv(obj["Body"])
+        if file_type == 'csv':
+            yield from pd.read_csv(stream, chunksize=chunksize)
+        elif file_type == 'jsonl':
+            with pd.read_json(io.TextIOWrapper(stream, encoding='utf-8'), lines=True, chunksize=chunksize) as reader:
+                yield from reader
+        elif file_type == 'parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(io.BytesIO(stream.read())).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
         else:
-            raise ValueError("Unsupported file type. Please provide a CSV or JSON file.")
+            yield pd.read_json(stream)
+
+    @instrument_stage
+    def extract_from_s3(self, s3_url, parallel_download=False):
+        """
+        Extracts data from an AWS S3 bucket using the provided HTTP S3 URL. This method determines the file type
+        (CSV, JSON, JSON Lines or Parquet, optionally gzip or zstd compressed) from the URL and reads the data
+        into a DataFrame accordingly.
 
-        return df
+        Parameters:
+            s3_url (str): HTTP URL to the S3 file.
+            parallel_download (bool): If True, large objects are fetched with parallel ranged GETs.
+        """
+        bucket_name, file_path, file_type, compression = self._parse_s3_url(s3_url)
+        head = None
+        if self.raw_cache is not None or parallel_download:
+            head = _get_s3_client().head_object(Bucket=bucket_name, Key=file_path)
+
+        def download():
+            # Download file and read into a DataFrame based on file type
+            stream = self._open_s3_stream(bucket_name, file_path, compression,
+                                          head['ContentLength'] if head else None, parallel_download)
+            if file_type == 'json':
+                return pd.read_json(stream)
+            elif file_type == 'jsonl':
+                return pd.read_json(stream, lines=True)
+            elif file_type == 'parquet':
+                return pd.read_parquet(io.BytesIO(stream.read()))
+            return pd.read_csv(stream)
+
+        if self.raw_cache is None:
+            return download()
+        return self._cached(('s3', bucket_name, file_path, head['ETag']), download)
     
+    @instrument_stage
     def extract_from_json(self, path):
         """
         Extracts a JSON file and returns a pandas DataFrame.
 
+        With a raw cache configured, HTTP sources are keyed by their ETag (or Last-Modified)
+        and local files by their modification time and size.
+
         Parameters:
         - path (str): Path to the JSON file.
         """
-        return pd.read_json(path)
+        if self.raw_cache is None:
+            return pd.read_json(path)
+        if path.startswith(('http://', 'https://')):
+            import requests
+            headers = requests.head(path).headers
+            version = headers.get('ETag') or headers.get('Last-Modified')
+            if version is None:
+                return pd.read_json(path)
+        else:
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+        return self._cached(('json', path, version), lambda: pd.read_json(path))
     
 if __name__ == "__main__":
     pass
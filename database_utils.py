@@ -1,11 +1,229 @@
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc  import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+from instrumentation import instrument_stage
+import csv
+import io
+import math
+import os
 import pandas as pd
 import psycopg2
+import re
 import sqlalchemy
+import threading
+import time
 import yaml
 
 
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that counts checkouts, new connections (handshakes) and checkouts that had to wait
+    because the pool and its overflow were exhausted.
+    """
+
+    def __init__(self, creator, max_overflow=10, **kw):
+        super().__init__(creator, max_overflow=max_overflow, **kw)
+        self._max_overflow_setting = max_overflow
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and self.overflow() >= self._max_overflow_setting
+        start = time.perf_counter()
+        connection = super()._do_get()
+        with self._stats_lock:
+            self.checkouts += 1
+            if exhausted:
+                self.waits += 1
+                self.wait_time += time.perf_counter() - start
+        return connection
+
+    def _create_connection(self):
+        with self._stats_lock:
+            self.connects += 1
+        return super()._create_connection()
+
+    def stats(self):
+        """
+        Returns the pool statistics as a dict.
+        """
+        return {
+            'pool_size': self.size(),
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': self.overflow(),
+            'checkouts': self.checkouts,
+            'connects': self.connects,
+            'waits': self.waits,
+            'wait_time': round(self.wait_time, 6),
+        }
+
+
+# Process-wide engines keyed by (absolute credentials path, target), shared by every DatabaseConnector.
+_engine_registry = {}
+_engine_registry_lock = threading.Lock()
+# Database URLs whose table_versions table is known to exist.
+_table_versions_ready = set()
+_table_versions_lock = threading.Lock()
+
+
+def get_registered_engine(file_path, target, database_url, pool_size=5, max_overflow=10,
+                          pool_pre_ping=True, pool_recycle=1800):
+    """
+    Returns the engine registered for the credentials file and target, creating it on first use.
+
+    Pool settings only apply when the engine is created; later calls reuse the warm pool.
+
+    Parameters:
+    - file_path (str): Path to the YAML file containing database credentials.
+    - target (str): Credentials prefix of the database, e.g. 'RDS'.
+    - database_url (str): SQLAlchemy URL used if the engine has to be created.
+    - pool_size (int): Number of connections kept open in the pool.
+    - max_overflow (int): Number of extra connections allowed above pool_size.
+    - pool_pre_ping (bool): Test connections for liveness on checkout.
+    - pool_recycle (int): Seconds after which a pooled connection is replaced.
+    """
+    key = (os.path.abspath(file_path), target)
+    with _engine_registry_lock:
+        if key not in _engine_registry:
+            _engine_registry[key] = create_engine(
+                database_url,
+                poolclass=InstrumentedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+            )
+        return _engine_registry[key]
+
+
+def engine_pool_stats():
+    """
+    Returns the pool statistics of every registered engine, keyed by 'credentials_path:target'.
+    """
+    with _engine_registry_lock:
+        return {f'{path}:{target}': engine.pool.stats() for (path, target), engine in _engine_registry.items()}
+
+
+def read_schema_primary_keys(schema_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema')):
+    """
+    Returns a dict of table name to primary key column, parsed from the ADD PRIMARY KEY statements in schema/*.sql.
+
+    Parameters:
+    - schema_dir (str): Directory containing the schema SQL scripts.
+    """
+    primary_keys = {}
+    pattern = re.compile(r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+PRIMARY\s+KEY\s*\(\s*"?(\w+)"?\s*\)', re.IGNORECASE)
+    for file_name in sorted(os.listdir(schema_dir)):
+        if file_name.endswith('.sql'):
+            with open(os.path.join(schema_dir, file_name), 'r') as file:
+                primary_keys.update(pattern.findall(file.read()))
+    return primary_keys
+
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema')
+# First words of the statements replayed from schema/*.sql; SELECTs only inspect the tables and are skipped.
+SCHEMA_STATEMENT_KEYWORDS = (r'ALTER\s+TABLE', r'CREATE\s+INDEX', 'UPDATE', 'DELETE', 'SELECT')
+# Column type DataFrame.to_sql creates for each pandas dtype kind, used for columns loaded before their schema type.
+LOOSE_COLUMN_TYPES = {'i': 'BIGINT', 'u': 'BIGINT', 'f': 'DOUBLE PRECISION', 'b': 'BOOLEAN', 'M': 'TIMESTAMP'}
+# NULL marker of the COPY CSV stream: the text csv.QUOTE_NONNUMERIC writes a float NaN as, unquoted,
+# while every string, including '' and 'nan', is quoted and so never read as NULL.
+COPY_NULL = 'nan'
+
+
+def read_schema_statements(schema_dir=SCHEMA_DIR):
+    """
+    Returns a dict of table name to the ALTER, CREATE INDEX, UPDATE and DELETE statements run on it by schema/*.sql,
+    in script order.
+
+    Statements start on a line beginning with one of SCHEMA_STATEMENT_KEYWORDS, as some scripts leave out semicolons.
+
+    Parameters:
+    - schema_dir (str): Directory containing the schema SQL scripts.
+    """
+    statements = {}
+    start = re.compile(rf'^\s*(?:{"|".join(SCHEMA_STATEMENT_KEYWORDS)})\b', re.IGNORECASE | re.MULTILINE)
+    for file_name in sorted(os.listdir(schema_dir)):
+        if not file_name.endswith('.sql'):
+            continue
+        with open(os.path.join(schema_dir, file_name), 'r') as file:
+            sql = re.sub(r'/\*.*?\*/', '', file.read(), flags=re.DOTALL)
+        starts = [match.start() for match in start.finditer(sql)] + [len(sql)]
+        for begin, end in zip(starts, starts[1:]):
+            statement = ' '.join(sql[begin:end].split()).rstrip(';').strip()
+            match = re.match(r'(?:ALTER\s+TABLE|CREATE\s+INDEX\s+\w+\s+ON|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?',
+                             statement, re.IGNORECASE)
+            if match:
+                statements.setdefault(match.group(1), []).append(statement)
+    return statements
+
+
+def plan_typed_load(statements, columns):
+    """
+    Splits the schema statements of a table into the column types it can be created with before the bulk load,
+    the statements to replay after the load and the constraints to add at the end.
+
+    A type change moves into the CREATE TABLE if it is a plain cast and no earlier UPDATE or DELETE reads the column;
+    type changes to the type a column already has are dropped. Everything else is replayed in script order.
+
+    Parameters:
+    - statements (list): Statements of the table, from read_schema_statements.
+    - columns (list): Columns of the DataFrame being loaded.
+
+    Returns:
+    - tuple: (dict of column to create type, list of replayed statements, list of primary key statements,
+      list of foreign key statements)
+    """
+    create_types = {}
+    current_names = {column: column for column in columns}
+    current_types = {}
+    touched = set()
+    replayed, primary_keys, foreign_keys = [], [], []
+    column_pattern = r'"?(\w+)"?'
+    for statement in statements:
+        type_change = re.search(rf'ALTER\s+COLUMN\s+{column_pattern}\s+TYPE\s+(.+?)(?:\s+USING\s+(.+))?$',
+                                statement, re.IGNORECASE)
+        rename = re.search(rf'RENAME\s+COLUMN\s+{column_pattern}\s+TO\s+{column_pattern}', statement, re.IGNORECASE)
+        original = {name: column for column, name in current_names.items()}
+        if re.search(r'ADD\s+PRIMARY\s+KEY', statement, re.IGNORECASE):
+            primary_keys.append(statement)
+        elif re.search(r'FOREIGN\s+KEY', statement, re.IGNORECASE):
+            foreign_keys.append(statement)
+        elif type_change and type_change.group(1) in original:
+            name, new_type, using = type_change.groups()
+            column = original[name]
+            plain_cast = using is None or re.fullmatch(rf'{column_pattern}\s*::\s*[\w\s()]+', using) is not None
+            if plain_cast and current_types.get(column, '').upper() == new_type.upper():
+                continue
+            if plain_cast and column not in touched:
+                create_types[column] = current_types[column] = new_type
+            else:
+                replayed.append(statement)
+                touched.add(column)
+                current_types[column] = new_type
+        else:
+            replayed.append(statement)
+            if rename and rename.group(1) in original:
+                current_names[original[rename.group(1)]] = rename.group(2)
+            elif re.match(r'UPDATE|DELETE', statement, re.IGNORECASE):
+                touched.update(column for column, name in current_names.items()
+                               if re.search(rf'\b{re.escape(name)}\b', statement))
+    return create_types, replayed, primary_keys, foreign_keys
+
+
+def dispose_engines():
+    """
+    Closes the pooled connections of every registered engine and empties the registry.
+    """
+    with _engine_registry_lock:
+        for engine in _engine_registry.values():
+            engine.dispose()
+        _engine_registry.clear()
+
+
 class DatabaseConnector():
     """
     This class connects to a PostgreSQL database and provides methods to interact with it.
@@ -14,17 +232,32 @@ class DatabaseConnector():
     - file_path (str): Path to the YAML file containing database credentials.
     """
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, target='RDS', pool_size=5, max_overflow=10, pool_pre_ping=True, pool_recycle=1800):
         """
         Initializes the DatabaseConnector instance.
 
+        Connectors for the same credentials file and target share one engine and connection pool.
+
         Parameters:
         - file_path (str): Path to the YAML file containing database credentials.
+        - target (str): Prefix of the credential keys to connect with, e.g. 'RDS' for RDS_HOST, RDS_USER, ...
+        - pool_size (int): Number of connections kept open in the pool.
+        - max_overflow (int): Number of extra connections allowed above pool_size.
+        - pool_pre_ping (bool): Test connections for liveness on checkout.
+        - pool_recycle (int): Seconds after which a pooled connection is replaced.
         """  
         self.file_path = file_path
+        self.target = target
+        self.pool_options = {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_pre_ping': pool_pre_ping,
+            'pool_recycle': pool_recycle,
+        }
         self.db_creds = self.read_db_creds()
         self.db_engine = self.init_db_engine()
         
+    @instrument_stage
     def read_db_creds(self):
         """
         Reads and returns the database credentials from the specified YAML file.
@@ -33,20 +266,44 @@ class DatabaseConnector():
             db_creds = yaml.safe_load(file)
         return db_creds
     
+    @instrument_stage
     def init_db_engine(self):
         """
-        Initializes and returns a SQLAlchemy database engine using the provided credentials.
+        Returns the shared SQLAlchemy database engine for the credentials file and target,
+        creating it on first use.
 
         Returns:
         - sqlalchemy.engine.base.Engine: Database engine.
         """
         database_url = (
-        f"postgresql://{self.db_creds['RDS_USER']}:{self.db_creds['RDS_PASSWORD']}"
-        f"@{self.db_creds['RDS_HOST']}:{self.db_creds['RDS_PORT']}/{self.db_creds['RDS_DATABASE']}"
+        f"postgresql://{self.db_creds[f'{self.target}_USER']}:{self.db_creds[f'{self.target}_PASSWORD']}"
+        f"@{self.db_creds[f'{self.target}_HOST']}:{self.db_creds[f'{self.target}_PORT']}"
+        f"/{self.db_creds[f'{self.target}_DATABASE']}"
         )
-        db_engine = create_engine(database_url)
+        db_engine = get_registered_engine(self.file_path, self.target, database_url, **self.pool_options)
         return db_engine
+
+    def pool_stats(self):
+        """
+        Returns the connection pool statistics (checkouts, connects, waits, overflow, ...) of this connector's engine.
+        """
+        return self.db_engine.pool.stats()
     
+    @instrument_stage
+    def run_query(self, query):
+        """
+        Runs a query on a raw DBAPI cursor, so the % in column names like "percentage_total(%)" is sent as is,
+        and returns (column names, rows).
+
+        Parameters:
+            query (str): SQL query.
+        """
+        with self.db_engine.connect() as conn:
+            with conn.connection.cursor() as cursor:
+                cursor.execute(query)
+                return [column[0] for column in cursor.description], cursor.fetchall()
+
+    @instrument_stage
     def list_db_tables(self):
         """
         Returns a list of table names present in the connected database.
@@ -55,26 +312,351 @@ class DatabaseConnector():
         db_table_list = inspector.get_table_names()
         return db_table_list
     
-    def upload_to_db(self, clean_dataframe, table_name: str):
+    @staticmethod
+    @instrument_stage
+    def _copy_rows(conn, table_name, keys, rows):
+        """
+        Streams rows into a table through PostgreSQL COPY FROM STDIN.
+
+        The rows are written to an in-memory CSV buffer and sent with psycopg2's copy_expert,
+        which is much faster than the batched INSERT statements to_sql sends by default.
+        Strings are quoted and None is written as the COPY_NULL marker, so empty strings load as '' and
+        None as NULL, like with INSERT statements.
+
+        Parameters:
+            conn (sqlalchemy.engine.Connection): Connection the upload runs on.
+            table_name (str): Quoted name of the target table.
+            keys (list): Column names.
+            rows (iterable): Iterable of row tuples, None and float NaN are loaded as NULL.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+            row if None not in row else tuple(math.nan if value is None else value for value in row) for row in rows)
+        buffer.seek(0)
+
+        columns = ', '.join(f'"{key}"' for key in keys)
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                               buffer)
+
+    @staticmethod
+    def _copy_insert(table, conn, keys, data_iter):
         """
-        Uploads a DataFrame to a specified table in the database. If the table exists, it is replaced.
-        Optionally sets a primary key on the specified column after the upload.
+        Insertion method for DataFrame.to_sql that loads the rows with COPY FROM STDIN.
 
         Parameters:
-            df (pd.DataFrame): The DataFrame to upload.
+            table (pandas.io.sql.SQLTable): Target table.
+            conn (sqlalchemy.engine.Connection): Connection the upload runs on.
+            keys (list): Column names.
+            data_iter (iterable): Iterable of row tuples.
+        """
+        table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        DatabaseConnector._copy_rows(conn, table_name, keys, data_iter)
+
+    @instrument_stage
+    def upload_to_db(self, clean_dataframe, table_name: str, if_exists='replace', use_copy=False):
+        """
+        Uploads a DataFrame to a specified table in the database. By default, if the table exists, it is replaced.
+        If a query cache keeps table versions, the table's version is bumped in the same transaction.
+
+        Parameters:
+            clean_dataframe (pd.DataFrame): The DataFrame to upload.
             table_name (str): The name of the target table in the database.
-            primary_key (str, optional): The column name to be set as the primary key.
+            if_exists (str): 'replace' or 'append', passed to DataFrame.to_sql.
+            use_copy (bool): If True, rows are bulk loaded with COPY FROM STDIN instead of INSERT statements.
+
+        Returns:
+            bool: True if the rows were uploaded, False if the upload failed with a database error, which is printed.
         """
         if not isinstance(clean_dataframe, pd.DataFrame):
             raise ValueError("df must be a pandas DataFrame")
 
         try:
-            engine = self.init_db_engine()
-            with engine.begin() as conn:
-                clean_dataframe.to_sql(table_name, conn, if_exists='replace', index=False)
+            with self.db_engine.begin() as conn:
+                clean_dataframe.to_sql(table_name, conn, if_exists=if_exists, index=False,
+                                       method=self._copy_insert if use_copy else None)
+                self.bump_table_version(conn, table_name)
                 print(f"Data uploaded successfully to table '{table_name}'")
+            return True
         except SQLAlchemyError as e:
             print("An error occurred while uploading data to the database:", e)
-    
+            return False
+
+    @instrument_stage
+    def get_high_water_mark(self, source):
+        """
+        Returns the last loaded high-water mark of a source, or None if it has not been loaded incrementally yet.
+
+        Parameters:
+            source (str): Name of the source, e.g. the RDS table name.
+        """
+        if not inspect(self.db_engine).has_table('load_watermarks'):
+            return None
+        with self.db_engine.connect() as conn:
+            return conn.execute(
+                sqlalchemy.text("SELECT high_water_mark FROM load_watermarks WHERE source = :source"),
+                {'source': source},
+            ).scalar()
+
+    def _set_high_water_mark(self, conn, source, high_water_mark):
+        """
+        Creates the load_watermarks table if needed and stores the high-water mark of a source.
+
+        Parameters:
+            conn (sqlalchemy.engine.Connection): Connection of the load transaction.
+            source (str): Name of the source, e.g. the RDS table name.
+            high_water_mark (int): Highest source index that has been loaded.
+        """
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS load_watermarks ("
+            "source VARCHAR(255) PRIMARY KEY, high_water_mark BIGINT NOT NULL, updated_at TIMESTAMP DEFAULT now())"
+        )
+        conn.execute(
+            sqlalchemy.text(
+                "INSERT INTO load_watermarks (source, high_water_mark) VALUES (:source, :high_water_mark) "
+                "ON CONFLICT (source) DO UPDATE SET high_water_mark = EXCLUDED.high_water_mark, updated_at = now()"
+            ),
+            {'source': source, 'high_water_mark': int(high_water_mark)},
+        )
+
+    def _ensure_table_versions(self):
+        """
+        Creates the table_versions table once per database. Concurrent lookups can race to create it,
+        so it is created in its own transaction and a lost race is ignored.
+        """
+        key = str(self.db_engine.url)
+        with _table_versions_lock:
+            if key in _table_versions_ready:
+                return
+            try:
+                with self.db_engine.begin() as conn:
+                    conn.exec_driver_sql(
+                        "CREATE TABLE IF NOT EXISTS table_versions ("
+                        "table_name VARCHAR(255) PRIMARY KEY, version BIGINT NOT NULL, updated_at TIMESTAMP DEFAULT now())"
+                    )
+            except SQLAlchemyError:
+                if not inspect(self.db_engine).has_table('table_versions'):
+                    raise
+            _table_versions_ready.add(key)
+
+    def bump_table_version(self, conn, table_name):
+        """
+        Increments the data version of a table, to invalidate the cached query results reading it.
+
+        Versions are only kept once a query cache (query_cache.QueryResultCache) has created the table_versions
+        table, so loads into a database without one need no CREATE privilege and run no version SQL.
+        The bump runs in a savepoint of the load transaction: a failed load doesn't change the version,
+        and a failed bump is reported without undoing the load.
+
+        Parameters:
+            conn (sqlalchemy.engine.Connection): Connection of the load transaction.
+            table_name (str): Table whose data changed.
+        """
+        if not inspect(conn).has_table('table_versions'):
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(
+                    sqlalchemy.text(
+                        "INSERT INTO table_versions (table_name, version) VALUES (:table_name, 1) "
+                        "ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1, "
+                        "updated_at = now()"
+                    ),
+                    {'table_name': table_name},
+                )
+        except SQLAlchemyError as e:
+            print(f"Could not bump the version of '{table_name}', cached query results reading it may be stale:", e)
+
+    def get_table_versions(self, table_names):
+        """
+        Returns a dict of table name to data version; tables never loaded through a connector have version 0.
+
+        Parameters:
+            table_names (iterable): Names of the tables.
+        """
+        table_names = sorted(set(table_names))
+        self._ensure_table_versions()
+        with self.db_engine.connect() as conn:
+            rows = conn.execute(
+                sqlalchemy.text("SELECT table_name, version FROM table_versions WHERE table_name IN :table_names")
+                .bindparams(sqlalchemy.bindparam('table_names', expanding=True)),
+                {'table_names': table_names},
+            )
+            versions = dict(rows.fetchall())
+        return {table_name: versions.get(table_name, 0) for table_name in table_names}
+
+    @instrument_stage
+    def upsert_to_db(self, clean_dataframe, table_name: str, primary_key=None, watermark=None):
+        """
+        Merges a DataFrame into a table with INSERT ... ON CONFLICT instead of replacing the table.
+
+        The rows are copied into a temporary staging table and merged on the primary key, updating existing rows.
+        Tables without a primary key (e.g. orders_table) are appended to. If the table doesn't exist yet it is created
+        with the primary key.
+        The optional watermark is stored in the same transaction, so a failed load doesn't advance it.
+        Returns True if the rows were merged, False if the load failed.
+
+        Parameters:
+            clean_dataframe (pd.DataFrame): The DataFrame to merge.
+            table_name (str): The name of the target table in the database.
+            primary_key (str, optional): Conflict column, defaults to the primary key defined in schema/*.sql.
+            watermark (tuple, optional): (source, high_water_mark) to store once the rows are merged.
+        """
+        if not isinstance(clean_dataframe, pd.DataFrame):
+            raise ValueError("df must be a pandas DataFrame")
+        primary_key = primary_key or read_schema_primary_keys().get(table_name)
+
+        if primary_key:
+            clean_dataframe = clean_dataframe.drop_duplicates(subset=primary_key, keep='last')
+
+        try:
+            with self.db_engine.begin() as conn:
+                if not inspect(conn).has_table(table_name):
+                    # The primary key is added with the table, so later merges find it for ON CONFLICT.
+                    clean_dataframe.to_sql(table_name, conn, index=False, method=self._copy_insert)
+                    if primary_key:
+                        conn.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD PRIMARY KEY ("{primary_key}")')
+                else:
+                    columns = list(clean_dataframe.columns)
+                    quoted_columns = ', '.join(f'"{column}"' for column in columns)
+                    stage_name = f'"stage_{table_name}"'
+                    conn.exec_driver_sql(
+                        f'CREATE TEMP TABLE {stage_name} (LIKE "{table_name}" INCLUDING DEFAULTS) ON COMMIT DROP'
+                    )
+                    rows = clean_dataframe.astype(object).where(clean_dataframe.notna(), None)
+                    self._copy_rows(conn, stage_name, columns, rows.itertuples(index=False, name=None))
+
+                    merge = f'INSERT INTO "{table_name}" ({quoted_columns}) SELECT {quoted_columns} FROM {stage_name}'
+                    if primary_key:
+                        updates = ', '.join(f'"{column}" = EXCLUDED."{column}"' for column in columns
+                                            if column != primary_key)
+                        merge += f' ON CONFLICT ("{primary_key}") ' + (f'DO UPDATE SET {updates}' if updates else 'DO NOTHING')
+                    conn.exec_driver_sql(merge)
+                self.bump_table_version(conn, table_name)
+                if watermark is not None:
+                    self._set_high_water_mark(conn, *watermark)
+                print(f"Data merged successfully into table '{table_name}' ({len(clean_dataframe)} rows)")
+            return True
+        except SQLAlchemyError as e:
+            print("An error occurred while merging data into the database:", e)
+            return False
+
+    @instrument_stage
+    def upload_chunks_to_db(self, clean_chunks, table_name: str, use_copy=False):
+        """
+        Uploads an iterable of DataFrames to a table, replacing it with the first chunk and appending the rest.
+
+        Parameters:
+            clean_chunks (iterable): Iterable of cleaned pandas DataFrames.
+            table_name (str): The name of the target table in the database.
+            use_copy (bool): If True, rows are bulk loaded with COPY FROM STDIN.
+        """
+        for chunk_number, chunk in enumerate(clean_chunks):
+            self.upload_to_db(chunk, table_name, if_exists='replace' if chunk_number == 0 else 'append',
+                              use_copy=use_copy)
+
+    @staticmethod
+    def _execute_statements(conn, statements):
+        """
+        Runs SQL statements on the connection's DBAPI cursor, so a % in them (e.g. LIKE '£%') is sent as is.
+        """
+        with conn.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    @instrument_stage
+    def upload_typed_table(self, clean_dataframe, table_name: str, schema_dir=SCHEMA_DIR):
+        """
+        Replaces a table with one created with its final schema/*.sql column types and bulk loads the DataFrame into it
+        with COPY FROM STDIN, instead of loading TEXT/BIGINT columns and altering their types afterwards.
+
+        The schema statements that can't be applied up front (data fixes and the type changes depending on them)
+        are replayed after the copy, then the primary key is added. Foreign keys on or referencing the table are
+        dropped first by drop_foreign_keys, in their own short transaction, so the long load transaction takes no
+        locks on the other tables; add them back with add_foreign_keys once every table is loaded.
+        Returns True if the table was loaded, False if the load failed.
+
+        Parameters:
+            clean_dataframe (pd.DataFrame): The DataFrame to upload.
+            table_name (str): The name of the target table in the database.
+            schema_dir (str): Directory containing the schema SQL scripts.
+        """
+        if not isinstance(clean_dataframe, pd.DataFrame):
+            raise ValueError("df must be a pandas DataFrame")
+        statements = read_schema_statements(schema_dir).get(table_name, [])
+        create_types, replayed, primary_keys, _ = plan_typed_load(statements, list(clean_dataframe.columns))
+        columns = ', '.join(f'"{column}" {create_types.get(column) or LOOSE_COLUMN_TYPES.get(dtype.kind, "TEXT")}'
+                            for column, dtype in clean_dataframe.dtypes.items())
+
+        try:
+            self.drop_foreign_keys([table_name], schema_dir)
+            with self.db_engine.begin() as conn:
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{table_name}"')
+                conn.exec_driver_sql(f'CREATE TABLE "{table_name}" ({columns})')
+                clean_dataframe.to_sql(table_name, conn, if_exists='append', index=False, method=self._copy_insert)
+                self._execute_statements(conn, replayed + primary_keys)
+                self.bump_table_version(conn, table_name)
+                print(f"Data uploaded successfully to typed table '{table_name}' "
+                      f"({len(create_types)} columns typed before the load, {len(replayed)} statements replayed)")
+            return True
+        except (SQLAlchemyError, psycopg2.Error) as e:
+            print(f"An error occurred while uploading data to the typed table '{table_name}':", e)
+            return False
+
+    def drop_foreign_keys(self, table_names=None, schema_dir=SCHEMA_DIR):
+        """
+        Drops the foreign keys defined in schema/*.sql on or referencing the given tables, in one short transaction.
+        Only the constraints that exist are altered, so tables without them are not locked. Returns the names of
+        the keys dropped.
+
+        Parameters:
+            table_names (list, optional): Tables whose foreign keys are dropped, defaults to every table in the schema.
+            schema_dir (str): Directory containing the schema SQL scripts.
+        """
+        keys = []
+        for table_name, statements in read_schema_statements(schema_dir).items():
+            for statement in plan_typed_load(statements, [])[3]:
+                name, referenced_table = re.search(r'ADD\s+CONSTRAINT\s+"?(\w+)"?.*\bREFERENCES\s+"?(\w+)"?',
+                                                   statement, re.IGNORECASE).groups()
+                if table_names is None or table_name in table_names or referenced_table in table_names:
+                    keys.append((table_name, name))
+        dropped = []
+        with self.db_engine.begin() as conn:
+            existing = set(conn.exec_driver_sql(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE contype = 'f'").fetchall())
+            for table_name, name in keys:
+                if (table_name, name) in existing:
+                    conn.exec_driver_sql(f'ALTER TABLE "{table_name}" DROP CONSTRAINT "{name}"')
+                    dropped.append(name)
+        if dropped:
+            print(f"Foreign keys dropped: {', '.join(dropped)}")
+        return dropped
+
+    @instrument_stage
+    def add_foreign_keys(self, table_names=None, schema_dir=SCHEMA_DIR):
+        """
+        Adds the foreign keys defined in schema/*.sql, each in its own transaction so one violated key doesn't
+        stop the others. Existing constraints of the same name are replaced. Returns the names of the keys added.
+
+        Parameters:
+            table_names (list, optional): Tables whose foreign keys are added, defaults to every table in the schema.
+            schema_dir (str): Directory containing the schema SQL scripts.
+        """
+        added = []
+        for table_name, statements in read_schema_statements(schema_dir).items():
+            if table_names is not None and table_name not in table_names:
+                continue
+            for statement in plan_typed_load(statements, [])[3]:
+                name = re.search(r'ADD\s+CONSTRAINT\s+"?(\w+)"?', statement, re.IGNORECASE).group(1)
+                try:
+                    with self.db_engine.begin() as conn:
+                        conn.exec_driver_sql(f'ALTER TABLE "{table_name}" DROP CONSTRAINT IF EXISTS "{name}"')
+                        self._execute_statements(conn, [statement])
+                    added.append(name)
+                except (SQLAlchemyError, psycopg2.Error) as e:
+                    print(f"Could not add foreign key '{name}' to '{table_name}':", e)
+        print(f"Foreign keys added: {', '.join(added) or 'none'}")
+        return added
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,194 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Second hash key of 128-bit row hashes; the first half uses the pandas default key.
+SECOND_HASH_KEY = '8f3a61c0d2b9e457'
+HASH_DTYPES = {64: np.dtype(np.uint64), 128: np.dtype([('high', np.uint64), ('low', np.uint64)])}
+
+
+def _missing_as_none(df):
+    """
+    Returns df with the missing values (None, NaN, NA, NaT) of its object columns replaced by None, as hashing
+    with categorize=False gives each kind of missing value a different hash. Other columns hold a single kind.
+    """
+    columns = [position for position, dtype in enumerate(df.dtypes) if dtype == object]
+    missing = {position: df.iloc[:, position].isna().to_numpy() for position in columns}
+    missing = {position: mask for position, mask in missing.items() if mask.any()}
+    if not missing:
+        return df
+    df = df.copy(deep=False)
+    for position, mask in missing.items():
+        df.isetitem(position, df.iloc[:, position].where(~mask, None))
+    return df
+
+
+def row_hashes(df, bits=64):
+    """
+    Returns a vectorized hash of every row of a DataFrame, ignoring the index.
+
+    Hashes are stable across processes and runs for the same values and dtypes. Missing values
+    (None, NaN, NA) hash alike, as drop_duplicates treats them.
+
+    Parameters:
+    - df (pd.DataFrame): Rows to hash.
+    - bits (int): 64 for uint64 hashes, or 128 for (high, low) uint64 pairs.
+    """
+    if bits not in HASH_DTYPES:
+        raise ValueError(f"Unsupported row hash size {bits}, expected one of {sorted(HASH_DTYPES)}")
+    # categorize=False hashes the values directly instead of factorizing every column first,
+    # which is what makes hashing cheaper in memory than a full-row drop_duplicates.
+    df = _missing_as_none(df)
+    high = pd.util.hash_pandas_object(df, index=False, categorize=False).to_numpy()
+    if bits == 64:
+        return high
+    hashes = np.empty(len(df), dtype=HASH_DTYPES[128])
+    hashes['high'] = high
+    hashes['low'] = pd.util.hash_pandas_object(df, index=False, categorize=False, hash_key=SECOND_HASH_KEY).to_numpy()
+    return hashes
+
+
+def duplicated_rows(df):
+    """
+    Returns DataFrame.duplicated() (keep='first') as a boolean array, computed on 64-bit row hashes.
+
+    Only rows whose hash occurs more than once are compared in full, so hash collisions can't drop a row,
+    while the columns of the other rows are never factorized.
+
+    Parameters:
+    - df (pd.DataFrame): Rows to check.
+    """
+    candidates = np.flatnonzero(pd.Series(row_hashes(df)).duplicated(keep=False).to_numpy())
+    duplicated = np.zeros(len(df), dtype=bool)
+    if len(candidates):
+        duplicated[candidates] = df.take(candidates).duplicated().to_numpy()
+    return duplicated
+
+
+class RowHashIndex():
+    """
+    This class keeps the row hashes of every table loaded into the target database, so rows loaded
+    by a previous run can be skipped before the upload.
+
+    Each table's hashes are stored as one sorted .npy array in index_dir (8 bytes per row with 64-bit hashes,
+    16 with 128-bit ones), loaded on first use. The sets should mirror the tables: call replace after a
+    table is reloaded and add after rows are appended or merged.
+
+    Parameters:
+    - index_dir (str): Directory the hash sets are stored in.
+    - bits (int): Row hash size, 64 or 128. 128-bit hashes make a wrongly skipped row practically impossible
+      on very large tables, at twice the hashing time and storage.
+    """
+
+    def __init__(self, index_dir='.dedup_index', bits=64):
+        """
+        Initializes the RowHashIndex instance.
+
+        Parameters:
+        - index_dir (str): Directory the hash sets are stored in.
+        - bits (int): Row hash size, 64 or 128.
+        """
+        if bits not in HASH_DTYPES:
+            raise ValueError(f"Unsupported row hash size {bits}, expected one of {sorted(HASH_DTYPES)}")
+        self.index_dir = index_dir
+        self.bits = bits
+        self.memory_report = {}
+        self._hash_sets = {}
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _path(self, table_name):
+        return os.path.join(self.index_dir, f'{table_name}.{self.bits}.npy')
+
+    def _hash_set(self, table_name):
+        """
+        Returns the sorted hash set of a table, reading it from disk on first use.
+        """
+        if table_name not in self._hash_sets:
+            path = self._path(table_name)
+            hash_set = np.load(path) if os.path.exists(path) else np.empty(0, dtype=HASH_DTYPES[self.bits])
+            self._hash_sets[table_name] = hash_set
+        return self._hash_sets[table_name]
+
+    def _save(self, table_name, hash_set):
+        """
+        Replaces the stored hash set of a table atomically.
+        """
+        path = self._path(table_name)
+        with open(f'{path}.tmp', 'wb') as file:
+            np.save(file, hash_set)
+        os.replace(f'{path}.tmp', path)
+        self._hash_sets[table_name] = hash_set
+
+    def unseen(self, table_name, df):
+        """
+        Returns a boolean mask of the rows of df whose hash is not in the table's hash set,
+        and records the memory of the hash set against holding the loaded rows for a full-row comparison.
+
+        Parameters:
+        - table_name (str): Target table the rows are loaded into.
+        - df (pd.DataFrame): Cleaned rows about to be loaded.
+        """
+        hashes = row_hashes(df, self.bits)
+        with self._lock:
+            hash_set = self._hash_set(table_name)
+        if len(hash_set) == 0:
+            seen = np.zeros(len(df), dtype=bool)
+        else:
+            positions = np.minimum(np.searchsorted(hash_set, hashes), len(hash_set) - 1)
+            seen = hash_set[positions] == hashes
+        row_bytes = int(df.memory_usage(deep=True, index=False).sum()) / len(df) if len(df) else 0
+        self.memory_report[table_name] = {
+            'rows': len(hash_set),
+            'full_row_bytes': int(row_bytes * len(hash_set)),
+            'hash_bytes': int(hash_set.nbytes),
+            'ratio': round(row_bytes * len(hash_set) / hash_set.nbytes, 2) if len(hash_set) else None,
+        }
+        return ~seen
+
+    def add(self, table_name, df):
+        """
+        Adds the hashes of rows appended or merged into a table to its hash set.
+
+        Parameters:
+        - table_name (str): Table the rows were loaded into.
+        - df (pd.DataFrame): Loaded rows.
+        """
+        hashes = row_hashes(df, self.bits)
+        with self._lock:
+            self._save(table_name, np.union1d(self._hash_set(table_name), hashes))
+
+    def replace(self, table_name, df):
+        """
+        Replaces the hash set of a table with the hashes of its full contents, after the table is reloaded.
+
+        Parameters:
+        - table_name (str): Table that was reloaded.
+        - df (pd.DataFrame): Rows the table now holds.
+        """
+        hashes = np.unique(row_hashes(df, self.bits))
+        with self._lock:
+            self._save(table_name, hashes)
+
+    def drop(self, table_name):
+        """
+        Deletes the hash set of a table.
+
+        Parameters:
+        - table_name (str): Table whose hash set is deleted.
+        """
+        with self._lock:
+            self._hash_sets.pop(table_name, None)
+            if os.path.exists(self._path(table_name)):
+                os.remove(self._path(table_name))
+
+    def print_memory_report(self):
+        """
+        Prints, per table checked with unseen, the estimated memory of holding the loaded rows for a
+        full-row comparison against the memory of its hash set.
+        """
+        print(f"{'table':<18}{'rows':>12}{'full rows (MB)':>16}{'hashes (MB)':>13}{'ratio':>8}")
+        for table_name, report in self.memory_report.items():
+            print(f"{table_name:<18}{report['rows']:>12}{report['full_row_bytes'] / 1024 ** 2:>16.2f}"
+                  f"{report['hash_bytes'] / 1024 ** 2:>13.2f}{report['ratio']!s:>8}")
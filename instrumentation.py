@@ -0,0 +1,253 @@
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import pandas as pd
+import threading
+import time
+import tracemalloc
+
+# Instrumentation settings, changed with enable_instrumentation / disable_instrumentation.
+_settings = {'enabled': False, 'jsonl_path': None, 'track_memory': False}
+# Records kept in memory for stage_records. Long-running processes would otherwise grow without bound, the
+# JSON lines file keeps every record and _stage_totals keeps the Prometheus totals of the evicted ones.
+MAX_STAGE_RECORDS = 10000
+_records = deque(maxlen=MAX_STAGE_RECORDS)
+# Stage name -> running totals of every record since instrumentation was enabled, exported as Prometheus metrics.
+_stage_totals = {}
+_records_lock = threading.Lock()
+# Per-thread stack of the stages being measured, used to keep nested peak memory readings correct.
+_active_stages = threading.local()
+# Memory frames of the stages being measured in every thread. tracemalloc has a single process-wide peak,
+# so a stage overlapping a stage of another thread gets no peak memory reading.
+_memory_frames = []
+_memory_lock = threading.Lock()
+
+
+def enable_instrumentation(jsonl_path=None, track_memory=False):
+    """
+    Starts recording a metrics record for every instrumented stage call.
+
+    Parameters:
+    - jsonl_path (str, optional): File each record is appended to as a JSON line.
+    - track_memory (bool): If True, records the peak memory delta of each stage with tracemalloc.
+      This slows allocation-heavy stages down noticeably, so it is off by default.
+    """
+    with _records_lock:
+        _records.clear()
+        _stage_totals.clear()
+    _settings['jsonl_path'] = jsonl_path
+    _settings['track_memory'] = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _settings['enabled'] = True
+
+
+def disable_instrumentation():
+    """
+    Stops recording. Instrumented stages then only pay for a single flag check per call.
+    """
+    _settings['enabled'] = False
+    if _settings['track_memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _settings['track_memory'] = False
+
+
+def stage_records():
+    """
+    Returns a copy of the last MAX_STAGE_RECORDS records collected since instrumentation was enabled.
+    """
+    with _records_lock:
+        return list(_records)
+
+
+def _row_and_null_counts(value):
+    """
+    Returns (rows, {column: missing values}) of a DataFrame or Series, of the first element of a tuple,
+    or (None, None) for anything else.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, pd.DataFrame):
+        return len(value), value.isna().sum().to_dict()
+    if isinstance(value, pd.Series):
+        return len(value), {value.name: int(value.isna().sum())}
+    return None, None
+
+
+def _cpu_seconds():
+    """
+    Returns the CPU time of the process, all threads included, plus that of its terminated child processes.
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _start_memory_frame(stack):
+    """
+    Pushes the memory frame of a stage starting in this thread and resets the tracemalloc peak,
+    unless a stage of another thread is being measured, in which case both are marked concurrent.
+    """
+    thread = threading.get_ident()
+    with _memory_lock:
+        current, peak = tracemalloc.get_traced_memory()
+        frame = {'thread': thread, 'start_memory': current, 'outer_peak': peak, 'lost_peak': 0, 'concurrent': False}
+        others = [other for other in _memory_frames if other['thread'] != thread]
+        if others:
+            for other in others + [frame]:
+                other['concurrent'] = True
+        else:
+            tracemalloc.reset_peak()
+        _memory_frames.append(frame)
+    stack.append(frame)
+
+
+def _stop_memory_frame(stack):
+    """
+    Pops the memory frame of the stage ending in this thread and returns its peak memory delta,
+    or None if it overlapped a stage of another thread.
+    """
+    frame = stack.pop()
+    with _memory_lock:
+        _memory_frames.remove(frame)
+        if frame['concurrent']:
+            if stack:
+                stack[-1]['concurrent'] = True
+            return None
+        peak = max(tracemalloc.get_traced_memory()[1], frame['lost_peak'])
+    if stack:
+        # reset_peak() dropped the enclosing stage's peak from before this stage started.
+        stack[-1]['lost_peak'] = max(stack[-1]['lost_peak'], frame['outer_peak'])
+    return max(peak - frame['start_memory'], 0)
+
+
+@contextmanager
+def measure_stage(name, data=None):
+    """
+    Measures the code in the with block as one stage and yields its record. The caller may set
+    record['output'] to the stage result to get output row counts; it is removed before the record is emitted.
+
+    cpu_seconds is the CPU time of the whole process during the stage, so it includes worker threads, and
+    stages running concurrently in other threads, and child processes once they have exited. tracemalloc
+    only traces Python allocations of this process, with one process-wide peak, so peak_memory_bytes is None
+    for a stage that overlapped a measured stage of another thread, e.g. in a Pipeline with workers > 1.
+
+    Parameters:
+    - name (str): Stage name, e.g. 'DataCleaning.clean_user_data'.
+    - data (pd.DataFrame or pd.Series, optional): Stage input, used for the input row and missing value counts.
+    """
+    rows_in, nulls_in = _row_and_null_counts(data)
+    record = {'stage': name, 'start': time.time(), 'rows_in': rows_in}
+    track_memory = _settings['track_memory'] and tracemalloc.is_tracing()
+    stack = _active_stages.__dict__.setdefault('stack', [])
+    if track_memory:
+        _start_memory_frame(stack)
+    start_wall = time.perf_counter()
+    start_cpu = _cpu_seconds()
+    status = 'error'
+    try:
+        yield record
+        status = 'ok'
+    finally:
+        record['wall_seconds'] = time.perf_counter() - start_wall
+        record['cpu_seconds'] = _cpu_seconds() - start_cpu
+        record['peak_memory_bytes'] = _stop_memory_frame(stack) if track_memory else None
+        rows_out, nulls_out = _row_and_null_counts(record.pop('output', None))
+        record['rows_out'] = rows_out
+        record['rows_dropped'] = rows_in - rows_out if rows_in is not None and rows_out is not None else None
+        record['values_nulled'] = None
+        if nulls_in is not None and nulls_out is not None:
+            # Only columns present before and after count, so dropped or added columns don't skew the total.
+            record['values_nulled'] = int(sum(max(nulls - nulls_in[column], 0)
+                                              for column, nulls in nulls_out.items() if column in nulls_in))
+        record['status'] = status
+        _emit(record)
+
+
+def _emit(record):
+    """
+    Stores a finished record and appends it to the JSON lines file, if one is configured.
+    """
+    with _records_lock:
+        _records.append(record)
+        _add_to_totals(_stage_totals, record)
+        if _settings['jsonl_path']:
+            with open(_settings['jsonl_path'], 'a') as file:
+                file.write(json.dumps(record) + '\n')
+
+
+def instrument_stage(func):
+    """
+    Decorator measuring every call of a stage method with measure_stage while instrumentation is enabled.
+    The first DataFrame or Series argument is taken as the stage input and the return value as its output.
+    """
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _settings['enabled']:
+            return func(*args, **kwargs)
+        data = next((arg for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))), None)
+        with measure_stage(name, data) as record:
+            result = func(*args, **kwargs)
+            record['output'] = result
+        return result
+
+    return wrapper
+
+
+def _add_to_totals(totals, record):
+    """
+    Adds a record to the per-stage totals exported by write_prometheus_textfile.
+    """
+    stage = totals.setdefault(record['stage'], {'calls': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                'peak_memory_bytes': 0, 'rows_in': 0, 'rows_out': 0,
+                                                'rows_dropped': 0, 'values_nulled': 0})
+    stage['calls'] += 1
+    stage['errors'] += record['status'] != 'ok'
+    for key in ('wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out', 'rows_dropped', 'values_nulled'):
+        stage[key] += record[key] or 0
+    stage['peak_memory_bytes'] = max(stage['peak_memory_bytes'], record['peak_memory_bytes'] or 0)
+
+
+def write_prometheus_textfile(path, records=None):
+    """
+    Writes per-stage totals of the records in the Prometheus text format, e.g. for the node_exporter
+    textfile collector. The file is replaced atomically.
+
+    Parameters:
+    - path (str): Output .prom file.
+    - records (list, optional): Records to export, defaults to every record since instrumentation was enabled,
+      including those no longer kept by stage_records().
+    """
+    if records is None:
+        with _records_lock:
+            totals = {stage: dict(stage_totals) for stage, stage_totals in _stage_totals.items()}
+    else:
+        totals = {}
+        for record in records:
+            _add_to_totals(totals, record)
+
+    metrics = [
+        ('calls', 'counter', 'Number of calls of the stage.'),
+        ('errors', 'counter', 'Number of calls of the stage that raised.'),
+        ('wall_seconds', 'counter', 'Total wall time spent in the stage.'),
+        ('cpu_seconds', 'counter', 'Total CPU time of the process during the stage.'),
+        ('peak_memory_bytes', 'gauge', 'Largest peak traced memory increase of a single non-concurrent call.'),
+        ('rows_in', 'counter', 'Total input rows.'),
+        ('rows_out', 'counter', 'Total output rows.'),
+        ('rows_dropped', 'counter', 'Total rows removed by the stage.'),
+        ('values_nulled', 'counter', 'Total values set to missing by the stage.'),
+    ]
+    lines = []
+    for key, metric_type, description in metrics:
+        metric = f'etl_stage_{key}' + ('_total' if metric_type == 'counter' else '')
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {metric_type}')
+        for stage, stage_totals in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{stage}"}} {stage_totals[key]}')
+
+    with open(f'{path}.tmp', 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(f'{path}.tmp', path)
@@ -0,0 +1,142 @@
+import copy
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from cleaning_spec import get_cleaning_plan
+
+# Frames below this many rows are cleaned in-process, where starting workers would cost more than it saves.
+PARTITION_MIN_ROWS = 100000
+
+# Per-row results the clean_* methods store on the cleaner, merged back from the workers like the cleaned rows.
+PARTITION_RESULT_ATTRIBUTES = ('weight_conversion_failures', 'card_number_rejections')
+
+# Constructor arguments of the cleaner sent to workers that are not forked, which build their own cleaner.
+# Its database connectors are created on first use, so none are opened by the workers.
+CLEANER_OPTIONS = ('creds_file', 'native_dates', 'compact', 'backend')
+
+# Token -> (cleaner, table name, raw frame) of the partitioned runs in progress. Forked workers inherit
+# this dict, so with the 'fork' start method the raw frame reaches them without being serialized.
+_partition_inputs = {}
+_partition_inputs_lock = threading.Lock()
+_partition_tokens = itertools.count()
+
+
+def _hash_rows(token, columns, start, stop):
+    """
+    Returns the 64-bit hashes of the rows [start, stop) of a run's raw frame, on the given columns.
+    """
+    _, _, df = _partition_inputs[token]
+    return pd.util.hash_pandas_object(df.iloc[start:stop][columns], index=False).to_numpy()
+
+
+def _clean_partition(token, positions, partition=None):
+    """
+    Cleans the rows at positions of a run's raw frame and returns the cleaned rows, indexed by their position
+    in the raw frame, with the per-row results stored on the cleaner.
+
+    The final drop_duplicates of the spec is left to the merge, as duplicates after cleaning can come from
+    rows of different partitions. When the workers are not forked, partition is (table name, constructor
+    arguments of the cleaner, frame of the rows).
+    """
+    if partition is None:
+        cleaner, table_name, df = _partition_inputs[token]
+        df = df.take(positions)
+    else:
+        from data_cleaning import DataCleaning
+        table_name, options, df = partition
+        cleaner = DataCleaning(**options)
+    for name in PARTITION_RESULT_ATTRIBUTES:
+        cleaner.__dict__.pop(name, None)
+    df.index = positions
+    plan = copy.copy(get_cleaning_plan(table_name))
+    plan.final_filter = plan.final_filter - {'drop_duplicates'}
+    cleaned = plan.run(cleaner, df)
+    return cleaned, {name: getattr(cleaner, name) for name in PARTITION_RESULT_ATTRIBUTES if hasattr(cleaner, name)}
+
+
+def _partition_positions(executor, token, df, columns, partitions, hash_rows):
+    """
+    Returns the raw frame positions of each partition, ascending within a partition.
+
+    With hash_rows, rows are assigned by the hash of their deduplication columns, so identical rows always
+    share a partition and each worker's drop_duplicates is exact; the hashes are computed by the workers
+    on contiguous row ranges. Otherwise the partitions are contiguous row ranges.
+    """
+    bounds = np.linspace(0, len(df), partitions + 1).astype(int)
+    if not hash_rows:
+        return [np.arange(start, stop) for start, stop in zip(bounds, bounds[1:])]
+    if executor is None:
+        row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    else:
+        row_hashes = np.concatenate(list(executor.map(_hash_rows, itertools.repeat(token), itertools.repeat(columns),
+                                                      bounds[:-1], bounds[1:])))
+    partition_ids = row_hashes % np.uint64(partitions)
+    order = np.argsort(partition_ids, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(partition_ids.astype(np.int64), minlength=partitions))[:-1])
+
+
+def clean_partitioned(cleaner, table_name, df, workers):
+    """
+    Cleans a DataFrame with the plan of its spec in CLEANING_SPECS on a pool of worker processes and
+    returns the same DataFrame as CleaningPlan.run.
+
+    The rows are split into one partition per worker, hash partitioned on the deduplication columns when
+    the spec drops duplicates before cleaning. The cleaned partitions are merged back in the input row order,
+    then the spec's final drop_duplicates, if any, runs on the merged frame. Specs that fill the first row
+    and frames under PARTITION_MIN_ROWS rows are cleaned in-process.
+
+    When this process runs a single thread, on platforms with the 'fork' start method, the workers read the raw
+    frame from memory shared copy-on-write with this process. Forking a process with other threads running
+    (e.g. the thread pool of pipeline.Pipeline) can deadlock the workers on locks those threads held, so then,
+    and on platforms without 'fork', the workers are started with 'forkserver' or 'spawn' and each partition
+    is pickled to its worker.
+
+    Parameters:
+    - cleaner (DataCleaning): Provides the parsing helpers and the native_dates / compact options.
+    - table_name (str): Key of the table in CLEANING_SPECS.
+    - df (pd.DataFrame): Raw DataFrame.
+    - workers (int): Number of worker processes and partitions.
+    """
+    plan = get_cleaning_plan(table_name)
+    if workers < 2 or len(df) < PARTITION_MIN_ROWS or plan.fill_first_row is not None:
+        return plan.run(cleaner, df)
+
+    columns = [column for column in df.columns if column not in plan.drop_columns]
+    start_methods = multiprocessing.get_all_start_methods()
+    forked = 'fork' in start_methods and threading.active_count() == 1
+    with _partition_inputs_lock:
+        token = next(_partition_tokens)
+        _partition_inputs[token] = (cleaner, table_name, df)
+    try:
+        context = multiprocessing.get_context('fork' if forked else 'forkserver' if 'forkserver' in start_methods
+                                              else 'spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            positions = _partition_positions(executor if forked else None, token, df, columns, workers,
+                                             'drop_duplicates' in plan.row_filter)
+            positions = [partition for partition in positions if len(partition)]
+            if forked:
+                results = list(executor.map(_clean_partition, itertools.repeat(token), positions))
+            else:
+                options = {name: getattr(cleaner, name) for name in CLEANER_OPTIONS}
+                partitions = [(table_name, options, df.take(partition)) for partition in positions]
+                results = list(executor.map(_clean_partition, itertools.repeat(token), positions, partitions))
+    finally:
+        with _partition_inputs_lock:
+            del _partition_inputs[token]
+
+    cleaned = pd.concat([partition for partition, _ in results])
+    order = np.argsort(cleaned.index.to_numpy(), kind='stable')
+    cleaned = cleaned.take(order)
+    if 'drop_duplicates' in plan.final_filter:
+        cleaned = plan._filter_rows(cleaned, {'drop_duplicates'})
+    for name in PARTITION_RESULT_ATTRIBUTES:
+        parts = [attributes[name] for _, attributes in results if name in attributes]
+        if parts:
+            values = pd.concat(parts).sort_index(kind='stable')
+            values.index = df.index[values.index.to_numpy()]
+            setattr(cleaner, name, values)
+    cleaned.index = df.index[cleaned.index.to_numpy()]
+    return cleaned
@@ -0,0 +1,259 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from data_cleaning import DataCleaning
+from database_utils import DatabaseConnector
+from dedup_index import RowHashIndex
+from functools import partial
+from instrumentation import enable_instrumentation, write_prometheus_textfile
+from referential_integrity import foreign_keys, quarantine_orphans
+from rollups import RollupManager
+import argparse
+import time
+import yaml
+
+
+class Pipeline():
+    """
+    This class runs extract, clean and load stages as a dependency graph.
+    Stages whose dependencies have finished run concurrently on a thread pool.
+
+    Parameters:
+    - max_workers (int): Maximum number of stages running at the same time.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Initializes the Pipeline instance.
+
+        Parameters:
+        - max_workers (int): Maximum number of stages running at the same time.
+        """
+        self.max_workers = max_workers
+        self.stages = {}
+        self.results = {}
+        self.timings = {}
+
+    def add_stage(self, name, func, depends_on=()):
+        """
+        Adds a stage to the graph. The stage is called with the results of its dependencies,
+        in the order given in depends_on.
+
+        Parameters:
+        - name (str): Unique name of the stage.
+        - func (callable): Function run by the stage.
+        - depends_on (list): Names of stages that must finish first. They must already have been added.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists.")
+        missing = [dependency for dependency in depends_on if dependency not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self.stages[name] = (func, list(depends_on))
+
+    def _run_stage(self, name, func, args):
+        """
+        Runs a single stage and records its start time and duration relative to the pipeline start.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] = {'start': start - self._start, 'duration': time.perf_counter() - start}
+
+    def run(self):
+        """
+        Runs every stage once all of its dependencies have finished and returns a dict of stage results.
+
+        If a stage raises, it is reported as failed and the stages depending on it are skipped;
+        independent branches keep running.
+        """
+        self.results = {}
+        self.timings = {}
+        self.status = {}
+        self._start = time.perf_counter()
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name, (func, depends_on) in list(pending.items()):
+                    if any(self.status.get(dependency) in ('failed', 'skipped') for dependency in depends_on):
+                        self.status[name] = 'skipped'
+                        del pending[name]
+                    elif all(self.status.get(dependency) == 'done' for dependency in depends_on):
+                        args = [self.results[dependency] for dependency in depends_on]
+                        running[executor.submit(self._run_stage, name, func, args)] = name
+                        del pending[name]
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                        self.status[name] = 'done'
+                    except Exception as e:
+                        self.status[name] = 'failed'
+                        print(f"Stage '{name}' failed: {e}")
+
+        self.wall_time = time.perf_counter() - self._start
+        return self.results
+
+    def report(self):
+        """
+        Prints the start offset, duration and status of each stage, and the total wall time.
+        """
+        print(f"{'stage':<28}{'start (s)':>10}{'duration (s)':>14}  status")
+        for name in sorted(self.stages, key=lambda stage: self.timings.get(stage, {}).get('start', float('inf'))):
+            timing = self.timings.get(name)
+            start = f"{timing['start']:.2f}" if timing else '-'
+            duration = f"{timing['duration']:.2f}" if timing else '-'
+            print(f"{name:<28}{start:>10}{duration:>14}  {self.status.get(name, 'pending')}")
+        busy_time = sum(timing['duration'] for timing in self.timings.values())
+        print(f"wall time: {self.wall_time:.2f}s (sum of stage times: {busy_time:.2f}s)")
+
+
+def build_star_schema_pipeline(sources, source_creds, target_creds, max_workers=6, use_copy=True, backend='pandas',
+                               typed=True, clean_processes=1, dedup_index=None, quarantine_dir='quarantine'):
+    """
+    Builds the pipeline loading the six star-schema tables. Each source is an independent
+    extract -> clean -> load branch; the final 'star_schema' stage waits for all loads.
+
+    With typed=True the tables are created with their schema/*.sql types before the load: a 'drop_foreign_keys'
+    stage first drops the foreign keys, so the concurrent loads don't lock each other's tables, and the
+    'star_schema' stage adds them back and rebuilds the rollup tables of rollups.py. Before the load,
+    a 'check_*' stage removes the rows of each referencing table (orders_table) whose foreign keys match no row
+    of the cleaned referenced tables, and writes them to quarantine_dir, so every foreign key can be added.
+
+    Parameters:
+    - sources (dict): Source locations with the keys users_table, orders_table, card_pdf_link,
+      number_of_stores_endpoint, store_endpoint, api_header, products_s3_url and date_times_url.
+    - source_creds (str): Path to the YAML credentials of the RDS source database.
+    - target_creds (str): Path to the YAML credentials of the target database.
+    - max_workers (int): Maximum number of stages running at the same time.
+    - use_copy (bool): If True, untyped tables are bulk loaded with COPY FROM STDIN (typed loads always use COPY).
+    - backend (str): DataCleaning backend, 'pandas' or 'polars'.
+    - typed (bool): If True, tables are loaded with upload_typed_table instead of upload_to_db.
+    - clean_processes (int): Worker processes each large table is cleaned with (pandas backend only).
+    - dedup_index (RowHashIndex, optional): Row hash sets replaced with each loaded table's rows, so later
+      incremental loads (DataCleaning.load_rds_table_incrementally) skip rows this run loaded.
+    - quarantine_dir (str, optional): Directory the orphan rows are written to, see quarantine_orphans.
+      None loads the rows unchecked.
+    """
+    cleaner = DataCleaning(source_creds, backend=backend, workers=clean_processes)
+    extractor = cleaner.db_extractor
+    target_connector = DatabaseConnector(target_creds)
+    header = sources.get('api_header', {})
+
+    def extract_stores():
+        number_of_stores = extractor.list_number_of_stores(sources['number_of_stores_endpoint'], header)
+        return extractor.retrieve_stores_data(sources['store_endpoint'], number_of_stores, header,
+                                              max_workers=sources.get('store_workers', 16))
+
+    branches = {
+        'users': (partial(extractor.read_rds_table, sources['users_table']), cleaner.clean_user_data, 'dim_users'),
+        'orders': (partial(extractor.read_rds_table, sources['orders_table']), cleaner.clean_orders_data,
+                   'orders_table'),
+        'card_details': (partial(extractor.retrieve_pdf_data, sources['card_pdf_link']), cleaner.clean_card_data,
+                         'dim_card_details'),
+        'store_details': (extract_stores, cleaner.clean_store_data, 'dim_store_details'),
+        'products': (partial(extractor.extract_from_s3, sources['products_s3_url']), cleaner.clean_products_data,
+                     'dim_products'),
+        'date_times': (partial(extractor.extract_from_json, sources['date_times_url']), cleaner.clean_date_times,
+                       'dim_date_times'),
+    }
+
+    pipeline = Pipeline(max_workers=max_workers)
+    load_after = []
+    if typed:
+        pipeline.add_stage('drop_foreign_keys', target_connector.drop_foreign_keys)
+        load_after = ['drop_foreign_keys']
+    for name, (extract, clean, table_name) in branches.items():
+        pipeline.add_stage(f'extract_{name}', extract)
+        pipeline.add_stage(f'clean_{name}', clean, depends_on=[f'extract_{name}'])
+    branch_names = {table_name: name for name, (_, _, table_name) in branches.items()}
+    for name, (_, _, table_name) in branches.items():
+        referenced_tables = sorted({key[2] for key in foreign_keys(table_name)}) if typed and quarantine_dir else []
+        load_input = f'clean_{name}'
+        if referenced_tables:
+            load_input = f'check_{name}'
+            depends_on = [f'clean_{name}'] + [f'clean_{branch_names[table]}' for table in referenced_tables]
+            pipeline.add_stage(load_input, partial(_check, table_name, referenced_tables, quarantine_dir),
+                               depends_on=depends_on)
+        pipeline.add_stage(f'load_{name}', partial(_load, target_connector, table_name, use_copy, typed, dedup_index),
+                           depends_on=[load_input] + load_after)
+    pipeline.add_stage('star_schema', partial(_finish_star_schema, target_connector, typed),
+                       depends_on=[f'load_{name}' for name in branches])
+    return pipeline
+
+
+def _check(table_name, referenced_tables, quarantine_dir, clean_data, *referenced_data):
+    """
+    Referential integrity stage: returns the cleaned rows of a table without its orphans, given the cleaned
+    DataFrames of the tables it references in the order of referenced_tables.
+    """
+    return quarantine_orphans(table_name, clean_data, dict(zip(referenced_tables, referenced_data)), quarantine_dir)
+
+
+def _load(target_connector, table_name, use_copy, typed, dedup_index, clean_data, dropped_keys=None):
+    """
+    Load stage: uploads a cleaned DataFrame, records its row hashes in the dedup index if given,
+    and returns the table name. dropped_keys is the result of the 'drop_foreign_keys' stage of typed loads.
+    Raises RuntimeError if the upload failed, so the stages depending on the table are skipped.
+    """
+    if typed:
+        loaded = target_connector.upload_typed_table(clean_data, table_name)
+    else:
+        loaded = target_connector.upload_to_db(clean_data, table_name, use_copy=use_copy)
+    if not loaded:
+        raise RuntimeError(f"Loading '{table_name}' failed")
+    if dedup_index is not None:
+        dedup_index.replace(table_name, clean_data)
+    return table_name
+
+
+def _finish_star_schema(target_connector, typed, *loaded):
+    """
+    Final stage: once every table is loaded, adds the foreign keys and rebuilds the rollups of typed tables.
+    Returns the loaded table names.
+    """
+    if typed:
+        target_connector.add_foreign_keys()
+        RollupManager(target_connector).rebuild()
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract, clean and load the star-schema tables concurrently.")
+    parser.add_argument('config', help="YAML file with source_creds, target_creds and a sources mapping.")
+    parser.add_argument('--workers', type=int, default=6, help="Maximum number of stages running at the same time.")
+    parser.add_argument('--no-copy', action='store_true', help="Upload with INSERT statements instead of COPY.")
+    parser.add_argument('--untyped', action='store_true',
+                        help="Load TEXT/BIGINT tables with upload_to_db and leave the schema/*.sql scripts to be run by hand.")
+    parser.add_argument('--backend', choices=['pandas', 'polars'], default='pandas', help="Cleaning backend.")
+    parser.add_argument('--clean-processes', type=int, default=1,
+                        help="Clean large tables in this many worker processes (pandas backend only).")
+    parser.add_argument('--quarantine-dir', default='quarantine',
+                        help="Directory the orders rows with foreign keys matching no dimension row are written to.")
+    parser.add_argument('--no-integrity-check', action='store_true',
+                        help="Load the orders rows without checking their foreign keys against the cleaned dimensions.")
+    parser.add_argument('--dedup-index', help="Directory of the row hash sets of the loaded tables, see RowHashIndex.")
+    parser.add_argument('--metrics-jsonl', help="Append a JSON line of stage metrics per instrumented call to this file.")
+    parser.add_argument('--metrics-prom', help="Write per-stage metric totals to this Prometheus textfile.")
+    parser.add_argument('--metrics-memory', action='store_true', help="Also record peak memory per stage (slower).")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as file:
+        config = yaml.safe_load(file)
+    if args.metrics_jsonl or args.metrics_prom:
+        enable_instrumentation(args.metrics_jsonl, track_memory=args.metrics_memory)
+    pipeline = build_star_schema_pipeline(config['sources'], config['source_creds'], config['target_creds'],
+                                          max_workers=args.workers, use_copy=not args.no_copy,
+                                          backend=args.backend, typed=not args.untyped,
+                                          clean_processes=args.clean_processes,
+                                          dedup_index=RowHashIndex(args.dedup_index) if args.dedup_index else None,
+                                          quarantine_dir=None if args.no_integrity_check else args.quarantine_dir)
+    pipeline.run()
+    pipeline.report()
+    if args.metrics_prom:
+        write_prometheus_textfile(args.metrics_prom)
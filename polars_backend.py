@@ -0,0 +1,440 @@
+from cleaning_spec import CLEANING_SPECS, COLUMN_OPERATIONS, COLUMN_READING_OPERATIONS, CleaningPlan
+from data_cleaning import DATE_FORMATS, PHONE_NUMBER_RULES
+from dedup_index import duplicated_rows
+import numpy as np
+import pandas as pd
+import polars as pl
+import re
+
+# Column holding each row's position in the input frame, used to restore the pandas index.
+ROW_POSITION = '__row_position__'
+# pandas.api.types.infer_dtype kinds of object columns polars can't convert, e.g. card numbers read by tabula
+# as ints in some rows and strings in others.
+MIXED_KINDS = {'mixed', 'mixed-integer'}
+
+
+class _MixedColumn(Exception):
+    """
+    Raised when a column can't be converted to polars without changing its values; the plan then runs on pandas.
+    """
+
+
+def _is_mixed(values):
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in MIXED_KINDS
+
+
+def _reads_text(name, arguments):
+    """
+    Returns True if an operation gives the same result for a value and for its text, so a mixed column
+    it runs on first can enter polars as strings.
+    """
+    return name == 'integer' or (name == 'dtype' and arguments == ['string'])
+
+
+def _pandas_null(name, arguments):
+    """
+    Returns the missing value the pandas implementation of an operation leaves in an object column
+    (polars gives None), or None if the operation keeps the missing values of its input.
+    """
+    if name == 'time_format' or (name == 'date' and arguments == ['date_objects']):
+        return pd.NaT
+    if name in ('regex', 'allowed', 'phone', 'date'):
+        return np.nan
+    return None
+
+
+def _text(expr):
+    return expr.cast(pl.String)
+
+
+def _to_float(expr):
+    return _text(expr).str.strip_chars().cast(pl.Float64, strict=False)
+
+
+def _anchored(pattern):
+    # pandas str.match only matches at the start of the value, polars str.contains anywhere.
+    # Python allows escaping any character, the polars regex engine only ASCII ones.
+    pattern = re.sub(r'\\([^\x00-\x7f])', r'\1', pattern)
+    return pattern if pattern.startswith('^') else f'^(?:{pattern})'
+
+
+def _supports_pattern(pattern):
+    """
+    Returns True if the polars regex engine accepts a (Python) pattern.
+    """
+    try:
+        pl.Series([''], dtype=pl.String).str.contains(_anchored(pattern))
+    except pl.exceptions.ComputeError:
+        return False
+    return True
+
+
+def _max_length(expr, cleaner, max_length):
+    return pl.when(_text(expr).str.len_chars() > max_length).then(None).otherwise(expr)
+
+
+def _dtype(expr, cleaner, dtype):
+    return expr
+
+
+def _remove(expr, cleaner, characters):
+    return _text(expr).str.replace_all(characters, '', literal=True)
+
+
+def _regex(expr, cleaner, pattern):
+    return pl.when(_text(expr).str.contains(_anchored(pattern))).then(expr).otherwise(None)
+
+
+def _allowed(expr, cleaner, allowed):
+    return pl.when(expr.is_in(allowed)).then(expr).otherwise(None)
+
+
+def _categories(expr, cleaner, categories):
+    return _allowed(expr, cleaner, categories)
+
+
+def _replace(expr, cleaner, replacements):
+    return expr.replace(replacements)
+
+
+def _parse_dates(text, cleaner):
+    """
+    Parses a String Series like DataCleaning._parse_dates: each format in DATE_FORMATS is tried on the
+    values still unparsed only, and the residual values go to its pandas format='mixed' fallback.
+    """
+    parsed = pl.repeat(None, len(text), dtype=pl.Datetime('ns'), eager=True).alias(text.name)
+    remaining = text.is_not_null()
+    for date_format in DATE_FORMATS:
+        positions = remaining.arg_true()
+        if len(positions) == 0:
+            return parsed
+        attempt = text.gather(positions).str.strptime(pl.Datetime('ns'), date_format, strict=False)
+        matched = attempt.is_not_null()
+        parsed = parsed.scatter(positions.filter(matched), attempt.filter(matched))
+        remaining = remaining.scatter(positions.filter(matched), False)
+
+    positions = remaining.arg_true()
+    if len(positions) == 0:
+        return parsed
+    fallback = cleaner._parse_dates(pd.Series(text.gather(positions).to_numpy()), formats=[])
+    return parsed.scatter(positions, pl.Series(fallback.to_numpy(dtype='datetime64[ns]')))
+
+
+def _date(expr, cleaner, output='strings'):
+    parsed = _text(expr).map_batches(lambda text: _parse_dates(text, cleaner), return_dtype=pl.Datetime('ns'))
+    if cleaner.native_dates or output == 'date_objects':
+        return parsed
+    return parsed.dt.strftime('%Y-%m-%d')
+
+
+def _time_format(expr, cleaner, time_format):
+    return _text(expr).str.strptime(pl.Time, time_format, strict=False)
+
+
+def _integer(expr, cleaner, fill_value):
+    return _to_float(expr).fill_null(fill_value).cast(pl.Int64)
+
+
+def _date_number(expr, cleaner):
+    return _to_float(expr)
+
+
+def _phone(expr, cleaner, country_code_column):
+    # Like DataCleaning._invalid_phone_numbers: only numbers of countries with a rule can be invalid.
+    valid = pl.lit(True)
+    country_codes = pl.col(country_code_column)
+    for country_code, rule in reversed(list(PHONE_NUMBER_RULES.items())):
+        valid = pl.when(country_codes == country_code).then(
+            _text(expr).str.contains(_anchored(rule.pattern)).fill_null(False)).otherwise(valid)
+    return pl.when(valid).then(expr).otherwise(None)
+
+
+# Operation name -> function(expr, cleaner, *arguments) returning a polars expression.
+# Operations missing here ('date_format', 'numeric_downcast', 'coordinate', 'weight') and regex patterns
+# polars can't run use their pandas implementation from cleaning_spec, see PolarsCleaningPlan._run_on_pandas.
+# 'coordinate' stays on pandas because polars formats small floats differently ('0.00001' vs '1e-05').
+POLARS_OPERATIONS = {
+    'max_length': _max_length,
+    'dtype': _dtype,
+    'remove': _remove,
+    'regex': _regex,
+    'allowed': _allowed,
+    'categories': _categories,
+    'replace': _replace,
+    'date': _date,
+    'time_format': _time_format,
+    'integer': _integer,
+    'date_number': _date_number,
+    'phone': _phone,
+}
+
+
+def _finish_date(values, cleaner, output='strings'):
+    return values.dt.date if output == 'date_objects' and not cleaner.native_dates else values
+
+
+def _finish_date_number(values, cleaner):
+    values = pd.to_numeric(values, downcast='integer').astype('Int64')
+    return values if cleaner.compact else values.astype('string')
+
+
+# Operation name -> function(values, cleaner, *arguments) giving a converted pandas column the dtype the
+# pandas backend produces. The last operation of a column with a finisher decides the column's dtype.
+PANDAS_FINISHERS = {
+    'dtype': lambda values, cleaner, dtype: values.astype(dtype),
+    'categories': lambda values, cleaner, categories: values.astype(
+        pd.CategoricalDtype(categories) if cleaner.compact else 'string'),
+    'date': _finish_date,
+    'date_number': _finish_date_number,
+}
+
+
+class PolarsCleaningPlan(CleaningPlan):
+    """
+    This class compiles a cleaning spec into polars expressions. Columns are cleaned in parallel on the
+    polars thread pool, and the row filters run as one multi-threaded filter.
+    The result is converted back to pandas with the same index, values and dtypes as CleaningPlan.
+
+    Parameters:
+    - spec (dict): Cleaning spec, see CLEANING_SPECS.
+    """
+
+    def __init__(self, spec):
+        """
+        Compiles the spec like CleaningPlan and checks which regex patterns polars can run.
+
+        Parameters:
+        - spec (dict): Cleaning spec, see CLEANING_SPECS.
+        """
+        super().__init__(spec)
+        self.column_operations = {column: [(name, arguments) for name, *arguments in operations]
+                                  for column, operations in spec.get('columns', {}).items()}
+        self.columns_read = {column: [arguments[0] for name, arguments in operations
+                                      if name in COLUMN_READING_OPERATIONS]
+                             for column, operations in self.column_operations.items()}
+
+    @staticmethod
+    def _runs_in_polars(name, arguments):
+        """
+        Returns True if an operation has a polars implementation that accepts its arguments.
+        """
+        if name not in POLARS_OPERATIONS:
+            return False
+        if name == 'regex':
+            return _supports_pattern(arguments[0])
+        if name == 'phone':
+            return all(_supports_pattern(rule.pattern) for rule in PHONE_NUMBER_RULES.values())
+        return True
+
+    def _column_segments(self, column):
+        """
+        Splits a column's operations into segments, each either ('polars', [(name, arguments), ...])
+        or ('pandas', [(name, arguments)]) for an operation that runs on its pandas implementation.
+        """
+        segments = []
+        for name, arguments in self.column_operations[column]:
+            engine = 'polars' if self._runs_in_polars(name, arguments) else 'pandas'
+            if segments and engine == 'polars' and segments[-1][0] == 'polars':
+                segments[-1][1].append((name, arguments))
+            else:
+                segments.append((engine, [(name, arguments)]))
+        return segments
+
+    def _finisher(self, column):
+        """
+        Returns the (name, arguments) of the last operation of a column that decides its pandas dtype, or None.
+        Operations running on pandas are returned as ('pandas', arguments).
+        """
+        finisher = None
+        for name, arguments in self.column_operations[column]:
+            if not self._runs_in_polars(name, arguments):
+                finisher = ('pandas', arguments)
+            elif name in PANDAS_FINISHERS:
+                finisher = (name, arguments)
+        return finisher
+
+    @staticmethod
+    def _polars_expression(column, operations, cleaner):
+        expr = pl.col(column)
+        for name, arguments in operations:
+            expr = POLARS_OPERATIONS[name](expr, cleaner, *arguments)
+        return expr.alias(column)
+
+    @staticmethod
+    def _run_on_pandas(frame, column, name, arguments, cleaner, input_index, finisher=None):
+        """
+        Runs the pandas implementation of an operation on a column of the polars frame and returns the pandas result.
+        finisher, the last dtype-deciding polars operation before it, converts the column to the dtype the
+        operation gets with the pandas backend. The pandas frame carries the rows' input index, so per-row
+        results stored on the cleaner (e.g. card_number_rejections) use the same labels as with the pandas backend.
+        """
+        read_columns = [arguments[0]] if name in COLUMN_READING_OPERATIONS else []
+        pandas_frame = frame.select([column, *read_columns]).to_pandas()
+        pandas_frame.index = input_index[frame.get_column(ROW_POSITION).to_numpy()]
+        if finisher is not None:
+            pandas_frame[column] = PANDAS_FINISHERS[finisher[0]](pandas_frame[column], cleaner, *finisher[1])
+        return COLUMN_OPERATIONS[name](pandas_frame[column], pandas_frame, cleaner, *arguments)
+
+    def _clean_columns(self, frame, columns, cleaner, input_index):
+        """
+        Cleans columns that don't read each other. Consecutive polars operations of all columns run as
+        one with_columns call, operations without a polars version run one column at a time in between.
+        Returns the frame and the pandas dtypes of the columns last changed by a pandas operation.
+        """
+        remaining = {column: self._column_segments(column) for column in columns}
+        finishers = {}
+        pandas_dtypes = {}
+        while any(remaining.values()):
+            expressions = []
+            for column, segments in remaining.items():
+                if segments and segments[0][0] == 'polars':
+                    operations = segments.pop(0)[1]
+                    expressions.append(self._polars_expression(column, operations, cleaner))
+                    finishers[column] = next(((name, arguments) for name, arguments in reversed(operations)
+                                              if name in PANDAS_FINISHERS), finishers.get(column))
+            if expressions:
+                frame = frame.with_columns(expressions)
+            for column, segments in remaining.items():
+                if segments and segments[0][0] == 'pandas':
+                    [(name, arguments)] = segments.pop(0)[1]
+                    values = self._run_on_pandas(frame, column, name, arguments, cleaner, input_index,
+                                                 finishers.pop(column, None))
+                    pandas_dtypes[column] = values.dtype
+                    if _is_mixed(values):
+                        raise _MixedColumn(column)
+                    frame = frame.with_columns(pl.from_pandas(values.reset_index(drop=True)).alias(column))
+        return frame, pandas_dtypes
+
+    def _column_batches(self, columns):
+        """
+        Splits the dependency-ordered columns into batches that can be cleaned by one with_columns call,
+        i.e. no column reads another column of its own batch.
+        """
+        batches = [[]]
+        for column in columns:
+            if any(read in batches[-1] for read in self.columns_read[column]):
+                batches.append([])
+            batches[-1].append(column)
+        return [batch for batch in batches if batch]
+
+    @staticmethod
+    def _filter_frame(frame, row_filter):
+        """
+        Applies dropna and drop_duplicates as one polars filter. The row position column is ignored.
+        """
+        columns = [column for column in frame.columns if column != ROW_POSITION]
+        conditions = []
+        if 'dropna' in row_filter:
+            for column in columns:
+                condition = pl.col(column).is_not_null()
+                if frame.schema[column].is_float():
+                    condition = condition & pl.col(column).is_not_nan()
+                conditions.append(condition)
+        if 'drop_duplicates' in row_filter:
+            conditions.append(pl.struct(columns).is_first_distinct())
+        return frame.filter(pl.all_horizontal(conditions))
+
+    def _text_columns(self, df):
+        """
+        Returns the object columns of df mixing strings with other values, which enter polars as strings.
+        Raises _MixedColumn if such a column has no operation reading its values as text.
+        """
+        text_columns = []
+        for column in df.columns:
+            if _is_mixed(df[column]):
+                operations = self.column_operations.get(self.rename.get(column, column))
+                if not operations or not _reads_text(*operations[0]):
+                    raise _MixedColumn(column)
+                text_columns.append(column)
+        return text_columns
+
+    def run(self, cleaner, df):
+        """
+        Runs the plan on a pandas DataFrame and returns the cleaned pandas DataFrame.
+
+        Frames with a mixed-type object column that can't enter polars as strings are cleaned by the
+        pandas CleaningPlan instead.
+
+        Parameters:
+        - cleaner (DataCleaning): Provides the parsing helpers and the native_dates / compact options.
+        - df (pd.DataFrame): Raw DataFrame.
+        """
+        try:
+            return self._run(cleaner, df)
+        except _MixedColumn as e:
+            print(f"Column '{e}' mixes strings with other values, cleaning on pandas")
+            return super().run(cleaner, df)
+
+    def _run(self, cleaner, df):
+        columns = [column for column in df.columns if column not in self.drop_columns]
+        selected = df[columns] if self.drop_columns else df
+        row_filter = self.row_filter
+        text_columns = self._text_columns(selected)
+        keep = None
+        if text_columns:
+            # 12 and '12' are different values to pandas, so duplicates are found before they become strings.
+            if 'drop_duplicates' in row_filter:
+                keep = ~duplicated_rows(selected)
+                row_filter = row_filter - {'drop_duplicates'}
+            selected = selected.copy()
+            for column in text_columns:
+                selected[column] = selected[column].astype('string')
+        frame = pl.from_pandas(selected)
+        frame = frame.rename({column: new for column, new in self.rename.items() if column in frame.columns})
+        frame = frame.with_columns(pl.int_range(pl.len(), dtype=pl.Int64).alias(ROW_POSITION))
+        if keep is not None:
+            frame = frame.filter(pl.Series(keep))
+        if row_filter:
+            frame = self._filter_frame(frame, row_filter)
+        if self.fill_first_row is not None:
+            first_row = pl.int_range(pl.len()) == 0
+            frame = frame.with_columns([
+                pl.when(first_row).then(pl.col(column).cast(pl.String).fill_null(self.fill_first_row))
+                .otherwise(pl.col(column).cast(pl.String)).alias(column)
+                for column, dtype in frame.schema.items() if dtype in (pl.String, pl.Null)])
+
+        pandas_dtypes = {}
+        for batch in self._column_batches([column for column, _ in self.column_steps]):
+            frame, batch_dtypes = self._clean_columns(frame, batch, cleaner, df.index)
+            pandas_dtypes.update(batch_dtypes)
+
+        if self.final_filter:
+            frame = self._filter_frame(frame, self.final_filter)
+
+        positions = frame.get_column(ROW_POSITION).to_numpy()
+        result = frame.drop(ROW_POSITION).to_pandas()
+        result.index = df.index[positions]
+        for column, _ in self.column_steps:
+            finisher = self._finisher(column)
+            if finisher is None:
+                continue
+            name, arguments = finisher
+            if name == 'pandas':
+                result[column] = result[column].astype(pandas_dtypes[column])
+            else:
+                result[column] = PANDAS_FINISHERS[name](result[column], cleaner, *arguments)
+        for column, _ in self.column_steps:
+            null = _pandas_null(*self.column_operations[column][-1])
+            if null is not None and result[column].dtype == object:
+                missing = result[column].isna().to_numpy()
+                if missing.any():
+                    result[column] = result[column].where(~missing, null)
+        # Derived columns are computed from the converted columns, so they match the pandas backend exactly.
+        for column, function, arguments in self.derived_columns:
+            result[column] = function(result, cleaner, *arguments)
+        return result
+
+
+COMPILED_POLARS_PLANS = {}
+
+
+def get_polars_cleaning_plan(table_name):
+    """
+    Returns the compiled PolarsCleaningPlan of a table in CLEANING_SPECS, compiling it on first use.
+
+    Parameters:
+    - table_name (str): Key of the table in CLEANING_SPECS.
+    """
+    if table_name not in COMPILED_POLARS_PLANS:
+        COMPILED_POLARS_PLANS[table_name] = PolarsCleaningPlan(CLEANING_SPECS[table_name])
+    return COMPILED_POLARS_PLANS[table_name]
@@ -0,0 +1,83 @@
+import hashlib
+import re
+import pandas as pd
+from raw_cache import RawSourceCache
+
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+CTE_NAME = re.compile(r'\b(\w+)\s+AS\s*\(', re.IGNORECASE)
+# FROM keywords of expressions, e.g. EXTRACT(HOUR FROM AVG(gap)) or a IS DISTINCT FROM b, which don't name a table.
+EXPRESSION_FROM = re.compile(r'\bEXTRACT\s*\(\s*\w+\s+FROM\b|\bIS\s+(?:NOT\s+)?DISTINCT\s+FROM\b', re.IGNORECASE)
+
+
+def query_tables(query):
+    """
+    Returns the sorted names of the tables a query reads, i.e. the names after FROM and JOIN
+    that are not defined by a WITH clause of the query. The FROM of EXTRACT and IS DISTINCT FROM is skipped.
+
+    Parameters:
+    - query (str): SQL query.
+    """
+    query = EXPRESSION_FROM.sub(' ', query)
+    return sorted(set(TABLE_REFERENCE.findall(query)) - set(CTE_NAME.findall(query)))
+
+
+class QueryResultCache(RawSourceCache):
+    """
+    This class caches SQL query results on disk as Parquet files.
+
+    An entry is keyed by the database, a hash of the query text and the data versions of every table the query
+    reads, which the load steps of DatabaseConnector bump in the table_versions table once the first lookup has
+    created it (DatabaseConnector.get_table_versions). Reloading a table therefore
+    misses exactly the queries that read it, while the other results keep being served from the cache.
+    Stale entries are never read again and age out with the least recently used eviction.
+
+    Parameters:
+    - cache_dir (str): Directory the Parquet files are stored in.
+    - max_bytes (int): Maximum total size of the cached files.
+    - bypass (bool): If True, lookups always miss, but fresh results still refresh the cache.
+    """
+
+    def __init__(self, cache_dir='.query_cache', max_bytes=256 * 1024 ** 2, bypass=False):
+        """
+        Initializes the QueryResultCache instance.
+
+        Parameters:
+        - cache_dir (str): Directory the Parquet files are stored in.
+        - max_bytes (int): Maximum total size of the cached files.
+        - bypass (bool): If True, lookups always miss, but fresh results still refresh the cache.
+        """
+        super().__init__(cache_dir, max_bytes, bypass)
+        self.hits = 0
+        self.misses = 0
+
+    def identity(self, connector, query):
+        """
+        Returns the cache identity of a query: database, query hash and the versions of the tables it reads.
+
+        Parameters:
+        - connector (DatabaseConnector): Connector of the database the query runs on.
+        - query (str): SQL query.
+        """
+        versions = connector.get_table_versions(query_tables(query))
+        return ('query', connector.db_engine.url.render_as_string(hide_password=True),
+                hashlib.sha256(query.encode()).hexdigest(), sorted(versions.items()))
+
+    def run_query(self, connector, query):
+        """
+        Returns (column names, rows) of a query, from the cache if none of the tables it reads has been
+        reloaded since the result was stored, otherwise from the database.
+
+        Parameters:
+        - connector (DatabaseConnector): Connector of the database the query runs on.
+        - query (str): SQL query.
+        """
+        identity = self.identity(connector, query)
+        df = self.get(identity)
+        if df is not None:
+            self.hits += 1
+            rows = df.astype(object).where(df.notna(), None)
+            return list(df.columns), list(rows.itertuples(index=False, name=None))
+        self.misses += 1
+        columns, rows = connector.run_query(query)
+        self.put(identity, pd.DataFrame.from_records(rows, columns=columns))
+        return columns, rows
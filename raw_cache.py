@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+
+class RawSourceCache():
+    """
+    This class caches extracted raw source DataFrames on disk as Parquet files.
+
+    Entries are content addressed: the file name is a hash of the source identity and its version
+    (e.g. S3 ETag, PDF content hash, API response digest), so a changed source never hits a stale entry.
+    The least recently used entries are evicted once the cache grows past max_bytes.
+
+    Parameters:
+    - cache_dir (str): Directory the Parquet files are stored in.
+    - max_bytes (int): Maximum total size of the cached files.
+    - bypass (bool): If True, lookups always miss, but fresh extracts still refresh the cache.
+    """
+
+    def __init__(self, cache_dir='.raw_cache', max_bytes=2 * 1024 ** 3, bypass=False):
+        """
+        Initializes the RawSourceCache instance.
+
+        Parameters:
+        - cache_dir (str): Directory the Parquet files are stored in.
+        - max_bytes (int): Maximum total size of the cached files.
+        - bypass (bool): If True, lookups always miss, but fresh extracts still refresh the cache.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, identity):
+        """
+        Returns the Parquet path of a source identity.
+
+        Parameters:
+        - identity (tuple): Source identity and version, e.g. ('s3', bucket, key, etag).
+        """
+        digest = hashlib.sha256(json.dumps(list(identity), default=str).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.parquet')
+
+    def get(self, identity):
+        """
+        Returns the cached DataFrame of a source identity, or None on a miss.
+
+        Parameters:
+        - identity (tuple): Source identity and version.
+        """
+        path = self._path(identity)
+        if self.bypass or not os.path.exists(path):
+            return None
+        os.utime(path)
+        return pd.read_parquet(path)
+
+    def put(self, identity, df):
+        """
+        Stores a DataFrame for a source identity and evicts least recently used entries if needed.
+
+        Parameters:
+        - identity (tuple): Source identity and version.
+        - df (pd.DataFrame): Extracted raw DataFrame.
+        """
+        path = self._path(identity)
+        try:
+            df.to_parquet(f'{path}.tmp')
+            os.replace(f'{path}.tmp', path)
+        except (ValueError, TypeError, ImportError) as e:
+            if os.path.exists(f'{path}.tmp'):
+                os.remove(f'{path}.tmp')
+            print(f"Could not cache raw source {identity[0]}: {e}")
+            return
+        self.evict()
+
+    def get_or_extract(self, identity, extract):
+        """
+        Returns the cached DataFrame of a source identity, calling extract and caching its result on a miss.
+
+        Parameters:
+        - identity (tuple): Source identity and version.
+        - extract (callable): Function returning the freshly extracted DataFrame.
+        """
+        df = self.get(identity)
+        if df is not None:
+            print(f"Raw source {identity[0]} loaded from cache.")
+            return df
+        df = extract()
+        if isinstance(df, pd.DataFrame):
+            self.put(identity, df)
+        return df
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the cache is within max_bytes.
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, file_name))
+            total_bytes -= size
+
+    def clear(self):
+        """
+        Deletes every cached entry.
+        """
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.parquet'):
+                os.remove(os.path.join(self.cache_dir, file_name))
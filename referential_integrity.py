@@ -0,0 +1,141 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from database_utils import SCHEMA_DIR, read_schema_statements
+
+FOREIGN_KEY = re.compile(r'ADD\s+CONSTRAINT\s+"?(\w+)"?\s+FOREIGN\s+KEY\s*\(\s*"?(\w+)"?\s*\)\s+'
+                         r'REFERENCES\s+"?(\w+)"?\s*\(\s*"?(\w+)"?\s*\)', re.IGNORECASE)
+# DELETE statements of schema/*.sql whose effect on the referenced keys is mirrored before the check.
+SIMPLE_DELETE = re.compile(r'DELETE\s+FROM\s+"?\w+"?\s+WHERE\s+"?(\w+)"?\s*(?:(IS\s+NULL)|=\s*\'([^\']*)\')$',
+                           re.IGNORECASE)
+
+
+def foreign_keys(table_name, schema_dir=SCHEMA_DIR):
+    """
+    Returns the foreign keys schema/*.sql adds to a table, as a list of
+    (constraint name, column, referenced table, referenced column, True if the column is a UUID).
+
+    Parameters:
+    - table_name (str): Referencing table, e.g. orders_table.
+    - schema_dir (str): Directory containing the schema SQL scripts.
+    """
+    statements = read_schema_statements(schema_dir).get(table_name, [])
+    uuid_columns = {match.group(1) for statement in statements
+                    for match in [re.search(r'ALTER\s+COLUMN\s+"?(\w+)"?\s+TYPE\s+UUID\b', statement, re.IGNORECASE)]
+                    if match}
+    return [(name, column, referenced_table, referenced_column, column in uuid_columns)
+            for statement in statements
+            for name, column, referenced_table, referenced_column in FOREIGN_KEY.findall(statement)]
+
+
+def key_values(series, uuid=False):
+    """
+    Returns the values of a key column as the text the database compares once the schema types are applied:
+    integers as their digits and UUIDs in the canonical lower case, hyphenated form.
+
+    Parameters:
+    - series (pd.Series): Key column of a cleaned DataFrame.
+    - uuid (bool): If True, the column is cast to UUID by the schema.
+    """
+    values = series.astype('string')
+    if uuid:
+        values = values.str.lower()
+        # UUIDs in braces or without hyphens are rare, so only values of another length are rewritten.
+        odd = values.str.len().ne(36).fillna(False).to_numpy()
+        if odd.any():
+            digits = values[odd].str.replace(r'[{}-]', '', regex=True)
+            canonical = (digits.str[:8] + '-' + digits.str[8:12] + '-' + digits.str[12:16] + '-' +
+                         digits.str[16:20] + '-' + digits.str[20:])
+            values[odd] = canonical.where(digits.str.len().eq(32), values[odd])
+    return values
+
+
+def _kept_rows(table_name, df, schema_dir):
+    """
+    Returns a boolean mask of the rows of a referenced table that its schema DELETE statements leave in place.
+    Only DELETEs on 'column IS NULL' or 'column = literal' are mirrored.
+    """
+    kept = np.ones(len(df), dtype=bool)
+    for statement in read_schema_statements(schema_dir).get(table_name, []):
+        if not re.match(r'DELETE\b', statement, re.IGNORECASE):
+            continue
+        match = SIMPLE_DELETE.match(statement)
+        if match is None or match.group(1) not in df.columns:
+            print(f"Referential integrity check can't mirror '{statement}'")
+            continue
+        column = df[match.group(1)]
+        kept &= ~(column.isna() if match.group(2) else column.astype('string').eq(match.group(3)).fillna(False))
+    return kept
+
+
+def build_key_indexes(keys, dimensions, schema_dir=SCHEMA_DIR):
+    """
+    Returns a dict of (referenced table, referenced column) to a hash index (pd.Index) of the distinct key
+    values the table will hold once loaded, built from its cleaned DataFrame.
+
+    Parameters:
+    - keys (list): Foreign keys, from foreign_keys.
+    - dimensions (dict): Cleaned DataFrame of each referenced table, by table name.
+    - schema_dir (str): Directory containing the schema SQL scripts.
+    """
+    indexes = {}
+    for _, _, referenced_table, referenced_column, uuid in keys:
+        if (referenced_table, referenced_column) in indexes:
+            continue
+        df = dimensions[referenced_table]
+        values = key_values(df[referenced_column], uuid)[_kept_rows(referenced_table, df, schema_dir)]
+        indexes[(referenced_table, referenced_column)] = pd.Index(values.dropna().unique())
+    return indexes
+
+
+def find_orphans(df, keys, indexes):
+    """
+    Anti-joins a DataFrame against the key indexes of the tables it references. Returns a boolean mask of the
+    orphan rows and an array of the reason each one is an orphan. Missing values reference nothing, as in
+    the database, so they are never orphans.
+
+    Parameters:
+    - df (pd.DataFrame): Cleaned referencing rows.
+    - keys (list): Foreign keys, from foreign_keys.
+    - indexes (dict): Key indexes, from build_key_indexes.
+    """
+    orphans = np.zeros(len(df), dtype=bool)
+    reasons = np.full(len(df), '', dtype=object)
+    for name, column, referenced_table, referenced_column, uuid in keys:
+        values = key_values(df[column], uuid)
+        missing = (indexes[(referenced_table, referenced_column)].get_indexer(values) < 0) & values.notna().to_numpy()
+        reasons[missing & orphans] += '; '
+        reasons[missing] += f'{name}: {column} not in {referenced_table}.{referenced_column}'
+        orphans |= missing
+    return orphans, reasons[orphans]
+
+
+def quarantine_orphans(table_name, df, dimensions, quarantine_dir='quarantine', schema_dir=SCHEMA_DIR):
+    """
+    Checks the foreign keys schema/*.sql adds to a table against the cleaned DataFrames of the tables
+    they reference, before either is loaded, and returns df without the orphan rows, so adding the
+    foreign keys after the load succeeds.
+
+    The orphans are written with a reason column to quarantine_dir/<table_name>.csv; a quarantine file
+    left by an earlier run is removed when there are none.
+
+    Parameters:
+    - table_name (str): Referencing table, e.g. orders_table.
+    - df (pd.DataFrame): Cleaned referencing rows.
+    - dimensions (dict): Cleaned DataFrame of each referenced table, by table name.
+    - quarantine_dir (str): Directory the quarantine files are written to.
+    - schema_dir (str): Directory containing the schema SQL scripts.
+    """
+    keys = foreign_keys(table_name, schema_dir)
+    orphans, reasons = find_orphans(df, keys, build_key_indexes(keys, dimensions, schema_dir))
+    path = os.path.join(quarantine_dir, f'{table_name}.csv')
+    if not orphans.any():
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"No orphan rows in '{table_name}'")
+        return df
+    os.makedirs(quarantine_dir, exist_ok=True)
+    df[orphans].assign(reason=reasons).to_csv(path, index=False)
+    print(f"Quarantined {orphans.sum()} orphan rows of '{table_name}' to {path}")
+    return df[~orphans]
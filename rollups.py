@@ -0,0 +1,404 @@
+from database_utils import DatabaseConnector
+from instrumentation import instrument_stage
+from query_cache import QueryResultCache
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+import argparse
+import csv
+import os
+import time
+
+# Rollup table -> definition. 'query' aggregates the base tables, with {source} standing for the table named in
+# 'source'; an incremental refresh runs the same query on a staging table of the newly loaded source rows and
+# merges the result in with 'merge' (measure -> how two partial values combine). Rollups without 'merge' are
+# rebuilt whenever one of their tables is loaded. 'depends_on' lists every table the query reads.
+ROLLUPS = {
+    'rollup_monthly_sales': {
+        'source': 'orders_table',
+        'depends_on': ['orders_table', 'dim_date_times', 'dim_products'],
+        'keys': ['year', 'month'],
+        'query': '''
+            SELECT
+                dim_date_times.year,
+                dim_date_times.month,
+                SUM(orders.product_quantity * dim_products.product_price) AS total_sales
+            FROM
+                {source} AS orders
+            JOIN
+                dim_date_times ON orders.date_uuid = dim_date_times.date_uuid
+            JOIN
+                dim_products ON orders.product_code = dim_products.product_code
+            GROUP BY
+                dim_date_times.year, dim_date_times.month''',
+        'merge': {'total_sales': 'sum'},
+    },
+    'rollup_store_sales': {
+        'source': 'orders_table',
+        'depends_on': ['orders_table', 'dim_products'],
+        'keys': ['store_code'],
+        'query': '''
+            SELECT
+                orders.store_code,
+                COUNT(*) AS number_of_sales,
+                SUM(orders.product_quantity) AS product_quantity,
+                SUM(orders.product_quantity * dim_products.product_price) AS total_sales
+            FROM
+                {source} AS orders
+            LEFT JOIN
+                dim_products ON orders.product_code = dim_products.product_code
+            GROUP BY
+                orders.store_code''',
+        'merge': {'number_of_sales': 'sum', 'product_quantity': 'sum', 'total_sales': 'sum'},
+    },
+    'rollup_sales_by_day': {
+        'source': 'dim_date_times',
+        'depends_on': ['dim_date_times'],
+        'keys': ['year', 'month', 'day'],
+        'query': '''
+            SELECT
+                year,
+                month,
+                day,
+                MIN(sale_ts) AS first_sale,
+                MAX(sale_ts) AS last_sale,
+                COUNT(sale_ts) AS number_of_sales
+            FROM
+                {source}
+            GROUP BY
+                year, month, day''',
+        'merge': {'first_sale': 'min', 'last_sale': 'max', 'number_of_sales': 'sum'},
+    },
+    'rollup_store_counts': {
+        'source': 'dim_store_details',
+        'depends_on': ['dim_store_details'],
+        'keys': ['country_code', 'locality'],
+        'query': '''
+            SELECT
+                country_code,
+                locality,
+                COUNT(*) AS number_of_stores,
+                SUM(staff_numbers) AS staff_numbers
+            FROM
+                {source}
+            GROUP BY
+                country_code, locality''',
+    },
+}
+
+# SQL combining two partial values of a measure; NULL (no matching rows) only wins when both sides are NULL.
+MERGE_EXPRESSIONS = {
+    'sum': 'COALESCE({table}.{column} + EXCLUDED.{column}, {table}.{column}, EXCLUDED.{column})',
+    'min': 'LEAST({table}.{column}, EXCLUDED.{column})',
+    'max': 'GREATEST({table}.{column}, EXCLUDED.{column})',
+}
+
+# Task -> query answering SQL_queries/SQL_query_tasks/<task>.sql from the rollups with the same result columns.
+TASK_QUERIES = {
+    'task_1': '''
+        SELECT
+            country_code,
+            SUM(number_of_stores) AS total_no_stores
+        FROM
+            rollup_store_counts
+        GROUP BY
+            country_code;''',
+    'task_2': '''
+        SELECT
+            locality,
+            SUM(number_of_stores) AS total_no_of_stores
+        FROM
+            rollup_store_counts
+        GROUP BY
+            locality
+        ORDER BY
+            total_no_of_stores DESC
+        LIMIT 7;''',
+    'task_3': '''
+        SELECT
+            month,
+            ROUND(SUM(total_sales)::numeric, 2) AS total_sales
+        FROM
+            rollup_monthly_sales
+        GROUP BY
+            month
+        ORDER BY
+            total_sales DESC
+        LIMIT 6;''',
+    'task_4': '''
+        SELECT
+            'Web' AS location,
+            COALESCE(SUM(number_of_sales), 0) AS numbers_of_sales,
+            SUM(product_quantity) AS product_quantity_count
+        FROM
+            rollup_store_sales
+        WHERE
+            store_code = 'WEB-1388012W'
+
+        UNION ALL
+
+        SELECT
+            'Offline' AS location,
+            COALESCE(SUM(number_of_sales), 0) AS numbers_of_sales,
+            SUM(product_quantity) AS product_quantity_count
+        FROM
+            rollup_store_sales
+        WHERE
+            store_code != 'WEB-1388012W';''',
+    'task_5': '''
+        SELECT
+            dim_store_details.store_type AS store_type,
+            ROUND(SUM(rollup_store_sales.total_sales)::numeric, 2) AS total_sales,
+            ROUND((SUM(rollup_store_sales.total_sales) /
+                (SELECT SUM(total_sales) FROM rollup_store_sales) * 100)::numeric, 2)
+            AS "percentage_total(%)"
+        FROM
+            rollup_store_sales
+        JOIN
+            dim_store_details ON rollup_store_sales.store_code = dim_store_details.store_code
+        WHERE
+            rollup_store_sales.total_sales IS NOT NULL
+        GROUP BY
+            store_type
+        ORDER BY
+            "percentage_total(%)" DESC;''',
+    'task_6': '''
+        SELECT
+            year,
+            month,
+            ROUND(SUM(total_sales)::numeric, 2) AS total_sales
+        FROM
+            rollup_monthly_sales
+        GROUP BY
+            year, month
+        ORDER BY
+            total_sales DESC
+        LIMIT 10;''',
+    'task_7': '''
+        SELECT
+            country_code,
+            SUM(staff_numbers) AS total_staff_numbers
+        FROM
+            rollup_store_counts
+        GROUP BY
+            country_code
+        ORDER BY
+            total_staff_numbers DESC;''',
+    'task_8': '''
+        SELECT
+            dim_store_details.store_type,
+            ROUND(SUM(rollup_store_sales.total_sales)::numeric, 2) AS total_sales
+        FROM
+            rollup_store_sales
+        JOIN
+            dim_store_details ON rollup_store_sales.store_code = dim_store_details.store_code
+        WHERE
+            dim_store_details.country_code = 'DE' AND rollup_store_sales.total_sales IS NOT NULL
+        GROUP BY
+            dim_store_details.store_type
+        ORDER BY
+            total_sales ASC;''',
+    # The gaps between consecutive sales within a day add up to last_sale - first_sale, and the gaps between days
+    # come from each day's first sale and the previous day's last one. They are summed as intervals, keeping
+    # their days and times apart, and divided by the number of gaps, as AVG over the gap intervals does.
+    'task_9': '''
+        WITH sale_days AS (
+            SELECT
+                year,
+                EXTRACT(EPOCH FROM last_sale - first_sale) * INTERVAL '1 second' AS gaps_within_day,
+                first_sale - LAG(last_sale) OVER (PARTITION BY year ORDER BY first_sale) AS gap_before_day,
+                number_of_sales
+            FROM
+                rollup_sales_by_day
+            WHERE
+                number_of_sales > 0
+        ),
+        sale_gaps AS (
+            SELECT
+                year,
+                (SUM(gaps_within_day) + COALESCE(SUM(gap_before_day), INTERVAL '0'))
+                    / (SUM(number_of_sales) - 1)::float8 AS average_gap
+            FROM
+                sale_days
+            GROUP BY
+                year
+            HAVING
+                SUM(number_of_sales) > 1
+        )
+        SELECT
+            year,
+            '{"hours": ' || EXTRACT(HOUR FROM average_gap) || ', "minutes": ' || EXTRACT(MINUTE FROM average_gap) || ', "seconds": ' || EXTRACT(SECOND FROM average_gap) || ', "milliseconds": ' || EXTRACT(MILLISECOND FROM average_gap) || '}' AS actual_time_taken
+        FROM
+            sale_gaps
+        ORDER BY
+            average_gap DESC
+        LIMIT 5;''',
+}
+
+QUERY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SQL_queries')
+
+
+class RollupManager():
+    """
+    This class maintains summary tables of the star schema in the target database and answers the
+    SQL_queries tasks from them instead of scanning and joining orders_table.
+
+    After a full load the rollups are rebuilt; after an incremental load (e.g. DataCleaning.load_rds_table_incrementally)
+    only the newly loaded rows are aggregated and merged into them. Orders are aggregated against the dimension
+    rows present at refresh time, so dimensions should be loaded before the orders that reference them;
+    rebuild() recomputes everything from the base tables. Requires PostgreSQL 15+ (NULLS NOT DISTINCT keys).
+
+    Parameters:
+    - connector (DatabaseConnector): Connector of the database holding the star schema.
+    """
+
+    def __init__(self, connector, cache=None):
+        """
+        Initializes the RollupManager instance.
+
+        Parameters:
+        - connector (DatabaseConnector): Connector of the database holding the star schema.
+        - cache (QueryResultCache, optional): Cache the task results are served from while their rollups are unchanged.
+        """
+        self.connector = connector
+        self.cache = cache
+
+    def _create_rollup(self, conn, rollup_name):
+        """
+        Recreates a rollup table from its base tables, with a unique index on its keys.
+        """
+        rollup = ROLLUPS[rollup_name]
+        keys = ', '.join(f'"{key}"' for key in rollup['keys'])
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{rollup_name}"')
+        conn.exec_driver_sql(f'CREATE TABLE "{rollup_name}" AS {rollup["query"].format(source=rollup["source"])}')
+        conn.exec_driver_sql(f'CREATE UNIQUE INDEX "{rollup_name}_keys" ON "{rollup_name}" ({keys}) NULLS NOT DISTINCT')
+        self.connector.bump_table_version(conn, rollup_name)
+
+    @instrument_stage
+    def rebuild(self, rollup_names=None):
+        """
+        Recomputes rollup tables from the base tables in one transaction.
+
+        Parameters:
+        - rollup_names (list, optional): Rollups to rebuild, defaults to all of ROLLUPS.
+        """
+        rollup_names = list(ROLLUPS) if rollup_names is None else rollup_names
+        try:
+            with self.connector.db_engine.begin() as conn:
+                for rollup_name in rollup_names:
+                    self._create_rollup(conn, rollup_name)
+            print(f"Rollups rebuilt: {', '.join(rollup_names)}")
+        except SQLAlchemyError as e:
+            print("An error occurred while rebuilding the rollups:", e)
+
+    @instrument_stage
+    def refresh(self, table_name, new_rows=None):
+        """
+        Brings the rollups reading a table up to date after it was loaded.
+
+        Rollups aggregating the table as their source merge in the aggregates of new_rows only. Rollups that only
+        join the table, or that can't be merged, are rebuilt, as is every rollup when new_rows is None
+        (the table was replaced) or when the rollup doesn't exist yet.
+
+        Parameters:
+        - table_name (str): Table that was loaded, e.g. 'orders_table'.
+        - new_rows (pd.DataFrame, optional): Rows appended to the table by the load.
+        """
+        affected = [rollup_name for rollup_name, rollup in ROLLUPS.items() if table_name in rollup['depends_on']]
+        try:
+            with self.connector.db_engine.begin() as conn:
+                existing = set(inspect(conn).get_table_names())
+                stage_name = None
+                for rollup_name in affected:
+                    rollup = ROLLUPS[rollup_name]
+                    if (new_rows is None or rollup['source'] != table_name or 'merge' not in rollup
+                            or rollup_name not in existing):
+                        self._create_rollup(conn, rollup_name)
+                    elif not new_rows.empty:
+                        stage_name = stage_name or self._stage_new_rows(conn, table_name, new_rows)
+                        self._merge_new_rows(conn, rollup_name, stage_name)
+            print(f"Rollups refreshed after loading '{table_name}': {', '.join(affected)}")
+        except SQLAlchemyError as e:
+            print("An error occurred while refreshing the rollups:", e)
+
+    def _stage_new_rows(self, conn, table_name, new_rows):
+        """
+        Copies new rows of a table into a temporary table shaped like it and returns the quoted staging table name.
+        """
+        stage_name = f'"new_{table_name}"'
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS {stage_name}')
+        conn.exec_driver_sql(f'CREATE TEMP TABLE {stage_name} (LIKE "{table_name}" INCLUDING DEFAULTS) ON COMMIT DROP')
+        rows = new_rows.astype(object).where(new_rows.notna(), None)
+        self.connector._copy_rows(conn, stage_name, list(new_rows.columns), rows.itertuples(index=False, name=None))
+        conn.exec_driver_sql(f'ANALYZE {stage_name}')
+        return stage_name
+
+    def _merge_new_rows(self, conn, rollup_name, stage_name):
+        """
+        Aggregates the staged new source rows with the rollup query and merges the result into the rollup on its keys.
+        """
+        rollup = ROLLUPS[rollup_name]
+        keys = ', '.join(f'"{key}"' for key in rollup['keys'])
+        updates = ', '.join(
+            f'"{column}" = ' + MERGE_EXPRESSIONS[how].format(table=f'"{rollup_name}"', column=f'"{column}"')
+            for column, how in rollup['merge'].items()
+        )
+        conn.exec_driver_sql(
+            f'INSERT INTO "{rollup_name}" {rollup["query"].format(source=stage_name)} '
+            f'ON CONFLICT ({keys}) DO UPDATE SET {updates}'
+        )
+        self.connector.bump_table_version(conn, rollup_name)
+
+    @instrument_stage
+    def answer_task(self, task_name):
+        """
+        Runs the rollup query of a task, or reads its result from the cache, and returns (column names, rows).
+
+        Parameters:
+        - task_name (str): Key of TASK_QUERIES, e.g. 'task_3'.
+        """
+        if self.cache is not None:
+            return self.cache.run_query(self.connector, TASK_QUERIES[task_name])
+        return self.connector.run_query(TASK_QUERIES[task_name])
+
+    def write_task_results(self, results_dir=os.path.join(QUERY_DIR, 'SQL_query_results'), task_names=None):
+        """
+        Answers the tasks from the rollups and writes each result to <results_dir>/<task>.csv.
+        Returns a dict of task name to query time in seconds.
+
+        Parameters:
+        - results_dir (str): Directory the CSV files are written to.
+        - task_names (list, optional): Tasks to answer, defaults to all of TASK_QUERIES.
+        """
+        os.makedirs(results_dir, exist_ok=True)
+        timings = {}
+        for task_name in task_names or TASK_QUERIES:
+            start = time.perf_counter()
+            columns, rows = self.answer_task(task_name)
+            timings[task_name] = time.perf_counter() - start
+            with open(os.path.join(results_dir, f'{task_name}.csv'), 'w', newline='') as file:
+                writer = csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator='\n')
+                writer.writerow(columns)
+                writer.writerows(rows)
+            print(f"{task_name}: {len(rows)} rows in {timings[task_name] * 1000:.1f} ms")
+        return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer the SQL_queries tasks from rollup tables.")
+    parser.add_argument('creds', help="YAML file with the credentials of the star schema database.")
+    parser.add_argument('--target', default='RDS', help="Credentials prefix of the database.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the rollups from the base tables first.")
+    parser.add_argument('--results-dir', default=os.path.join(QUERY_DIR, 'SQL_query_results'),
+                        help="Directory the task_*.csv results are written to.")
+    parser.add_argument('--tasks', nargs='+', choices=list(TASK_QUERIES), help="Tasks to answer, defaults to all.")
+    parser.add_argument('--cache-dir', default='.query_cache', help="Directory of the task result cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always run the task queries on the database.")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else QueryResultCache(args.cache_dir)
+    rollups = RollupManager(DatabaseConnector(args.creds, target=args.target), cache=cache)
+    if args.rebuild or not set(ROLLUPS) <= set(rollups.connector.list_db_tables()):
+        rollups.rebuild()
+    rollups.write_task_results(args.results_dir, args.tasks)
+    if cache is not None:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses.")
@@ -9,8 +9,12 @@ Now update the date table with the correct types:
 | day             | TEXT              | VARCHAR(?)         |
 | time_period     | TEXT              | VARCHAR(?)         |
 | date_uuid       | TEXT              | UUID               |
+| sale_ts         | TIMESTAMP         | TIMESTAMP          |
 +-----------------+-------------------+--------------------+
 
+sale_ts is the sale's date and time as one timestamp, so time-series queries can sort and window on it
+(indexed below) instead of parsing year, month, day and timestamp on every row.
+
 */
 
 
@@ -45,4 +49,6 @@ where TABLE_NAME = 'dim_date_times'
 
 DELETE FROM dim_date_times WHERE date_uuid IS NULL;
 ALTER TABLE dim_date_times
-ADD PRIMARY KEY (date_uuid);
\ No newline at end of file
+ADD PRIMARY KEY (date_uuid);
+
+CREATE INDEX dim_date_times_sale_ts_idx ON dim_date_times (sale_ts);